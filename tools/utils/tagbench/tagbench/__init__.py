@@ -0,0 +1,8 @@
+"""
+tagbench:  throughput benchmarks for tagcore/tagdump
+@author: Eric B. Decker
+"""
+
+__version__ = '0.4.8.dev1'
+
+# See tools/utils/ChangeLog
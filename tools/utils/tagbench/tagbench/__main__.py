@@ -0,0 +1,9 @@
+"""
+tagbench:  throughput benchmarks for tagcore/tagdump
+@author: Eric B. Decker
+"""
+
+from tagbench import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+synthetic dblk data streams
+
+DblkGen builds a dblk stream the way the tag lays one down: an empty
+directory sector, a REBOOT and SYNC/R, then a mix of records with a
+SYNC every sync_every records.  Records are built with the tagcore
+obj_dt_* objects (build), so headers, lengths, quad alignment and
+record checksums are what tagdump expects.  The same seed always gives
+the same bytes.
+
+A fraction of the records (corrupt) can be damaged after they are
+built, exercising resync:
+
+    chksum      one data byte flipped, the record checksum fails.
+    len         length stomped with something too large.
+    junk        garbage laid down between two records.
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'DblkGen',
+    'MIX',
+]
+
+import time
+import random
+import struct
+
+from   tagcore.core_headers   import *
+from   tagcore.sensor_headers import obj_tmp_px, obj_nsample
+from   tagcore.core_events    import event_names
+from   tagcore.core_rev       import CORE_REV, CORE_MINOR
+from   tagcore.dt_defs        import *
+from   tagcore.ubx_defs       import UBX_SOP_SEQ
+from   tagcore.tagrecords     import DBLK_DIR_SIZE
+
+# record mix, (kind, weight).  about what a tag on the move logs.
+MIX = (
+    ('event',    30),
+    ('ubx',      14),
+    ('nmea',      5),
+    ('gps_trk',  10),
+    ('gps_geo',  10),
+    ('gps_xyz',  10),
+    ('tmp_px',    9),
+    ('accel',     5),
+    ('note',      5),
+)
+
+CORRUPT_KINDS   = ('chksum', 'len', 'junk')
+
+SYNC_EVERY      = 50                # records between SYNCs
+START_SECS      = 1583316000        # 2020-03-04 10:00:00 UTC
+RECSUM_OFFSET   = 18                # recsum in the record header
+UBX_NAV_PVT     = 0x0107
+UBX_NAV_PVT_LEN = 92
+
+nmea_gga = '$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47\r\n'
+
+
+def zero(obj):
+    '''give every atom in obj a value (0), build needs them all set'''
+    obj.set('\0' * len(obj))
+    return obj
+
+
+def ubx_chksum(buf):
+    '''ubx fletcher checksum over class, id, len and payload'''
+    ck_a = ck_b = 0
+    for b in bytearray(buf):
+        ck_a = (ck_a + b) & 0xff
+        ck_b = (ck_b + ck_a) & 0xff
+    return struct.pack('BB', ck_a, ck_b)
+
+
+class DblkGen(object):
+    '''
+    synthetic dblk stream
+
+    inputs:     seed        random seed, same seed same bytes
+                sync_every  records between SYNC records
+                corrupt     fraction of records damaged (0 - 1)
+                start       rtctime of the first record (epoch secs, UTC)
+                mix         ((kind, weight), ...), see MIX
+
+    methods:    stream      generator of strings, the directory sector and
+                            then nrecs records (SYNCs count)
+                write       write stream(nrecs) to a file, returns its size
+
+    attrs:      counts      records built, rtype -> n
+                corrupted   records damaged, kind -> n
+                syncs       offsets of the SYNC records
+    '''
+
+    def __init__(self, seed = 1, sync_every = SYNC_EVERY, corrupt = 0.0,
+                 start = START_SECS, mix = MIX):
+        super(DblkGen, self).__init__()
+        self.rng        = random.Random(seed)
+        self.sync_every = sync_every
+        self.corrupt    = corrupt
+        self.now_us     = start * 1000000
+        self.kinds      = [ k for k, w in mix for i in range(w) ]
+        self.events     = sorted(event_names.keys())
+        self.offset     = 0
+        self.recnum     = 0
+        self.prev_sync  = 0
+        self.counts     = {}
+        self.corrupted  = {}
+        self.syncs      = []
+
+        self.reboot     = zero(obj_dt_reboot())
+        self.sync       = zero(obj_dt_sync())
+        self.event      = zero(obj_dt_event())
+        self.gps_hdr    = zero(obj_dt_gps_hdr())
+        self.gps_geo    = zero(obj_dt_gps_geo())
+        self.gps_xyz    = zero(obj_dt_gps_xyz())
+        self.gps_trk    = zero(obj_dt_gps_trk())
+        self.trk_elem   = zero(obj_dt_gps_trk_element())
+        self.sns        = zero(obj_dt_sns_data())
+        self.tmp_px     = zero(obj_tmp_px())
+        self.nsample    = zero(obj_nsample())
+        self.note       = zero(obj_dt_note())
+
+    def rtctime(self, rt):
+        self.now_us += self.rng.randint(5000, 600000)
+        secs, us = divmod(self.now_us, 1000000)
+        tm = time.gmtime(secs)
+        rt['year'].val    = tm.tm_year
+        rt['mon'].val     = tm.tm_mon
+        rt['day'].val     = tm.tm_mday
+        rt['hr'].val      = tm.tm_hour
+        rt['min'].val     = tm.tm_min
+        rt['sec'].val     = tm.tm_sec
+        rt['sub_sec'].val = us * 32768 / 1000000
+        rt['dow'].val     = (tm.tm_wday + 1) % 7        # sunday is 0
+
+    def record(self, obj, hdr, rtype, payload = ''):
+        '''
+        fill in hdr (part of obj), build obj + payload and lay down the
+        record checksum.  returns the record as a bytearray.
+        '''
+        self.recnum += 1
+        hdr['len'].val      = len(obj) + len(payload)
+        hdr['type'].val     = rtype
+        hdr['hdr_crc8'].val = 0
+        hdr['recnum'].val   = self.recnum
+        hdr['recsum'].val   = 0
+        self.rtctime(hdr['rt'])
+        rec = bytearray(obj.build())
+        rec.extend(payload)
+        struct.pack_into('<H', rec, RECSUM_OFFSET, sum(rec) & 0xffff)
+        self.counts[rtype] = self.counts.get(rtype, 0) + 1
+        return rec
+
+    def gen_reboot(self):
+        obj = self.reboot
+        obj['core_rev'].val   = CORE_REV
+        obj['core_minor'].val = CORE_MINOR
+        obj['node_id'].val    = '\x01\x02\x03\x04\x05\x06'
+        for k in ('boot_time', 'prev_boot'):
+            self.rtctime(obj['owcb'][k])
+        return self.record(obj, obj['hdr'], DT_REBOOT)
+
+    def gen_sync(self, rtype = DT_SYNC):
+        obj = self.sync
+        obj['prev_sync'].val = self.prev_sync
+        obj['majik'].val     = dt_sync_majik
+        self.prev_sync = self.offset
+        self.syncs.append(self.offset)
+        return self.record(obj, obj['hdr'], rtype)
+
+    def gen_event(self):
+        obj = self.event
+        obj['event'].val = self.rng.choice(self.events)
+        for i in range(4):
+            obj['arg{}'.format(i)].val = self.rng.randint(0, 0xffffffff)
+        return self.record(obj, obj['hdr'], DT_EVENT)
+
+    def gen_ubx(self):
+        obj = self.gps_hdr
+        obj['mark'].val = self.rng.randint(0, 0xffff)
+        pkt  = struct.pack('>H', UBX_NAV_PVT) + \
+               struct.pack('<H', UBX_NAV_PVT_LEN) + \
+               str(bytearray([ self.rng.randint(0, 255)
+                               for i in range(UBX_NAV_PVT_LEN) ]))
+        pkt  = struct.pack('>H', UBX_SOP_SEQ) + pkt + ubx_chksum(pkt)
+        return self.record(obj, obj['hdr'], DT_GPS_RAW, pkt)
+
+    def gen_nmea(self):
+        obj = self.gps_hdr
+        obj['mark'].val = self.rng.randint(0, 0xffff)
+        return self.record(obj, obj['hdr'], DT_GPS_RAW, nmea_gga)
+
+    def gen_gps_geo(self):
+        obj = self.gps_geo
+        obj['lat'].val      = self.rng.randint(-900000000,  900000000)
+        obj['lon'].val      = self.rng.randint(-1800000000, 1800000000)
+        obj['alt_ell'].val  = self.rng.randint(0, 100000)
+        obj['alt_msl'].val  = self.rng.randint(0, 100000)
+        obj['nav_type'].val = 4
+        obj['tow1000'].val  = self.rng.randint(0, 604800000)
+        obj['week_x'].val   = 2100
+        obj['nsats'].val    = self.rng.randint(0, 12)
+        obj['ehpe100'].val  = self.rng.randint(0, 5000)
+        obj['hdop5'].val    = self.rng.randint(0, 50)
+        return self.record(obj, obj['gps_hdr']['hdr'], DT_GPS_GEO)
+
+    def gen_gps_xyz(self):
+        obj = self.gps_xyz
+        for k in ('x', 'y', 'z'):
+            obj[k].val      = self.rng.randint(-6400000, 6400000)
+        obj['tow100'].val   = self.rng.randint(0, 6048000)
+        obj['week_x'].val   = 2100
+        obj['nsats'].val    = self.rng.randint(0, 12)
+        obj['hdop5'].val    = self.rng.randint(0, 50)
+        return self.record(obj, obj['gps_hdr']['hdr'], DT_GPS_XYZ)
+
+    def gen_gps_trk(self):
+        obj   = self.gps_trk
+        elem  = self.trk_elem
+        chans = self.rng.randint(1, 12)
+        obj['chans'].val  = chans
+        obj['tow100'].val = self.rng.randint(0, 6048000)
+        obj['week'].val   = 2100
+        payload = []
+        for n in range(chans):
+            for k in elem:
+                elem[k].val = self.rng.randint(0, 45)
+            payload.append(elem.build())
+        return self.record(obj, obj['gps_hdr']['hdr'], DT_GPS_TRK,
+                           ''.join(payload))
+
+    def gen_tmp_px(self):
+        obj = self.sns
+        obj['sched_delta'].val = self.rng.randint(0, 100)
+        self.tmp_px['tmp_p'].val = self.rng.randint(-500, 3500)
+        self.tmp_px['tmp_x'].val = self.rng.randint(-500, 3500)
+        return self.record(obj, obj['hdr'], DT_SNS_TMP_PX,
+                           self.tmp_px.build())
+
+    def gen_accel(self):
+        obj = self.sns
+        obj['sched_delta'].val = self.rng.randint(0, 100)
+        nsamples = self.rng.randint(1, 64)
+        self.nsample['nsamples'].val = nsamples
+        self.nsample['datarate'].val = 10
+        samples = struct.pack('{}b'.format(3 * nsamples),
+                              *[ self.rng.randint(-128, 127)
+                                 for i in range(3 * nsamples) ])
+        return self.record(obj, obj['hdr'], DT_SNS_ACCEL_N8S,
+                           self.nsample.build() + samples)
+
+    def gen_note(self):
+        obj = self.note
+        return self.record(obj, obj['hdr'], DT_NOTE,
+                           'note {} {}\0'.format(self.recnum + 1,
+                                                 'x' * self.rng.randint(0, 60)))
+
+    def damage(self, rec):
+        '''damage a built record, returns (rec, junk to lay down first)'''
+        kind = self.rng.choice(CORRUPT_KINDS)
+        self.corrupted[kind] = self.corrupted.get(kind, 0) + 1
+        if kind == 'chksum':
+            rec[self.rng.randint(RECSUM_OFFSET + 2, len(rec) - 1)] ^= 0x5a
+            return rec, ''
+        if kind == 'len':
+            struct.pack_into('<H', rec, 0, 0xfff0)
+            return rec, ''
+        junk = str(bytearray([ self.rng.randint(0, 255)     # keep rec
+                               for i in range(4 * self.rng.randint(1, 16)) ]))
+        return rec, junk
+
+    def lay_down(self, rec, junk = ''):
+        '''a record (and any junk in front of it), quad aligned'''
+        out = bytearray(junk)
+        out.extend(rec)
+        pad = -(self.offset + len(out)) & 3
+        out.extend('\0' * pad)
+        self.offset += len(out)
+        return str(out)
+
+    def stream(self, nrecs):
+        self.offset = DBLK_DIR_SIZE
+        yield '\0' * DBLK_DIR_SIZE
+        yield self.lay_down(self.gen_reboot())
+        yield self.lay_down(self.gen_sync(DT_SYNC_REBOOT))
+        since_sync = 0
+        while self.recnum < nrecs:
+            if since_sync >= self.sync_every:
+                since_sync = 0
+                yield self.lay_down(self.gen_sync())
+                continue
+            since_sync += 1
+            rec  = getattr(self, 'gen_' + self.rng.choice(self.kinds))()
+            junk = ''
+            if self.corrupt and self.rng.random() < self.corrupt:
+                rec, junk = self.damage(rec)
+            yield self.lay_down(rec, junk)
+
+    def write(self, name, nrecs):
+        with open(name, 'wb') as fd:
+            for chunk in self.stream(nrecs):
+                fd.write(chunk)
+        return self.offset
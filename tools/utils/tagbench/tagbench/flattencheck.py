@@ -0,0 +1,164 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+flattencheck - compiled flatten plans against flatten_dict
+
+emit_influx flattens each record through a plan compiled for its
+object (json_emitters.compile_flatten) rather than flatten_dict and
+build_tags.  This checks the two give the same fields and tags, for
+every dt_records object:
+
+    unset       before anything is decoded, every atom notset.
+    decoded     after decoding a record of each rtype from a synthetic
+                stream (dblkgen).
+    holes       the decoded record with one atom at a time unset.
+
+Exits 1 if any object's plan disagrees with flatten_dict/build_tags.
+
+usage: flattencheck [-h] [-n RECORDS] [-v]
+'''
+
+from   __future__         import print_function
+
+import os
+import sys
+import argparse
+import tempfile
+
+import tagcore.dt_defs        as     dtd
+from   tagcore.dt_defs        import DTR_DECODER, DTR_OBJ
+from   tagcore.tagfile        import TagFile
+from   tagcore.tagrecords     import RecordReader, DBLK_DIR_SIZE
+import tagcore.json_emitters  as     je
+
+import tagcore.core_populate
+import tagcore.sensor_populate
+import tagcore.ubx_populate
+
+from   dblkgen            import DblkGen
+from   __init__           import __version__ as VERSION
+
+RECORDS         = 2000              # records in the synthetic stream
+
+
+def run(f):
+    '''f(), or the type of exception it raised'''
+    try:
+        return f()
+    except Exception as e:
+        return type(e)
+
+
+def compare(what, obj, verbose):
+    '''plan vs flatten_dict/build_tags for obj, returns the complaints'''
+    want = run(lambda: (je.flatten_dict(obj, ''), je.build_tags(obj)))
+    got  = run(lambda: je.compile_flatten(obj)())
+    if not isinstance(want, tuple) or not isinstance(got, tuple):
+        # flatten_dict can't do some objects (non string keys), nor
+        # should the plan.
+        if want is got:
+            if verbose:
+                print('    {:<40s} ok (both raise {})'.format(
+                    what, want.__name__))
+            return []
+        return [ '{}: want {} got {}'.format(what, want, got) ]
+    bad  = []
+    for i, part in enumerate(('fields', 'tags')):
+        for k in sorted(set(want[i]) | set(got[i])):
+            w = want[i].get(k, '<missing>')
+            g = got[i].get(k, '<missing>')
+            if w != g or type(w) != type(g):
+                bad.append('{} {} {}: want {!r} got {!r}'.format(
+                    what, part, k, w, g))
+    if verbose and not bad:
+        print('    {:<40s} ok ({} fields)'.format(what, len(want[0])))
+    return bad
+
+
+def decoded(nrecs):
+    '''(rtype, offset, rec_buf) of the first record of each rtype'''
+    fd, name = tempfile.mkstemp(suffix = '.dblk')
+    os.close(fd)
+    try:
+        DblkGen(1).write(name, nrecs)
+        first = {}
+        with open(name, 'rb') as fd, TagFile(fd, quiet = True) as infile:
+            infile.seek(DBLK_DIR_SIZE)
+            for offset, hdr, rec_buf in RecordReader(infile).records():
+                first.setdefault(hdr['type'].val, (offset, rec_buf))
+    finally:
+        os.remove(name)
+    return sorted([ (k, v[0], v[1]) for k, v in first.items() ])
+
+
+def check(nrecs, verbose):
+    '''run the scenarios, returns the complaints'''
+    bad = []
+    objs = [ (dtd.dt_name(rtype), v[DTR_OBJ]) for rtype, v in
+             sorted(dtd.dt_records.items()) if v[DTR_OBJ] is not None ]
+
+    print('unset')
+    for name, obj in objs:
+        bad += compare(name, obj, verbose)
+
+    print('decoded, holes')
+    for rtype, offset, rec_buf in decoded(nrecs):
+        v = dtd.dt_records.get(rtype)
+        if not v or not v[DTR_DECODER] or v[DTR_OBJ] is None:
+            continue
+        obj, name = v[DTR_OBJ], dtd.dt_name(rtype)
+        v[DTR_DECODER](0, offset, rec_buf, obj)
+        bad += compare(name, obj, verbose)
+        for lkey, rkey, key, a_obj in je.flatten_fields(obj, '', []) or []:
+            val, a_obj.val = a_obj.val, None
+            bad += compare('{} ({} notset)'.format(name, key), obj, False)
+            a_obj.val = val
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='compiled flatten plans against flatten_dict')
+
+    parser.add_argument('-V', '--version',
+                        action='version',
+                        version='%(prog)s ' + VERSION)
+
+    parser.add_argument('-n', '--records',
+                        type=int,
+                        default=RECORDS,
+                        help='records in the synthetic stream')
+
+    parser.add_argument('-v', '--verbose',
+                        action='store_true',
+                        help='list each object checked')
+
+    args = parser.parse_args()
+    bad = check(args.records, args.verbose)
+    for msg in bad:
+        print('*** ' + msg)
+    if bad:
+        print('*** {} differences'.format(len(bad)))
+        sys.exit(1)
+    print('ok')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+influxcheck - BatchWriter against a stand-in influxdb
+
+Runs tagcore's BatchWriter, through a real InfluxDBClient, against
+InfluxStub, a local http server that answers /ping, /query and /write
+the way influxdb 1.7 does but can be told to fail writes.  Each
+scenario checks what the writer counted (points, flushes, dropped,
+errors) against what the stub actually took:
+
+    clean       every write works.
+    flaky       every 3rd write fails (500), retries get it through,
+                nothing dropped.
+    down        every write fails, each batch is tried retries times
+                and dropped.
+    outage      the first writes fail, more than a batch's retries, so
+                the first batch is dropped and the rest get through.
+    slow        each write takes a while and the queue is small, write
+                must block (backpressure) and nothing is lost.
+
+Exits 1 if any scenario's counts don't add up.
+
+usage: influxcheck [-h] [-n POINTS] [-v]
+'''
+
+from   __future__         import print_function
+
+import sys
+import json
+import time
+import argparse
+import threading
+import BaseHTTPServer
+import SocketServer
+
+from   tagcore.influx_sinks   import BatchWriter
+
+from   __init__           import __version__ as VERSION
+
+POINTS          = 2000              # points per scenario
+STUB_VERSION    = '1.7.0'
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''influxdb 1.x http api, just enough for InfluxDBClient'''
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code, body = ''):
+        self.send_response(code)
+        self.send_header('X-Influxdb-Version', STUB_VERSION)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/ping'):
+            return self.reply(204)
+        self.reply(200, json.dumps({ 'results': [ { 'statement_id': 0 } ] }))
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.startswith('/write'):
+            return self.reply(200, json.dumps(
+                { 'results': [ { 'statement_id': 0 } ] }))
+        stub = self.server.stub
+        if stub.delay:
+            time.sleep(stub.delay)
+        if stub.fail_write():
+            return self.reply(500, json.dumps({ 'error': 'stub says no' }))
+        stub.took(len([ l for l in body.split('\n') if l ]))
+        self.reply(204)
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+
+class InfluxStub(object):
+    '''
+    local stand-in influxdb
+
+    inputs:     fail    f(n) -> True to fail the n'th write (from 0),
+                        None never fails.
+                delay   secs each write takes.
+
+    methods:    start   serve from a background thread, returns the port.
+                stop    shut the server down.
+
+    attrs:      writes  /write requests seen.
+                failed  writes answered with a 500.
+                points  points taken (lines in successful writes).
+    '''
+
+    def __init__(self, fail = None, delay = 0):
+        super(InfluxStub, self).__init__()
+        self.fail   = fail
+        self.delay  = delay
+        self.lock   = threading.Lock()
+        self.writes = self.failed = self.points = 0
+        self.server = None
+
+    def fail_write(self):
+        with self.lock:
+            n = self.writes
+            self.writes += 1
+            bad = bool(self.fail and self.fail(n))
+            if bad:
+                self.failed += 1
+            return bad
+
+    def took(self, points):
+        with self.lock:
+            self.points += points
+
+    def start(self):
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.stub = self
+        t = threading.Thread(target = self.server.serve_forever,
+                             name = 'influx-stub')
+        t.daemon = True
+        t.start()
+        return self.server.server_address[1]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_points(n):
+    return [ { 'measurement': 'check',
+               'tags':        { 'n': str(i % 10) },
+               'fields':      { 'i': i },
+               'time':        1583319545000000000 + i } for i in range(n) ]
+
+
+def run(stub, points, **kwargs):
+    '''
+    write points through a BatchWriter to stub.  returns (close's counts,
+    the writer, secs spent in write).
+    '''
+    from influxdb import InfluxDBClient
+    port   = stub.start()
+    client = InfluxDBClient('127.0.0.1', port, database = 'check')
+    w = BatchWriter(client, **kwargs)
+    try:
+        t0 = time.time()
+        w.write(points)
+        secs = time.time() - t0
+        counts = w.close()
+    finally:
+        stub.stop()
+    return counts, w, secs
+
+
+def check(name, want, got):
+    '''compare { what: value } dicts, print and return the mismatches'''
+    bad = [ k for k in sorted(want) if want[k] != got[k] ]
+    print('{:<10s} {}'.format(name, 'ok' if not bad else 'FAILED'))
+    for k in sorted(want):
+        print('    {:<12s} want {:>6}  got {:>6}{}'.format(
+            k, want[k], got[k], '  ***' if k in bad else ''))
+    return bad
+
+
+def scenarios(n, verbose):
+    '''run them all, returns the names of the ones that failed'''
+    points = make_points(n)
+    batch  = max(1, n / 10)
+    # batches go out full (close flushes the last), fast retries
+    fast   = dict(batch_size = batch, flush_secs = 10, retry_secs = 0.01)
+    nbatch = (n + batch - 1) / batch
+    failed = []
+
+    def report(name, stub, counts, w, want):
+        got = dict(points = counts[0], flushes = counts[1],
+                   dropped = counts[2], errors = w.errors,
+                   stub_points = stub.points, stub_writes = stub.writes,
+                   stub_failed = stub.failed)
+        if check(name, want, dict([ (k, got[k]) for k in want ])):
+            failed.append(name)
+        elif verbose:
+            print('    ' + w.summary())
+
+    # clean: everything goes, one write per batch
+    stub = InfluxStub()
+    counts, w, secs = run(stub, points, **fast)
+    report('clean', stub, counts, w,
+           dict(points = n, flushes = nbatch, dropped = 0, errors = 0,
+                stub_points = n, stub_writes = nbatch))
+
+    # flaky: every 3rd write fails, a retry always follows
+    stub = InfluxStub(fail = lambda i: i % 3 == 2)
+    counts, w, secs = run(stub, points, retries = 3, **fast)
+    report('flaky', stub, counts, w,
+           dict(points = n, flushes = nbatch, dropped = 0,
+                errors = stub.failed, stub_points = n,
+                stub_writes = nbatch + stub.failed))
+
+    # down: every try fails, every batch dropped after retries tries
+    stub = InfluxStub(fail = lambda i: True)
+    counts, w, secs = run(stub, points, retries = 3, **fast)
+    report('down', stub, counts, w,
+           dict(points = 0, flushes = 0, dropped = n, errors = nbatch * 3,
+                stub_points = 0, stub_writes = nbatch * 3))
+
+    # outage: the first batch's retries all fail, the rest get through
+    stub = InfluxStub(fail = lambda i: i < 3)
+    counts, w, secs = run(stub, points, retries = 3, **fast)
+    report('outage', stub, counts, w,
+           dict(points = n - batch, flushes = nbatch - 1, dropped = batch,
+                errors = 3, stub_points = n - batch,
+                stub_writes = nbatch + 2))
+
+    # slow: small queue, slow writes, write() has to wait on the server
+    delay = 0.05
+    stub  = InfluxStub(delay = delay)
+    counts, w, secs = run(stub, points, max_queue = batch, **fast)
+    report('slow', stub, counts, w,
+           dict(points = n, dropped = 0, stub_points = n))
+    # the queue holds one batch, so write returns only after all but
+    # the last couple of batches have been written.
+    blocked = secs >= (nbatch - 2) * delay
+    print('    {:<12s} write took {:.3f}s, {}'.format(
+        'backpressure', secs, 'blocked' if blocked else 'did NOT block ***'))
+    if not blocked and 'slow' not in failed:
+        failed.append('slow')
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='BatchWriter against a stand-in influxdb')
+
+    parser.add_argument('-V', '--version',
+                        action='version',
+                        version='%(prog)s ' + VERSION)
+
+    parser.add_argument('-n', '--points',
+                        type=int,
+                        default=POINTS,
+                        help='points per scenario')
+
+    parser.add_argument('-v', '--verbose',
+                        action='store_true',
+                        help='print the writer summaries too')
+
+    args = parser.parse_args()
+    try:
+        import influxdb
+    except ImportError:
+        print('*** influxcheck needs the influxdb client (pip install influxdb)',
+              file = sys.stderr)
+        sys.exit(2)
+    failed = scenarios(args.points, args.verbose)
+    if failed:
+        print('*** failed: {}'.format(', '.join(failed)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+tagbench - throughput benchmarks for tagcore and tagdump
+
+Generates synthetic dblk streams (see dblkgen), a clean one and one
+with corrupt records, and times the record pipeline over them:
+
+    get_record          RecordReader over the clean stream
+    get_record/corrupt  same, over the corrupt stream (checksum fails,
+                        resyncs)
+    resync              TagFile.resync from unaligned offsets
+    decode              every decoder, in file order
+    decode/<rtype>      decoders, one rtype at a time
+    emit                display emitters (decode not timed)
+    emit_mr             machine readable emitters (-m)
+    emit_influx         emit_influx into a BatchWriter whose client
+                        throws the points away, including the final flush
+    tagdump             whole tagdump runs (subprocess, output to
+    tagdump_mr          /dev/null, --noexport) serial, -m and --jobs
+    tagdump_jobs
+
+Each benchmark runs --repeat times and the best time is kept.  Results
+are written as JSON (-o) and can be checked against an earlier run
+(--baseline), anything more than --threshold percent slower is
+reported and tagbench exits 1.  The generator is seeded, so the same
+arguments always time the same bytes.
+
+usage: tagbench [-h] [-V] [-n RECORDS] [--seed SEED] [--sync-every N]
+                [--corrupt RATE] [-r REPEAT] [-b NAME[,NAME...]]
+                [--tagdump CMD] [--jobs N] [--keep DIR]
+                [-o RESULTS] [--baseline RESULTS] [--threshold PCT]
+'''
+
+from   __future__         import print_function
+
+import os
+import sys
+import gc
+import json
+import time
+import shlex
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from   timeit             import default_timer as clock
+
+import tagcore
+from   tagcore.core_rev       import CORE_REV, CORE_MINOR
+import tagcore.dt_defs        as     dtd
+from   tagcore.dt_defs        import DTR_DECODER, DTR_EMITTERS, DTR_OBJ, DTR_NAME
+from   tagcore.tagfile        import TagFile
+from   tagcore.tagrecords     import RecordReader, DBLK_DIR_SIZE
+from   tagcore.output_sinks   import FileSink, set_output
+from   tagcore.influx_sinks   import BatchWriter
+import tagcore.json_emitters  as     je
+
+from   dblkgen            import DblkGen, SYNC_EVERY
+from   __init__           import __version__ as VERSION
+
+
+def use_records(records):
+    dtd.dt_records.clear()          # same dict everyone imported
+    dtd.dt_records.update(records)
+
+
+# display and machine readable populators both fill in dt_records.  Keep
+# a copy of each, use_records puts one back.
+import tagcore.core_populate
+import tagcore.sensor_populate
+import tagcore.ubx_populate
+core_records = dict(dtd.dt_records)
+import tagcore.mr_populate
+mr_records   = dict(dtd.dt_records)
+
+use_records(core_records)
+
+RESULTS_VERSION = 1
+RECORDS         = 20000             # records per synthetic stream
+REPEAT          = 3                 # runs per benchmark, best is kept
+CORRUPT         = 0.02              # corrupt stream, fraction damaged
+RESYNC_STEP     = 4100              # resync bench, bytes between starts
+THRESHOLD       = 10.0              # --baseline, percent slower is bad
+
+
+class NullClient(object):
+    '''InfluxDBClient stand in, throws points away'''
+
+    def write_points(self, points):
+        return True
+
+
+class Bench(object):
+    '''
+    one set of benchmarks over a clean and a corrupt synthetic stream
+
+    inputs:     args    parsed command line
+
+    methods:    setup   generate the streams and pull out records
+                run     run the selected benchmarks, returns results dict
+                close   remove generated files (unless --keep)
+    '''
+
+    def __init__(self, args):
+        super(Bench, self).__init__()
+        self.args    = args
+        self.dir     = None
+        self.clean   = None
+        self.corrupt = None
+        self.records = []               # (offset, rtype, rlen, rec_buf)
+        self.nbytes  = 0
+        self.results = {}
+
+    def setup(self):
+        args = self.args
+        if args.keep:
+            self.dir = args.keep
+            if not os.path.isdir(self.dir):
+                os.makedirs(self.dir)
+        else:
+            self.dir = tempfile.mkdtemp(prefix = 'tagbench.')
+        self.clean   = os.path.join(self.dir, 'clean.dblk')
+        self.corrupt = os.path.join(self.dir, 'corrupt.dblk')
+        DblkGen(args.seed, args.sync_every).write(self.clean, args.records)
+        gen = DblkGen(args.seed, args.sync_every, args.corrupt)
+        gen.write(self.corrupt, args.records)
+        self.corrupted = sum(gen.corrupted.values())
+
+        for offset, hdr, rec_buf in self.reader(self.clean).records():
+            rlen = hdr['len'].val
+            self.records.append((offset, hdr['type'].val, rlen, rec_buf))
+            self.nbytes += rlen
+
+    def close(self):
+        if self.dir and not self.args.keep:
+            shutil.rmtree(self.dir, ignore_errors = True)
+
+    def reader(self, name):
+        infile = TagFile(open(name, 'rb'), quiet = True)
+        infile.seek(DBLK_DIR_SIZE)
+        return RecordReader(infile)
+
+    #
+    # each bench_ returns (secs, items, nbytes) for one run
+    #
+    def bench_get_record(self, name = None):
+        reader = self.reader(name or self.clean)
+        n = nbytes = 0
+        t0 = clock()
+        for offset, hdr, rec_buf in reader.records():
+            n += 1
+            nbytes += hdr['len'].val
+        return clock() - t0, n, nbytes
+
+    def bench_get_record_corrupt(self):
+        return self.bench_get_record(self.corrupt)
+
+    def bench_resync(self):
+        infile = TagFile(open(self.clean, 'rb'), quiet = True)
+        size   = os.path.getsize(self.clean)
+        starts = range(DBLK_DIR_SIZE, size, RESYNC_STEP)
+        t0 = clock()
+        for offset in starts:
+            infile.resync(offset)
+        return clock() - t0, len(starts), size - DBLK_DIR_SIZE
+
+    def decode_all(self, records):
+        n = nbytes = 0
+        t0 = clock()
+        for offset, rtype, rlen, rec_buf in records:
+            v = dtd.dt_records[rtype]
+            v[DTR_DECODER](0, offset, rec_buf, v[DTR_OBJ])
+            n += 1
+            nbytes += rlen
+        return clock() - t0, n, nbytes
+
+    def bench_decode(self):
+        return self.decode_all(self.records)
+
+    def emit_all(self, emitters = None):
+        '''
+        decode each record, time just the emitters.  emitters, if given,
+        replace the record's own.  emit_influx is left out of the record's
+        own, it has its own benchmark.
+        '''
+        secs = 0.0
+        n = nbytes = 0
+        for offset, rtype, rlen, rec_buf in self.records:
+            v   = dtd.dt_records[rtype]
+            obj = v[DTR_OBJ]
+            v[DTR_DECODER](0, offset, rec_buf, obj)
+            es  = emitters or [ e for e in v[DTR_EMITTERS] or []
+                                if e is not je.emit_influx ]
+            t0 = clock()
+            for e in es:
+                e(0, offset, rec_buf, obj)
+            secs += clock() - t0
+            n += 1
+            nbytes += rlen
+        return secs, n, nbytes
+
+    def bench_emit(self):
+        return self.emit_all()
+
+    def bench_emit_mr(self):
+        use_records(mr_records)
+        try:
+            return self.emit_all()
+        finally:
+            use_records(core_records)
+
+    def bench_emit_influx(self):
+        je.influx_writer = BatchWriter(NullClient())
+        je.influx_state  = True
+        try:
+            secs, n, nbytes = self.emit_all([ je.emit_influx ])
+            t0 = clock()
+            je.influx_writer.close()    # points still queued count too
+            return secs + clock() - t0, n, nbytes
+        finally:
+            je.influx_writer = None
+            je.influx_state  = None
+
+    def tagdump(self, opts):
+        cmd = shlex.split(self.args.tagdump) + [ '--noexport' ] + opts + \
+              [ self.clean ]
+        with open(os.devnull, 'w') as null:
+            t0 = clock()
+            rc = subprocess.call(cmd, stdout = null, stderr = null)
+            secs = clock() - t0
+        if rc:
+            raise RuntimeError('{} exited {}'.format(' '.join(cmd), rc))
+        return secs, len(self.records), self.nbytes
+
+    def bench_tagdump(self):
+        return self.tagdump([])
+
+    def bench_tagdump_mr(self):
+        return self.tagdump([ '-m' ])
+
+    def bench_tagdump_jobs(self):
+        return self.tagdump([ '--jobs', str(self.args.jobs) ])
+
+    def benches(self):
+        '''(name, func) for every benchmark, in run order'''
+        out = [ ('get_record',         self.bench_get_record),
+                ('get_record/corrupt', self.bench_get_record_corrupt),
+                ('resync',             self.bench_resync),
+                ('decode',             self.bench_decode) ]
+        for rtype in sorted(set([ r[1] for r in self.records ])):
+            recs = [ r for r in self.records if r[1] == rtype ]
+            out.append(('decode/' + dtd.dt_records[rtype][DTR_NAME],
+                        lambda recs = recs: self.decode_all(recs)))
+        out.extend([ ('emit',          self.bench_emit),
+                     ('emit_mr',       self.bench_emit_mr),
+                     ('emit_influx',   self.bench_emit_influx),
+                     ('tagdump',       self.bench_tagdump),
+                     ('tagdump_mr',    self.bench_tagdump_mr),
+                     ('tagdump_jobs',  self.bench_tagdump_jobs) ])
+        return out
+
+    def selected(self, name):
+        only = self.args.bench
+        if not only:
+            return True
+        return any([ name == b or name.startswith(b + '/') for b in only ])
+
+    def run(self):
+        null = FileSink(os.devnull)
+        prev = set_output(null)         # emitter output goes nowhere
+        try:
+            for name, func in self.benches():
+                if not self.selected(name):
+                    continue
+                runs = []
+                try:
+                    for i in range(self.args.repeat):
+                        gc.collect()
+                        secs, items, nbytes = func()
+                        runs.append(secs)
+                except Exception as e:
+                    print('*** {}: skipped, {}'.format(name, e),
+                          file = sys.stderr)
+                    continue
+                best = min(runs)
+                self.results[name] = {
+                    'secs':     best,
+                    'runs':     runs,
+                    'items':    items,
+                    'bytes':    nbytes,
+                    'per_sec':  items / best if best else 0,
+                    'mb_sec':   nbytes / best / 1e6 if best else 0,
+                }
+                print_result(name, self.results[name])
+        finally:
+            set_output(prev)
+            null.close()
+        return self.results
+
+    def params(self):
+        args = self.args
+        return {
+            'records':    args.records,
+            'seed':       args.seed,
+            'sync_every': args.sync_every,
+            'corrupt':    args.corrupt,
+            'corrupted':  self.corrupted,
+            'repeat':     args.repeat,
+            'jobs':       args.jobs,
+            'bytes':      os.path.getsize(self.clean),
+        }
+
+
+def print_header():
+    print('{:<28s} {:>9s} {:>9s} {:>11s} {:>8s}'.format(
+        'benchmark', 'items', 'secs', 'items/s', 'MB/s'))
+
+
+def print_result(name, r):
+    print('{:<28s} {:>9d} {:>9.3f} {:>11.0f} {:>8.2f}'.format(
+        name, r['items'], r['secs'], r['per_sec'], r['mb_sec']))
+
+
+def compare(results, baseline, threshold):
+    '''
+    print how results did against baseline, returns the names of the
+    benchmarks more than threshold percent slower.
+    '''
+    slower = []
+    print()
+    print('{:<28s} {:>9s} {:>9s} {:>8s}'.format(
+        'vs baseline', 'was', 'now', 'change'))
+    for name in sorted(results['results']):
+        old = baseline['results'].get(name)
+        if not old or not old['secs']:
+            continue
+        new    = results['results'][name]
+        change = 100. * (new['secs'] - old['secs']) / old['secs']
+        flag   = ''
+        if change > threshold:
+            slower.append(name)
+            flag = '  *** slower'
+        print('{:<28s} {:>9.3f} {:>9.3f} {:>+7.1f}%{}'.format(
+            name, old['secs'], new['secs'], change, flag))
+    if baseline.get('params') != results['params']:
+        print('*** baseline was run with different parameters: {}'.format(
+            baseline.get('params')))
+    return slower
+
+
+def parseargs():
+    parser = argparse.ArgumentParser(
+        description='tagcore/tagdump throughput benchmarks')
+
+    parser.add_argument('-V', '--version',
+                        action='version',
+                        version='%(prog)s ' + VERSION + ', core: ' + \
+                            str(CORE_REV) + '/' + str(CORE_MINOR))
+
+    parser.add_argument('-n', '--records',
+                        type=int,
+                        default=RECORDS,
+                        help='records per synthetic stream')
+
+    parser.add_argument('--seed',
+                        type=int,
+                        default=1,
+                        help='generator seed')
+
+    parser.add_argument('--sync-every',
+                        type=int,
+                        default=SYNC_EVERY,
+                        help='records between SYNCs')
+
+    parser.add_argument('--corrupt',
+                        type=float,
+                        default=CORRUPT,
+                        help='fraction of records damaged in the corrupt stream')
+
+    parser.add_argument('-r', '--repeat',
+                        type=int,
+                        default=REPEAT,
+                        help='runs per benchmark, best is kept')
+
+    parser.add_argument('-b', '--bench',
+                        type=lambda s: s.split(','),
+                        help='only run these benchmarks (decode is '
+                             'decode and decode/*)')
+
+    parser.add_argument('--tagdump',
+                        default='{} -m tagdump'.format(sys.executable),
+                        help='command used to run tagdump')
+
+    parser.add_argument('--jobs',
+                        type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='tagdump_jobs, worker processes')
+
+    parser.add_argument('--keep',
+                        metavar='DIR',
+                        help='generate streams into DIR and leave them')
+
+    parser.add_argument('-o', '--output',
+                        metavar='RESULTS',
+                        help='write results (JSON) to RESULTS')
+
+    parser.add_argument('--baseline',
+                        metavar='RESULTS',
+                        type=argparse.FileType('rb'),
+                        help='compare against an earlier -o RESULTS')
+
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=THRESHOLD,
+                        help='percent slower than baseline that fails')
+
+    return parser.parse_args()
+
+
+def main():
+    args  = parseargs()
+    bench = Bench(args)
+    try:
+        bench.setup()
+        print('*** {} records, {} bytes, seed {}, {} corrupt'.format(
+            len(bench.records), bench.nbytes, args.seed, bench.corrupted))
+        print_header()
+        bench.run()
+        results = {
+            'version':  RESULTS_VERSION,
+            'tagbench': VERSION,
+            'tagcore':  tagcore.__version__,
+            'core_rev': '{}/{}'.format(CORE_REV, CORE_MINOR),
+            'python':   platform.python_version(),
+            'platform': platform.platform(),
+            'cpus':     multiprocessing.cpu_count(),
+            'date':     time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'params':   bench.params(),
+            'results':  bench.results,
+        }
+    finally:
+        bench.close()
+
+    if args.output:
+        with open(args.output, 'wb') as fd:
+            json.dump(results, fd, indent = 2, sort_keys = True)
+    if args.baseline:
+        if compare(results, json.load(args.baseline), args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
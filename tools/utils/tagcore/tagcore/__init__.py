@@ -11,9 +11,12 @@ __all__ = [
     'buf_str',                          # misc_utils.py
     'dump_buf',
     'obj_dt_hdr',                       # core_header.py
+    'iter_records',                     # tagrecords.py
+    'merge_records',
 ]
 
 from    .core_rev       import CORE_REV
 from    .core_rev       import CORE_MINOR
 from    .misc_utils     import buf_str, dump_buf
 from    .core_headers   import obj_dt_hdr
+from    .tagrecords     import iter_records, merge_records
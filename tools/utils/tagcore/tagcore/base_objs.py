@@ -21,6 +21,7 @@
 
 '''base classes for defining record objects'''
 
+import sys
 import struct
 import copy
 from   collections import OrderedDict
@@ -41,7 +42,8 @@ class atom(object):
     optional 3-tuple: (..., ..., formating_function)
 
     set will set the instance.attribute "val" to the value
-    of the atom's decode of the buffer.
+    of the atom's decode of the buffer.  set_from does the same
+    starting at an offset into the buffer (no copy).
     '''
     def __init__(self, a_tuple):
         self.s_str = a_tuple[0]
@@ -73,22 +75,151 @@ class atom(object):
 
         return the number of bytes (size) consumed
         '''
-        self.val = self.s_rec.unpack(buf[:self.s_rec.size])[0]
+        return self.set_from(buf, 0)
+
+    def set_from(self, buf, offset = 0):
+        '''
+        set the atom.val from buf starting at offset.  buf can be
+        anything supporting the buffer interface (str, bytearray,
+        memoryview).
+
+        return the number of bytes (size) consumed
+        '''
+        self.val = self.s_rec.unpack_from(buf, offset)[0]
         return self.s_rec.size
 
     def build(self):
         return self.s_rec.pack(self.val)
 
 
+class aggie_layout(object):
+    '''
+    aggie_layout: flattened struct layout of an aggie tree.
+
+    walks an aggie (and any aggies nested in it) and collects every atom
+    in order.  Runs of atoms that share the same byte order are folded into
+    one struct.Struct so a complete record is decoded with one unpack_from
+    per run (typically one) rather than one unpack per atom.
+
+    segs:  list of (seg_offset, struct, [(atom, tuple_index), ...])
+    size:  total number of bytes covered by the layout.
+
+    compile() returns None if the tree can't be flattened.  This happens
+    for tlv aggies (the layout depends on the data) and for subclassed
+    atoms (which may override set).
+    '''
+
+    def __init__(self, segs, size):
+        self.segs = segs
+        self.size = size
+
+    @staticmethod
+    def atom_order(a_obj):
+        '''
+        return (byte_order, body) for an atom's struct string.
+
+        native strings (no prefix, '@' or '=') are folded into '<' on little
+        endian hosts as long as the standard size matches the native size.
+        byte_order is None if the atom must be unpacked on its own and '*'
+        if byte order doesn't matter (byte and string fields).
+        '''
+        s_str = a_obj.s_str
+        if s_str[:1] in ('@', '=', '<', '>', '!'):
+            order, body = s_str[0], s_str[1:]
+        else:
+            order, body = '@', s_str
+        if body.lstrip('0123456789') in ('b', 'B', 's', 'c', 'x', '?'):
+            return '*', body
+        if order == '!':
+            order = '>'
+        if order in '@=':
+            if sys.byteorder != 'little':
+                return None, s_str
+            if struct.calcsize('<' + body) != a_obj.s_rec.size:
+                return None, s_str
+            order = '<'
+        return order, body
+
+    @classmethod
+    def compile(cls, obj):
+        atoms = []
+        if not cls.flatten(obj, atoms):
+            return None
+
+        # byte/string fields take on the byte order of their neighbors
+        orders = [cls.atom_order(a_obj) for a_obj in atoms]
+        fixed  = [order for order, body in orders if order not in ('*', None)]
+        cur_order = fixed[0] if fixed else '<'
+        for i, (order, body) in enumerate(orders):
+            if order == '*':
+                orders[i] = (cur_order, body)
+            elif order is not None:
+                cur_order = order
+
+        segs      = []
+        seg_off   = 0
+        cur_order = None
+        cur_body  = ''
+        cur_flds  = []
+        cur_items = 0
+        offset    = 0
+        for a_obj, (order, body) in zip(atoms, orders):
+            if order != cur_order or order is None:
+                if cur_flds:
+                    segs.append((seg_off, struct.Struct(cur_order + cur_body
+                                 if cur_order else cur_body), cur_flds))
+                seg_off   = offset
+                cur_order = order
+                cur_body  = ''
+                cur_flds  = []
+                cur_items = 0
+            cur_flds.append((a_obj, cur_items))
+            cur_body  += body
+            cur_items += len(a_obj.s_rec.unpack('\0' * a_obj.s_rec.size))
+            offset    += a_obj.s_rec.size
+        if cur_flds:
+            segs.append((seg_off, struct.Struct(cur_order + cur_body
+                         if cur_order else cur_body), cur_flds))
+        return cls(segs, offset)
+
+    @staticmethod
+    def flatten(obj, atoms):
+        for key, v_obj in obj.iteritems():
+            if isinstance(v_obj, tlv_aggie) or isinstance(v_obj, tlv_block_aggie):
+                return False
+            if isinstance(v_obj, aggie):
+                if not aggie_layout.flatten(v_obj, atoms):
+                    return False
+            elif isinstance(v_obj, atom):
+                if type(v_obj) is not atom:
+                    return False
+                atoms.append(v_obj)
+        return True
+
+    def set_from(self, buf, offset = 0):
+        for seg_off, s_rec, flds in self.segs:
+            vals = s_rec.unpack_from(buf, offset + seg_off)
+            for a_obj, idx in flds:
+                a_obj.val = vals[idx]
+        return self.size
+
+
 class aggie(OrderedDict):
     '''
     aggie: aggregation node.
     takes one parameter a dictionary of key -> {atom | aggie}
+
+    the first set() compiles the tree into an aggie_layout which is used
+    from then on.  Record layouts are fixed once built, atoms must not
+    be added or replaced after the first set().
     '''
     def __init__(self, a_dict):
+        self._layout = None
         super(aggie, self).__init__(a_dict)
 
     def __len__(self):
+        if self._layout:
+            return self._layout.size
         l = 0
         for key, v_obj in self.iteritems():
             if isinstance(v_obj, atom) or isinstance(v_obj, aggie):
@@ -111,9 +242,23 @@ class aggie(OrderedDict):
         return s
 
     def set(self, buf):
+        return self.set_from(buf, 0)
+
+    def set_from(self, buf, offset = 0):
+        '''
+        populate the tree from buf starting at offset.  No slices of
+        buf are made, nested objects are handed the same buf and their
+        own offset.
+
+        return the number of bytes consumed
+        '''
+        if self._layout is None:
+            self._layout = aggie_layout.compile(self) or False
+        if self._layout:
+            return self._layout.set_from(buf, offset)
         consumed = 0
         for key, v_obj in self.iteritems():
-            consumed += v_obj.set(buf[consumed:])
+            consumed += v_obj.set_from(buf, offset + consumed)
         return consumed
 
     def build(self):
@@ -141,14 +286,17 @@ class tlv_aggie(aggie):
         super(tlv_aggie, self).__init__(a_dict)
 
     def set(self, buf):
+        return self.set_from(buf, 0)
+
+    def set_from(self, buf, offset = 0):
         #
         # a tlv_aggie object, when created, has definitions for the
         # tlv_type and tlv_len.  Using tlv_len, we can suck the appropriate
         # number of bytes as tlv_value.
         #
-        tlv_type  = buf[0]
-        tlv_len   = buf[1]
-        tlv_value = buf[2: tlv_len]
+        tlv_type  = buf[offset]
+        tlv_len   = buf[offset + 1]
+        tlv_value = buf[offset + 2: offset + tlv_len]
         self['tlv_type'].val  = tlv_type
         self['tlv_len'].val   = tlv_len
         self['tlv_value'].val = tlv_value
@@ -195,22 +343,22 @@ class tlv_block_aggie(aggie):
         self.cur_block_len = 0
         super(tlv_block_aggie, self).__init__(a_dict)
 
-    def set(self, buf):
-        consumed = super(tlv_block_aggie, self).set(buf)
+    def set_from(self, buf, offset = 0):
+        consumed = super(tlv_block_aggie, self).set_from(buf, offset)
         tlv_consumed = 0
         while True:
-            if consumed >= len(buf) or buf[consumed] == '\0':
+            if offset + consumed >= len(buf) or buf[offset + consumed] == '\0':
                 break;
             # first, peek, 1st byte tlv_type, 2nd tlv_len
             # we need tlv_len to properly build the tlv_aggie.
-            tlv_type = buf[consumed]
-            tlv_len  = buf[consumed + 1]
+            tlv_type = buf[offset + consumed]
+            tlv_len  = buf[offset + consumed + 1]
             tlv = tlv_aggie(aggie(OrderedDict([
                 ('tlv_type',  atom(('<B', '{}'))),
                 ('tlv_len',   atom(('<B', '{}'))),
                 ('tlv_value', atom(('{}s'.format(tlv_len - 2), '{}'))),
             ])))
-            consumed += tlv.set(buf[consumed:])
+            consumed += tlv.set_from(buf, offset + consumed)
             tlv_type  = tlv['tlv_type'].val
             self.tlv_blocks[tlv_type] = tlv
 
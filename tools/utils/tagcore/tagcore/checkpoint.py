@@ -0,0 +1,146 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+processing checkpoints for append only dblk files
+
+A Checkpoint remembers how far through a dblk file we got: the offset
+to carry on from, the offset and recnum of the last record processed
+(so a later run can check the file still holds what we saw) and any
+running counters the caller wants kept.  It is saved as a small JSON
+state file, written to a temp file and renamed into place so a crash
+never leaves a half written checkpoint.
+
+    ckpt = Checkpoint.load(state_name, 'dblk/DBLK0004')
+    if ckpt is None:
+        ckpt = Checkpoint(state_name, 'dblk/DBLK0004')
+    ...
+    ckpt.offset, ckpt.last_offset, ckpt.recnum = ...
+    ckpt.counts['total_records'] = ...
+    ckpt.tables['dt_count'] = dtd.dt_count
+    ckpt.save()
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'Checkpoint',
+]
+
+import os
+import json
+
+from   .misc_utils  import eprint
+
+CKPT_VERSION    = 1
+
+
+def int_keys(d):
+    '''json turns int keys into strings, turn them back'''
+    out = {}
+    for k, v in d.iteritems():
+        try:
+            k = int(k)
+        except ValueError:
+            pass
+        out[k] = v
+    return out
+
+
+class Checkpoint(object):
+    '''
+    state file for resuming processing of a dblk file
+
+    inputs:     name        state file name
+                src         dblk file the state belongs to
+
+    attrs:      offset      where to carry on (next record)
+                last_offset offset of the last record processed
+                recnum      its record number
+                counts      dict of counter name -> value
+                tables      dict of table name -> dict (keys may be ints)
+                extra       dict, anything else (json-able)
+
+    methods:    load        (classmethod) read a state file, None if
+                            missing, for another file, or the file has
+                            shrunk below offset.
+                save        write it.
+    '''
+
+    def __init__(self, name, src):
+        super(Checkpoint, self).__init__()
+        self.name        = name
+        self.src         = os.path.realpath(src)
+        self.offset      = 0
+        self.last_offset = 0
+        self.recnum      = 0
+        self.counts      = {}
+        self.tables      = {}
+        self.extra       = {}
+
+    @classmethod
+    def load(cls, name, src):
+        try:
+            with open(name, 'rb') as fd:
+                state = json.load(fd)
+            size = os.path.getsize(src)
+        except (IOError, OSError):
+            return None
+        except ValueError:
+            eprint('*** checkpoint: {} unreadable, ignored'.format(name))
+            return None
+        ckpt = cls(name, src)
+        if state.get('version') != CKPT_VERSION:
+            eprint('*** checkpoint: {} bad version, ignored'.format(name))
+            return None
+        if state.get('src') != ckpt.src:
+            eprint('*** checkpoint: {} is for {}, ignored'.format(
+                name, state.get('src')))
+            return None
+        if state['offset'] > size:
+            eprint('*** checkpoint: {} is stale (file shrank), ignored'.format(
+                name))
+            return None
+        ckpt.offset      = state['offset']
+        ckpt.last_offset = state['last_offset']
+        ckpt.recnum      = state['recnum']
+        ckpt.counts      = state.get('counts', {})
+        ckpt.tables      = dict([ (k, int_keys(v)) for k, v in
+                                  state.get('tables', {}).iteritems() ])
+        ckpt.extra       = state.get('extra', {})
+        return ckpt
+
+    def save(self):
+        state = {
+            'version':     CKPT_VERSION,
+            'src':         self.src,
+            'offset':      self.offset,
+            'last_offset': self.last_offset,
+            'recnum':      self.recnum,
+            'counts':      self.counts,
+            'tables':      self.tables,
+            'extra':       self.extra,
+        }
+        tmp = self.name + '.tmp'
+        with open(tmp, 'wb') as fd:
+            json.dump(state, fd, sort_keys = True)
+        os.rename(tmp, self.name)
+        return self.name
@@ -47,6 +47,7 @@ import ubx_defs     as     ubx
 from   misc_utils   import dump_buf
 from   misc_utils   import rtc2datetime
 from   misc_utils   import rtctime_full
+from   output_sinks import oprint
 
 from   sensor_defs  import *
 import sensor_defs  as     sensor
@@ -146,7 +147,7 @@ def emit_reboot(level, offset, buf, obj):
     base     = obj['base'].val
     node_id  = obj['node_id'].val
     if core_rev != CORE_REV or core_minor != CORE_MINOR:
-        print('*** version mismatch, expected {:d}/{:d}, got {:d}/{:d}'.format(
+        oprint('*** version mismatch, expected {:d}/{:d}, got {:d}/{:d}'.format(
             CORE_REV, CORE_MINOR, core_rev, core_minor))
 
     owcb         = obj['owcb']
@@ -175,46 +176,46 @@ def emit_reboot(level, offset, buf, obj):
     rtc_src      = owcb['rtc_src'].val
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
-    print(rbt0.format(base_name(from_base), base_name(base),
-                      ow_boot_mode_name(boot_mode),
-                      reboot_reason_name(owcb['reboot_reason'].val)))
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
+    oprint(rbt0.format(base_name(from_base), base_name(base),
+                       ow_boot_mode_name(boot_mode),
+                       reboot_reason_name(owcb['reboot_reason'].val)))
 
     # any weird failures?  Always report
     if (chk_fails or fault_gold or fault_nib or ss_dis):
-        print('*** chkfails: {}  fault/g: {:08x}  fault/n: {:08x}  ss_dis: {:08x}'.format(
+        oprint('*** chkfails: {}  fault/g: {:08x}  fault/n: {:08x}  ss_dis: {:08x}'.format(
             chk_fails, fault_gold, fault_nib, ss_dis))
 
-    print(rbt0a.format(
+    oprint(rbt0a.format(
         reboot_reason_name(owcb['reboot_reason'].val),
         base_name(from_base), base_name(base),
         ow_boot_mode_name(owcb['ow_boot_mode'].val),
         reboot_count, panics_gold, panic_count, chk_fails))
-    print(rbt0b.format(rtctime_full(boot_time), core_rev, core_minor,
-                       hexlify(node_id)))
+    oprint(rbt0b.format(rtctime_full(boot_time), core_rev, core_minor,
+                        hexlify(node_id)))
 
     if owcb['reboot_reason'].val == REASON_PANIC:
-        print(rbt_p.format(pi_idx, pi_pcode, pi_where,
-                           pi_arg0, pi_arg1, pi_arg2, pi_arg3))
+        oprint(rbt_p.format(pi_idx, pi_pcode, pi_where,
+                            pi_arg0, pi_arg1, pi_arg2, pi_arg3))
 
     if (level >= 2):                    # detailed display (level 2)
-        print()
-        print(rbt2a.format(owcb['ow_sig'].val,
-                   owcb['ow_sig_b'].val, owcb['ow_sig_c'].val))
-        print(rbt2b.format(from_base, base))
-        print(rbt2c.format(owcb['rpt'].val, owcb['reset_status'].val,
-              owcb['reset_others'].val))
-        print(rbt2d.format(fault_gold, fault_nib, ss_dis, protec_stat))
-        print(rbt2e.format(reboot_count, panics_gold, panic_count,
-                           owcb['strange'].val,
-                           owcb['strange_loc'].val))
-        print(rbt2f.format(rtctime_full(owcb['prev_boot']),
-                           rtc2datetime(boot_time) - rtc2datetime(prev_boot)))
-        print(rbt2g.format(owcb['reboot_reason'].val,
-                           owcb['ow_req'].val,
-                           owcb['ow_boot_mode'].val,
-                           owcb['owt_action'].val))
+        oprint()
+        oprint(rbt2a.format(owcb['ow_sig'].val,
+                    owcb['ow_sig_b'].val, owcb['ow_sig_c'].val))
+        oprint(rbt2b.format(from_base, base))
+        oprint(rbt2c.format(owcb['rpt'].val, owcb['reset_status'].val,
+               owcb['reset_others'].val))
+        oprint(rbt2d.format(fault_gold, fault_nib, ss_dis, protec_stat))
+        oprint(rbt2e.format(reboot_count, panics_gold, panic_count,
+                            owcb['strange'].val,
+                            owcb['strange_loc'].val))
+        oprint(rbt2f.format(rtctime_full(owcb['prev_boot']),
+                            rtc2datetime(boot_time) - rtc2datetime(prev_boot)))
+        oprint(rbt2g.format(owcb['reboot_reason'].val,
+                            owcb['ow_req'].val,
+                            owcb['ow_boot_mode'].val,
+                            owcb['owt_action'].val))
 
 
 ################################################################
@@ -279,25 +280,25 @@ def emit_version(level, offset, buf, obj):
 #    stamp_date = stamp_date[:stamp_date.index('\0')]
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
-    print(ver0.format(base_name(base), ver_str, model_name(model), rev))
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
+    oprint(ver0.format(base_name(base), ver_str, model_name(model), rev))
     if (level >= 1):
-        print(ver1a.format(ver_str, model, rev, model_name(model), rev,
-                           base, ii['basic']['im_start'].val))
+        oprint(ver1a.format(ver_str, model, rev, model_name(model), rev,
+                            base, ii['basic']['im_start'].val))
 
     if (level >= 2):
-        print()
-        print(ver2a)
-        print(ver2b)
-        print(ver2b0)
-        print(ver2c)
-        print(ver2c0)
-        print(ver2d.format(ii['basic']['im_start'].val,
-                       ii['basic']['im_len'].val,
-                       ii['basic']['im_len'].val))
-        print(ver2e.format(ii['basic']['ii_sig'].val,
-                           ii['basic']['im_chk'].val))
+        oprint()
+        oprint(ver2a)
+        oprint(ver2b)
+        oprint(ver2b0)
+        oprint(ver2c)
+        oprint(ver2c0)
+        oprint(ver2d.format(ii['basic']['im_start'].val,
+                        ii['basic']['im_len'].val,
+                        ii['basic']['im_len'].val))
+        oprint(ver2e.format(ii['basic']['ii_sig'].val,
+                            ii['basic']['im_chk'].val))
 
 
 ################################################################
@@ -322,13 +323,13 @@ def emit_sync(level, offset, buf, obj):
     prev     = obj['prev_sync'].val
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
-    print(sync0.format(prev, prev))
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
+    oprint(sync0.format(prev, prev))
 
     if (level >= 1):
-        print(sync1a.format(majik, prev, prev))
-        print(sync1b.format())
+        oprint(sync1a.format(majik, prev, prev))
+        oprint(sync1b.format())
 
 
 ################################################################
@@ -356,18 +357,18 @@ def emit_event(level, offset, buf, obj):
     w     = obj['w'].val
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
 
     if (level >= 1):
-        print(event1.format(event_name(event), event,
-                            arg0, arg1, arg2, arg3,
-                            arg0, arg1, arg2, arg3))
+        oprint(event1.format(event_name(event), event,
+                             arg0, arg1, arg2, arg3,
+                             arg0, arg1, arg2, arg3))
 
     if (event == PANIC_WARN):
         # special case, print PANIC_WARNs always, full display
-        print(' {} {}/{}'.format(event_name(event), pcode, w))
-        print('    {} {} {} {}  x({:04x} {:04x} {:04x} {:04x})'.format(
+        oprint(' {} {}/{}'.format(event_name(event), pcode, w))
+        oprint('    {} {} {} {}  x({:04x} {:04x} {:04x} {:04x})'.format(
             arg0, arg1, arg2, arg3, arg0, arg1, arg2, arg3))
         return
 
@@ -376,7 +377,7 @@ def emit_event(level, offset, buf, obj):
         arg0 = c_int32(arg0).value/10000000.
         arg1 = c_int32(arg1).value/10000000.
         arg3 = arg3/1000.
-        print(' {:14s}  {:10.7f}  {:10.7f}  wk/tow: {}/{}'.format(
+        oprint(' {:14s}  {:10.7f}  {:10.7f}  wk/tow: {}/{}'.format(
             event_name(event), arg0, arg1, arg2, arg3))
         return
 
@@ -385,7 +386,7 @@ def emit_event(level, offset, buf, obj):
         arg1 = c_int32(arg1).value
         arg2 = c_int32(arg2).value
         arg3 = c_int32(arg3).value
-        print(' {:14s} {} - x: {}  y: {}  z: {}'.format(
+        oprint(' {:14s} {} - x: {}  y: {}  z: {}'.format(
             event_name(event), arg0, arg1, arg2, arg3))
         return
 
@@ -397,7 +398,7 @@ def emit_event(level, offset, buf, obj):
         hr   = (arg1 >> 8)  & 0xff
         xmin =  arg1        & 0xff
         secs =  arg2 / 1000.
-        print(' {:14s} UTC: {}/{:02}/{:02} {:2}:{:02}:{}'.format(
+        oprint(' {:14s} UTC: {}/{:02}/{:02} {:2}:{:02}:{}'.format(
             event_name(event), year, mon, day, hr, xmin,
             '{:.3f}'.format(secs).zfill(6)))
         return
@@ -414,7 +415,7 @@ def emit_event(level, offset, buf, obj):
         arg1 = c_int32(arg1).value
         arg2 = c_int32(arg2).value
         arg3 = c_int32(arg3).value
-        print(' {:14s} adj: {}  delta: {} ({}/{})'.format(
+        oprint(' {:14s} adj: {}  delta: {} ({}/{})'.format(
             event_name(event), arg0, arg1, arg2, arg3))
         return
 
@@ -423,17 +424,17 @@ def emit_event(level, offset, buf, obj):
         src_old   = arg2
         delta1000 = c_int32(arg1).value
         l         = arg3
-        print(' {:14s} {}  ->  {}  ({:.3f})  l: {}'.format(event_name(event),
-                rtc_src_name(src_old),
-                rtc_src_name(src_new),
-                delta1000/1000.,
-                l))
+        oprint(' {:14s} {}  ->  {}  ({:.3f})  l: {}'.format(event_name(event),
+                 rtc_src_name(src_old),
+                 rtc_src_name(src_new),
+                 delta1000/1000.,
+                 l))
         return
 
     if event == IMG_MGR:
-        print(' {:14s} {:6s} 0x{:x} 0x{:x} {}'.format(
+        oprint(' {:14s} {:6s} 0x{:x} 0x{:x} {}'.format(
             event_name(event), img_mgr_event_name(arg0),
-                        arg1, arg2, arg3))
+                         arg1, arg2, arg3))
         return
 
     if event == TIME_SKEW:
@@ -441,26 +442,26 @@ def emit_event(level, offset, buf, obj):
         new_s = arg1
         delta1000 = c_int32(arg2).value
         skew = arg3
-        print(' {:14s} {}  ->  {}  ({:.3f})  {}'.format(event_name(event),
-                        cur_s, new_s, delta1000/1000., skew))
+        oprint(' {:14s} {}  ->  {}  ({:.3f})  {}'.format(event_name(event),
+                         cur_s, new_s, delta1000/1000., skew))
         return
 
     if event == SD_ON:
-        print(' {:14s} ({})                  max: {:7}'.format(event_name(event),
-                       arg0, arg3))
+        oprint(' {:14s} ({})                  max: {:7}'.format(event_name(event),
+                        arg0, arg3))
         return
 
     if event == SD_OFF:
-        print(' {:14s} ({})  on: {:7} us  avg: {:7} us'.format(event_name(event),
-                       arg0, arg1, arg2))
+        oprint(' {:14s} ({})  on: {:7} us  avg: {:7} us'.format(event_name(event),
+                        arg0, arg1, arg2))
         return
 
     if (event == RADIO_MODE):
         # args old_major, new_major, new_minor, reason
-        print(' RADIO_MODE     {} -> {} ({}) {}'.format(radio_major_name(arg0),
-                                                       radio_major_name(arg1),
-                                                       radio_minor_name(arg2),
-                                                       arg3))
+        oprint(' RADIO_MODE     {} -> {} ({}) {}'.format(radio_major_name(arg0),
+                                                        radio_major_name(arg1),
+                                                        radio_minor_name(arg2),
+                                                        arg3))
         return
 
 
@@ -468,41 +469,41 @@ def emit_event(level, offset, buf, obj):
         cur_s     = arg0
         new_s     = arg1
         delta1000 = c_int32(arg2).value
-        print(' {:14s}   {} -> {}  ({:.3f})  {}'.format(event_name(event),
+        oprint(' {:14s}   {} -> {}  ({:.3f})  {}'.format(event_name(event),
             cur_s, new_s, delta1000/1000., arg3))
         return
 
 
     if (event == GPS_MON_MINOR):
-        print(' gps/mon (MINOR) {:^15s} {:>12s} -> {}'.format(
+        oprint(' gps/mon (MINOR) {:^15s} {:>12s} -> {}'.format(
             '<{}>'.format(gps_mon_event_name(arg2)),
             gps_mon_minor_name(arg0),
             gps_mon_minor_name(arg1)))
         return
 
     if (event == GPS_MON_MAJOR):
-        print(' gps/mon (MAJOR) {:^15s} {:>12s} -> {}'.format(
+        oprint(' gps/mon (MAJOR) {:^15s} {:>12s} -> {}'.format(
             '<{}>'.format(gps_mon_event_name(arg2)),
             gps_mon_major_name(arg0),
             gps_mon_major_name(arg1)))
         return
 
     if (event == GPS_CMD):
-        print(' GPS_CMD ({:s}) {} {} {} {}'.format(
+        oprint(' GPS_CMD ({:s}) {} {} {} {}'.format(
             gps_cmd_name(arg0), arg0, arg1, arg2, arg3))
         return
 
     if event == GPS_RX_ERR:
-        print(' GPS_RX_ERR: 0x{:02x}  nerr delta: {}  state: {}'.format(
+        oprint(' GPS_RX_ERR: 0x{:02x}  nerr delta: {}  state: {}'.format(
             arg0, arg1 - arg2, arg3))
         return
 
     if event == GPS_MPM_RSP:
-        print(' GPS_MPM_RSP    0x{:04x} ({}) {} {}'.format(
+        oprint(' GPS_MPM_RSP    0x{:04x} ({}) {} {}'.format(
             arg0, arg1, arg2, arg3))
         return
 
-    print(event0.format(event_name(event), arg0, arg1, arg2, arg3))
+    oprint(event0.format(event_name(event), arg0, arg1, arg2, arg3))
 
 
 ################################################################
@@ -522,9 +523,9 @@ def emit_debug(level, offset, buf, obj):
     brt      = secsFromHour_str(rtctime)
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
-    print(debug0.format())
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
+    oprint(debug0.format())
 
 
 ################################################################
@@ -541,7 +542,7 @@ def emit_gps_version(level, offset, buf, obj):
     brt      = secsFromHour_str(rtctime)
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype, dt_name(xtype)))
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype, dt_name(xtype)))
 #    if (level >= 1):
 #        print('    {}'.format(obj['sirf_swver']))
 
@@ -567,10 +568,10 @@ def emit_gps_time(level, offset, buf, obj):
     ms     = ms - secs * 1000
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
 
-    print('  UTC: {}/{:02}/{:02} {:2}:{:02}:{:02}.{:03}  {}/{:4.3f}         [{}]'.format(
+    oprint('  UTC: {}/{:02}/{:02} {:2}:{:02}:{:02}.{:03}  {}/{:4.3f}         [{}]'.format(
         year, mon, day, hr, xmin, secs, ms, week_x, tow, nsats))
 
 
@@ -602,10 +603,10 @@ def emit_gps_geo(level, offset, buf, obj):
     fix_str = gps_fix_name(fix)
     fix_str = 'nofix_OD' if fix == 0 and nav_valid == 0 else fix_str
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
 
-    print('   {:10.7f}  {:10.7f}      {}/{:4.3f}  {:5}  [{}]'.format(
+    oprint('   {:10.7f}  {:10.7f}      {}/{:4.3f}  {:5}  [{}]'.format(
         lat, lon, week_x, tow, fix_str, nsats))
 
     if (level >= 1):
@@ -613,10 +614,10 @@ def emit_gps_geo(level, offset, buf, obj):
         alt_msl_ft = alt_msl * 3.28084
         # if nav_valid nonzero we don't have a valid fix (no lock)
         valid_str  = 'valid: x{:04x}  '.format(nav_valid) if nav_valid else ''
-        print('    {}type: x{:04x}  ehpe: {}  hdop: {:4.1f}  [{}] ({:08x})'.format(
+        oprint('    {}type: x{:04x}  ehpe: {}  hdop: {:4.1f}  [{}] ({:08x})'.format(
             valid_str, nav_type, ehpe, hdop, gps_expand_satmask(satmask),
             satmask), end = '')
-        print('  msl: {:3.1f} ({:3.1f})'.format(alt_msl_ft, alt_msl))
+        oprint('  msl: {:3.1f} ({:3.1f})'.format(alt_msl_ft, alt_msl))
 
 
 def emit_gps_xyz(level, offset, buf, obj):
@@ -639,17 +640,17 @@ def emit_gps_xyz(level, offset, buf, obj):
     nsats = obj['nsats'].val
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
 
     fix     = m1 & GPS_FIX_MASK
     fix_str = gps_fix_name(fix)
-    print('   {}/{}/{}     {}/{:4.3f}  {:6} [{}]'.format(
+    oprint('   {}/{}/{}     {}/{:4.3f}  {:6} [{}]'.format(
         x, y, z, weekx, tow, fix_str, nsats))
 
     if (level >= 1):
-        print('    ',  end = '')
-        print('m1: {:02x}  hdop: {:4.1f}  [{}]  ({:08x})'.format(
+        oprint('    ',  end = '')
+        oprint('m1: {:02x}  hdop: {:4.1f}  [{}]  ({:08x})'.format(
             m1, hdop, gps_expand_satmask(sats), sats))
 
 
@@ -684,13 +685,13 @@ def emit_gps_trk(level, offset, buf, obj):
     xavg = xavg/nz_sats if nz_sats != 0.0 else 0.0
     if sat_min >= 50.0: sat_min = 0
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
-    print('  {}/{}  {:4.1f}  {:4.1f}  {:4.1f}'.format(
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
+    oprint('  {}/{}  {:4.1f}  {:4.1f}  {:4.1f}'.format(
         good_sats, nz_sats, sat_min, xavg, sat_max))
 
     if level >= 1:
-        print('    NAV_TRACK: {}/{:.3f}s  chans: {}'.format(
+        oprint('    NAV_TRACK: {}/{:.3f}s  chans: {}'.format(
             week10, tow, chans))
         for n in range(chans):
             svid    = obj[n]['svid']
@@ -699,11 +700,11 @@ def emit_gps_trk(level, offset, buf, obj):
             state   = obj[n]['state']
             cno_avg = obj[n]['cno_avg']
             if cno_avg > 0.0 or level >= 2:
-                print('    {:3}: az: {:5.1f}  el: {:5.1f}  {:#04x} {:8}  cno: {:4.1f}'.format(
+                oprint('    {:3}: az: {:5.1f}  el: {:5.1f}  {:#04x} {:8}  cno: {:4.1f}'.format(
                     svid, az, el, state, gps_expand_trk_state_short(state), cno_avg))
 
     if level >= 2:
-        print()
+        oprint()
         for n in range(chans):
             svid    = obj[n]['svid']
             az      = obj[n]['az10']/10.0
@@ -712,11 +713,11 @@ def emit_gps_trk(level, offset, buf, obj):
             cno_str = ''
             for i in range(10):
                 cno_str += ' {:2}'.format(obj[n]['cno'+str(i)])
-            print('    {:3}: az: {:5.1f}  el: {:5.1f}  {:#04x} {:8}  cno/s: {}'.format(
+            oprint('    {:3}: az: {:5.1f}  el: {:5.1f}  {:#04x} {:8}  cno/s: {}'.format(
                 svid, az, el, state, gps_expand_trk_state_short(state), cno_str))
             if state:
-                print('                                    ', end='')
-                print('{}'.format(gps_expand_trk_state_long(state)))
+                oprint('                                    ', end='')
+                oprint('{}'.format(gps_expand_trk_state_long(state)))
 
 
 def emit_gps_clk(level, offset, buf, obj):
@@ -734,13 +735,13 @@ def emit_gps_clk(level, offset, buf, obj):
     bias     = obj['bias'].val
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
-    print('  {}/{:.3f}  {}hz  {}ns  [{}]'.format(
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
+    oprint('  {}/{:.3f}  {}hz  {}ns  [{}]'.format(
         weekx, tow, drift, bias, nsats))
 
     if level >= 1:
-        print('    CLK_STATUS: capture: {}us  drift: {}hz  bias: {}ns'.format(
+        oprint('    CLK_STATUS: capture: {}us  drift: {}hz  bias: {}ns'.format(
             capdelta, drift, bias))
 
 
@@ -760,11 +761,11 @@ def emit_sensor_data(level, offset, buf, obj):
 
     dt_sns_id = xtype
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
 
     v = sensor.sns_table.get(dt_sns_id, ('', None, None, None, None, ''))
-    print('  {:s}'.format(sns_val_str(dt_sns_id)))
+    oprint('  {:s}'.format(sns_val_str(dt_sns_id)))
 
     sensor_obj = v[SNS_OBJECT]
     emitters   = v[SNS_EMITTERS]
@@ -772,7 +773,7 @@ def emit_sensor_data(level, offset, buf, obj):
     if level >= 1:
         sns_str = sns_val_str(dt_sns_id, level)
         if len(sns_str) > 0:
-            print('{}'.format(sns_str))
+            oprint('{}'.format(sns_str))
         if emitters:
             for e in emitters:
                 e(level, offset, buf[len(obj):], sensor_obj)
@@ -780,9 +781,9 @@ def emit_sensor_data(level, offset, buf, obj):
 def emit_sensor_set(level, offset, buf, obj):
     dump_hdr(offset, buf)
     if (level >= 1):
-        print(obj)
+        oprint(obj)
         print_hdr_obj(obj)
-        print()
+        oprint()
 
 
 ################################################################
@@ -801,9 +802,9 @@ def emit_test(level, offset, buf, obj):
     brt      = secsFromHour_str(rtctime)
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
-    print(test0.format())
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
+    oprint(test0.format())
 
 
 ################################################################
@@ -828,11 +829,11 @@ def emit_note(level, offset, buf, obj):
     note     = note.rstrip()
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
+                       dt_name(xtype)), end = '')
     if (len(note) > 44):
-        print()
-    print('    {}'.format(note))
+        oprint()
+    oprint('    {}'.format(note))
 
 
 ################################################################
@@ -851,9 +852,9 @@ def emit_config(level, offset, buf, obj):
     brt      = secsFromHour_str(rtctime)
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
-                      dt_name(xtype)), end = '')
-    print(cfg0.format())
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
+                       dt_name(xtype)), end = '')
+    oprint(cfg0.format())
 
 
 ########################################################################
@@ -872,8 +873,8 @@ def emit_gps_proto_stats(level, offset, buf, obj):
     brt      = secsFromHour_str(rtctime)
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
+                       dt_name(xtype)), end = '')
     stats               =   obj['stats']
     starts              = stats['starts'].val
     complete            = stats['complete'].val
@@ -889,11 +890,11 @@ def emit_gps_proto_stats(level, offset, buf, obj):
     rx_parity           = stats['rx_parity'].val
     proto_start_fail    = stats['proto_start_fail'].val
     proto_end_fail      = stats['proto_end_fail'].val
-    print('  e: {}  r: {}  f: {}  o: {}'.format(rx_errors, resets,
-                                             rx_framing, rx_overrun))
+    oprint('  e: {}  r: {}  f: {}  o: {}'.format(rx_errors, resets,
+                                              rx_framing, rx_overrun))
     if level >= 1:
-        print('    ubx stats:  t/o chk err frm ovr par rst  proto    </>     ign')
-        print('    {:5d}/{:<5d} {:3d} {:3d} {:3d} {:3d} {:3d} {:3d} {:3d} {:3d}/{:<3d} {:3d}/{:<3d} {:5d}'.format(
+        oprint('    ubx stats:  t/o chk err frm ovr par rst  proto    </>     ign')
+        oprint('    {:5d}/{:<5d} {:3d} {:3d} {:3d} {:3d} {:3d} {:3d} {:3d} {:3d}/{:<3d} {:3d}/{:<3d} {:5d}'.format(
             complete,   starts,           rx_timeouts,    chksum_fail,
             rx_errors,  rx_framing,       rx_overrun,     rx_parity,
             resets,     proto_start_fail, proto_end_fail,
@@ -917,14 +918,14 @@ def emit_gps_raw(level, offset, buf, obj):
     dir_str  = 'rx' if dir_bit == 0 else 'tx'
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)), end = '')
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)), end = '')
 
     index = len(obj) - len(obj['ubx_hdr'])
     if buf[index] == ord('$'):
-        print(' -- NMEA <{:2}> [{:s}]'.format(dir_str, buf[index+1:index+6]))
+        oprint(' -- NMEA <{:2}> [{:s}]'.format(dir_str, buf[index+1:index+6]))
         if (level >= 1):
-            print('    {:s}'.format(buf[index:].rstrip('\r\n\x00')))
+            oprint('    {:s}'.format(buf[index:].rstrip('\r\n\x00')))
 
     if (obj['ubx_hdr']['start'].val != UBX_SOP_SEQ):
         print
@@ -939,13 +940,13 @@ def emit_gps_raw(level, offset, buf, obj):
     decoder_obj = v[CID_OBJECT]         # object
     cid_name    = v[CID_NAME]
 
-    print(' -- UBX: <{:2}> [{:s}]<{:04x}> ({:02x})'.format(
+    oprint(' -- UBX: <{:2}> [{:s}]<{:04x}> ({:02x})'.format(
         dir_str, cid_name, cid, ubx_len), end = '')
 
     if not emitters or len(emitters) == 0:
-        print()
+        oprint()
         if (level >= 5):
-            print('*** no emitters defined for cid {:04X}'.format(cid))
+            oprint('*** no emitters defined for cid {:04X}'.format(cid))
         return
     for e in emitters:
         e(level, offset, buf[len(obj):], decoder_obj)
@@ -960,6 +961,6 @@ def emit_tagnet(level, offset, buf, obj):
     brt      = secsFromHour_str(rtctime)
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
-                      dt_name(xtype)), end = '')
-    print()
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,         # sans nl
+                       dt_name(xtype)), end = '')
+    oprint()
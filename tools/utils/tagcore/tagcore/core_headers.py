@@ -29,6 +29,7 @@ import binascii
 from   collections  import OrderedDict
 
 from   base_objs    import *
+from   output_sinks import oprint
 from   ubx_headers  import obj_ubx_hdr
 
 from   sensor_defs  import *
@@ -62,6 +63,7 @@ import tagcore.globals as  g
 # o dt_sns_id is embedded in the dtype field.
 # o extract the appropriate vector from sns_table[dt_sns_id]
 # o consume/process the sensor data using decode/obj from the vector entry
+#   the sensor decoder is handed a memoryview of the remaining data, no copy.
 
 def decode_sensor(level, offset, buf, obj):
     consumed = obj.set(buf)
@@ -75,9 +77,10 @@ def decode_sensor(level, offset, buf, obj):
     decoder_obj = v[SNS_OBJECT]             # sns object
     if not decoder:
         if level >= 5 or g.debug:
-            print('*** no decoder/obj defined for sns {}'.format(dt_sns_id))
+            oprint('*** no decoder/obj defined for sns {}'.format(dt_sns_id))
         return consumed
-    return consumed + decoder(level, offset, buf[consumed:], decoder_obj)
+    return consumed + decoder(level, offset, memoryview(buf)[consumed:],
+                              decoder_obj)
 
 
 # GPS RAW decoder
@@ -98,6 +101,7 @@ def decode_sensor(level, offset, buf, obj):
 # UbxBin packet:
 # o Look class/id in cid_table
 # o consume/process the remainder of the packet using the appropriate decoder
+#   (handed a memoryview of the remainder, no copy)
 
 def decode_gps_raw(level, offset, buf, obj):
     consumed = obj.set(buf)
@@ -117,9 +121,10 @@ def decode_gps_raw(level, offset, buf, obj):
     decoder_obj = v[CID_OBJECT]         # cid object
     if not decoder:
         if level >= 5 or g.debug:
-            print('*** no decoder/obj defined for class/id {:04X}'.format(cid))
+            oprint('*** no decoder/obj defined for class/id {:04X}'.format(cid))
         return consumed
-    return consumed + decoder(level, offset, buf[consumed:], decoder_obj)
+    return consumed + decoder(level, offset, memoryview(buf)[consumed:],
+                              decoder_obj)
 
 
 ########################################################################
@@ -584,7 +589,7 @@ def decode_gps_trk(level, offset, buf, obj):
     # grab each channels cnos and other data
     for n in range(chans):
         d = {}                      # get a new dict
-        consumed += gps_navtrk_chan.set(buf[consumed:])
+        consumed += gps_navtrk_chan.set_from(buf, consumed)
         for k, v in gps_navtrk_chan.items():
             d[k] = v.val
         avg  = d['cno0'] + d['cno1'] + d['cno2']
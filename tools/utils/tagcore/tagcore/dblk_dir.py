@@ -0,0 +1,196 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+the dblk directory and where the written data ends
+
+The first sector of a dblk file is the dblk directory (dblk_dir_t,
+include/dblk_dir.h): the DBLK id, two signatures, the sector bounds of
+the dblk area on the SD (dblk_low is the directory sector, dblk_high the
+last sector, inclusive), the incept date and the file index.  It is
+checked like the image directory, the 32 bit sum of all its quads is 0.
+
+The directory doesn't record where the data ends.  The tag finds that
+on boot (DblkManagerP) by binary searching the area for the first
+erased sector, everything before it written, everything after it
+erased.  find_data_end does the same to a dblk file, so the live end
+is found in O(log n) sector reads rather than by walking the stream.
+Within the last written sector the end is taken as just past the last
+quad that isn't erased (record padding and the unwritten tail are).
+
+    ddir = DblkDir.read(name)
+    if ddir.valid:
+        print(ddir.low, ddir.high, ddir.area_size)
+    end = find_data_end(name, ddir.area_size if ddir.valid else None)
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'DblkDir',
+    'find_data_end',
+    'DBLK_DIR_SIG',
+]
+
+import os
+import struct
+from   collections  import OrderedDict
+
+from   base_objs    import *
+from   core_headers import obj_rtctime
+from   .misc_utils  import rtc2epoch_us, rtctime_iso
+
+DBLK_ID         = 'DBLK'
+DBLK_DIR_SIG    = 0x18961492
+SECTOR_SIZE     = 512
+
+
+def obj_dblk_dir():
+    return aggie(OrderedDict([
+        ('dblk_id',         atom(('4s', '{}'))),
+        ('dblk_dir_sig',    atom(('<I', '{:08x}'))),
+        ('dblk_low',        atom(('<I', '{}'))),
+        ('dblk_high',       atom(('<I', '{}'))),
+        ('incept_date',     obj_rtctime()),
+        ('file_idx',        atom(('<B', '{}'))),
+        ('pad',             atom(('<B', '{}'))),
+        ('dblk_dir_sig_a',  atom(('<I', '{:08x}'))),
+        ('chksum',          atom(('<I', '{:08x}'))),
+    ]))
+
+
+def read_sector(fd, sector):
+    '''sector number sector of fd, '' if it isn't there (or unreadable)'''
+    try:
+        fd.seek(sector * SECTOR_SIZE)
+        return fd.read(SECTOR_SIZE)
+    except (IOError, OSError):
+        return ''
+
+
+def erased(buf):
+    '''a sector (or what there is of it) that was never written, 0s or 1s'''
+    return not buf.strip('\0') or not buf.strip('\xff')
+
+
+class DblkDir(object):
+    '''
+    the dblk directory, sector 0 of a dblk file
+
+    attrs:      valid       id, both signatures and checksum are good.
+                reason      why not, if not.
+                low, high   dblk area, absolute SD sectors (inclusive).
+                            low is the directory.
+                area_size   bytes in the dblk area, file offsets past
+                            this can't be data.
+                incept      incept date, usecs since the epoch (0 unset).
+                file_idx    which DBLK file, DBLK0001 is 1.
+                obj         the decoded obj_dblk_dir.
+
+    methods:    read        (classmethod) read the directory of file name.
+                incept_iso  incept date as an ISO-8601 string.
+    '''
+
+    def __init__(self, buf):
+        super(DblkDir, self).__init__()
+        self.obj    = obj_dblk_dir()
+        self.valid  = False
+        self.reason = None
+        self.low = self.high = self.area_size = 0
+        self.incept = self.file_idx = 0
+
+        dlen = len(self.obj)
+        buf  = str(buf[:dlen])
+        if len(buf) < dlen:
+            self.reason = 'short directory'
+            return
+        self.obj.set(buf)
+        if self.obj['dblk_id'].val != DBLK_ID:
+            self.reason = 'no DBLK id'
+            return
+        if self.obj['dblk_dir_sig'].val   != DBLK_DIR_SIG or \
+           self.obj['dblk_dir_sig_a'].val != DBLK_DIR_SIG:
+            self.reason = 'bad signature'
+            return
+        if sum(struct.unpack('<{}I'.format(dlen / 4), buf)) & 0xffffffff:
+            self.reason = 'bad checksum'
+            return
+        self.low  = self.obj['dblk_low'].val
+        self.high = self.obj['dblk_high'].val
+        if self.high < self.low:
+            self.reason = 'bad bounds {}/{}'.format(self.low, self.high)
+            return
+        self.valid     = True
+        self.area_size = (self.high - self.low + 1) * SECTOR_SIZE
+        self.incept    = rtc2epoch_us(self.obj['incept_date'])
+        self.file_idx  = self.obj['file_idx'].val
+
+    @classmethod
+    def read(cls, name):
+        with open(name, 'rb') as fd:
+            return cls(read_sector(fd, 0))
+
+    def incept_iso(self):
+        return rtctime_iso(self.obj['incept_date'])
+
+    def __str__(self):
+        if not self.valid:
+            return 'dblk dir: {}'.format(self.reason)
+        return 'dblk dir: DBLK{:04d}  sectors {}/{} (0x{:x}/0x{:x})  ' \
+            '{} bytes  incept: {}'.format(self.file_idx, self.low, self.high,
+                                          self.low, self.high, self.area_size,
+                                          self.incept_iso())
+
+
+def find_data_end(name, limit = None):
+    '''
+    file offset just past the written data of dblk file name.
+
+    Binary search (as the tag does on boot) for the first erased sector
+    after the directory, then back up over erased quads in the sector
+    before it.  limit (the dblk area_size) caps the search, otherwise
+    it is the file size (a partial last sector is searched too).
+    Sectors that can't be read count as erased.  If the last sector is
+    written the data runs to the end, an erased sector before it is a
+    hole (damage), not the end.
+
+    Returns DBLK_DIR_SIZE (512) if there is no data at all.
+    '''
+    with open(name, 'rb') as fd:
+        size = os.fstat(fd.fileno()).st_size
+        if limit:
+            size = min(size, limit)
+        lo = 1                          # first data sector
+        hi = (size + SECTOR_SIZE - 1) / SECTOR_SIZE   # erased or past the end
+        if hi > lo and not erased(read_sector(fd, hi - 1)):
+            lo = hi                     # written to the end, nothing to find
+        while lo < hi:
+            mid = (lo + hi) / 2
+            if erased(read_sector(fd, mid)):
+                hi = mid
+            else:
+                lo = mid + 1
+        if lo <= 1:
+            return SECTOR_SIZE
+        buf  = read_sector(fd, lo - 1)
+        fill = buf[-1:]
+        n    = len(buf.rstrip(fill)) if fill in ('\0', '\xff') else len(buf)
+        return (lo - 1) * SECTOR_SIZE + ((n + 3) & ~3)
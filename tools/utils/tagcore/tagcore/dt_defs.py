@@ -42,11 +42,19 @@ Includes the following:
 
 from   __future__   import print_function
 from   core_headers import obj_dt_hdr
+from   output_sinks import oprint
+from   misc_utils   import subsec_str
 
 __version__ = '0.4.8.dev0'
 
 cfg_print_hourly = True
 
+# hourly_defer, if set, is called once with (key, banner) in place of
+# the first hourly banner decision.  key is (year, mon, day, hr).  Used
+# by sharded (parallel) dumps that can't know what hour the previous
+# shard ended in.
+hourly_defer     = None
+
 # __all__ exports commonly used definitions.  It gets used
 # when someone does a wild import of this module.
 
@@ -224,8 +232,7 @@ def secsFromHour_str(rtctime):
     '''
     rt = rtctime
     rt_secs  = rt['min'].val * 60 + rt['sec'].val
-    rt_subsecs = (rt['sub_sec'].val * 1000000) / 32768
-    return '{:d}.{:06d}'.format(rt_secs, rt_subsecs)
+    return str(rt_secs) + subsec_str(rt['sub_sec'].val)
 
 
 last_rt = {'year': 0, 'mon': 0, 'day': 0, 'hr': 0}
@@ -246,6 +253,8 @@ def print_hourly(rtctime):
     ---                      0.000000 2018/5/17 17:00 (Thu)
     '''
 
+    global hourly_defer
+
     if not cfg_print_hourly: return
     rt      = rtctime
     lrt     = last_rt
@@ -255,10 +264,16 @@ def print_hourly(rtctime):
     if rt['mon' ].val != lrt['mon' ]: pstamp = True
     if rt['year'].val != lrt['year']: pstamp = True
     set_last(rt)
-    if pstamp:
-        print('---                      '
-              '0.{:06d} {}/{}/{} {}:00 ({}) UTC'.format(
+    if pstamp or hourly_defer:
+        banner = ('---                      '
+                  '0.{:06d} {}/{}/{} {}:00 ({}) UTC'.format(
             0, rt['year'], rt['mon'], rt['day'], rt['hr'], rt['dow']))
+        if hourly_defer:
+            defer, hourly_defer = hourly_defer, None
+            defer((rt['year'].val, rt['mon'].val, rt['day'].val,
+                   rt['hr'].val), banner)
+            return
+        oprint(banner)
 
 
 def dt_name(rtype):
@@ -283,8 +298,8 @@ def dump_hdr(offset, buf, pre = ''):
     hdr = dt_hdr
     hdr_len = len(hdr)
     if (len(buf) < hdr_len):
-        print('*** dump_hdr: buf too small for a header, wanted {}, ' + \
-              'got {}, @{}'.format(hdr_len, len(buf), offset))
+        oprint('*** dump_hdr: buf too small for a header, wanted {}, ' + \
+               'got {}, @{}'.format(hdr_len, len(buf), offset))
         return False
     hdr.set(buf)
     rlen     = hdr['len'].val
@@ -293,7 +308,7 @@ def dump_hdr(offset, buf, pre = ''):
     rtctime  = hdr['rt']
     brt      = secsFromHour_str(rtctime)
     recsum   = hdr['recsum'].val
-    print(hdr_format.format(pre, offset, recnum, brt, rlen, rtype,
+    oprint(hdr_format.format(pre, offset, recnum, brt, rlen, rtype,
         dt_name(rtype), offset, offset, recsum))
     return True
 
@@ -303,5 +318,5 @@ def print_hdr_obj(obj):
     recnum   = obj['hdr']['recnum'].val
     rtctime  = obj['hdr']['rt']
     brt      = secsFromHour_str(rtctime)
-    print('{:4} {:>11} ({:2}) {:6} --'.format(recnum, brt,
+    oprint('{:4} {:>11} ({:2}) {:6} --'.format(recnum, brt,
         rtype, dt_name(rtype)), end = '')
@@ -0,0 +1,138 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+wait for a file to change
+
+FileWatch.wait blocks until the file is written (inotify, via ctypes,
+no extra packages) or a poll interval goes by, whichever comes first.
+
+inotify only sees changes made through the local kernel.  A tagfuse
+mount (the tag's dblk file over the network) grows without any local
+write, so there the poll interval is what wakes us.  Keep it short,
+a wakeup just costs the caller one read attempt.  If inotify isn't
+available (not Linux, out of watches) wait is a plain sleep.
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'FileWatch',
+    'POLL_SECS',
+]
+
+import os
+import time
+import errno
+import select
+import ctypes
+import ctypes.util
+
+POLL_SECS       = 0.5               # fallback poll interval
+
+IN_MODIFY       = 0x00000002
+IN_ATTRIB       = 0x00000004
+IN_CLOSE_WRITE  = 0x00000008
+IN_NONBLOCK     = 0o00004000
+IN_CLOEXEC      = 0o02000000
+IN_EVENT_SIZE   = 16                # struct inotify_event w/o name
+
+libc = None
+
+
+def inotify_libc():
+    global libc
+    if libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+        except (OSError, AttributeError):
+            libc = False
+    return libc
+
+
+class FileWatch(object):
+    '''
+    change notification for one file
+
+    inputs:     name    file to watch
+                poll    longest wait before giving up on an event (secs)
+
+    methods:    wait    wait up to timeout (default poll) secs for the
+                        file to change.  True if a change was seen,
+                        False if we just timed out (or are polling).
+                close   drop the watch.
+
+    attrs:      inotify True if inotify events are being used.
+    '''
+
+    def __init__(self, name, poll = POLL_SECS):
+        super(FileWatch, self).__init__()
+        self.name    = name
+        self.poll    = poll
+        self.fd      = None
+        self.inotify = False
+        lib = inotify_libc()
+        if not lib:
+            return
+        fd = lib.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        wd = lib.inotify_add_watch(fd, name,
+                                   IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE)
+        if wd < 0:
+            os.close(fd)
+            return
+        self.fd      = fd
+        self.inotify = True
+
+    def drain(self):
+        while True:
+            try:
+                if not os.read(self.fd, 64 * IN_EVENT_SIZE):
+                    return
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    return
+                raise
+
+    def wait(self, timeout = None):
+        timeout = self.poll if timeout is None else min(timeout, self.poll)
+        if self.fd is None:
+            time.sleep(timeout)
+            return False
+        try:
+            ready, w, x = select.select([ self.fd ], [], [], timeout)
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                return False
+            raise
+        if ready:
+            self.drain()
+            return True
+        return False
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd      = None
+            self.inotify = False
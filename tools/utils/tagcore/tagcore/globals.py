@@ -34,6 +34,8 @@ Includes:
                  numeric level for how much to display
     - mr_emitters: False, nope
                    True, use machine readable emitters
+    - lp_file:   None, export (if any) goes to influxdb
+                 prefix, export to line protocol files <prefix>-NNNN.lp.gz
 '''
 
 verbose   = 0
@@ -43,3 +45,4 @@ quiet     = 0
 pretty    = 0
 gps_level = None
 mr_emitters = False
+lp_file   = None
@@ -0,0 +1,344 @@
+# Copyright (c) 2020 Daniel J. Maltbie <dmaltbie@daloma.org>
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Daniel J. Maltbie <dmaltbie@daloma.org>
+
+'''
+sinks for InfluxDB points produced by json_emitters
+
+BatchWriter queues points and writes them from a background thread in
+batches, flushing when a batch fills or has been waiting too long.  The
+queue is bounded so a slow database pushes back on the dump rather than
+eating memory.  Failed batches are retried with backoff before being
+dropped.
+
+The client only needs write_points(points), so anything that looks
+like an InfluxDBClient works, including one pointed at a local
+stand-in http server that accepts /write.
+
+LineProtocolFile writes the same points as influx line protocol into
+gzip'd files, rotating to a new file every max_bytes (uncompressed).
+Existing files are never overwritten, numbering carries on after the
+highest one already there (an earlier or interrupted run).  The files can be bulk loaded later, ie. influx -import, or
+curl --data-binary to /write with Content-Encoding: gzip.
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'BatchWriter',
+    'LineProtocolFile',
+    'line_protocol',
+]
+
+import os
+import re
+import time
+import gzip
+import threading
+from   Queue        import Queue, Empty
+from   datetime     import datetime
+from   calendar     import timegm
+
+from   misc_utils   import eprint
+
+BATCH_SIZE      = 5000          # points per write_points
+FLUSH_SECS      = 1.0           # max time a point waits in a batch
+MAX_QUEUE       = 50000         # points queued before write() blocks
+RETRIES         = 5             # write attempts per batch
+RETRY_SECS      = 0.5           # first backoff, doubles each retry
+
+LP_MAX_BYTES    = 64 * 1024 * 1024  # uncompressed bytes per line protocol file
+LP_GZIP_LEVEL   = 6
+
+
+class BatchWriter(object):
+    '''batching background writer for influx points
+
+    inputs:     client      InfluxDBClient (or something with write_points)
+                batch_size  flush when this many points are pending
+                flush_secs  flush when the oldest pending point is this old
+                max_queue   bound on queued points (backpressure)
+                retries     attempts per batch before dropping it
+                retry_secs  initial retry backoff (doubles)
+
+    methods:    write       queue a point or list of points.  blocks if
+                            the queue is full.
+                close       flush everything, stop the thread and return
+                            (points, flushes, dropped) since the last close.
+                merge       add counts returned by another writer's close
+                            (tagdump --jobs workers).
+                summary     printable counts.
+
+    The thread is started on the first write (after a close too), and
+    restarted if we find ourselves in a forked child (tagdump --jobs)
+    since threads don't survive fork.
+    '''
+
+    def __init__(self, client, batch_size = BATCH_SIZE,
+                 flush_secs = FLUSH_SECS, max_queue = MAX_QUEUE,
+                 retries = RETRIES, retry_secs = RETRY_SECS):
+        super(BatchWriter, self).__init__()
+        self.client     = client
+        self.batch_size = batch_size
+        self.flush_secs = flush_secs
+        self.max_queue  = max_queue
+        self.retries    = retries
+        self.retry_secs = retry_secs
+        self.pid        = os.getpid()   # process the counts belong to
+        self.thread     = None
+        self.queue      = None
+        self.points     = 0             # points written
+        self.flushes    = 0             # successful write_points calls
+        self.dropped    = 0             # points given up on
+        self.errors     = 0             # failed write attempts
+        self.opened     = (0, 0, 0)     # counts at the last close
+
+    def start(self):
+        if self.pid != os.getpid():     # new process, counts are its own
+            self.pid     = os.getpid()
+            self.points  = self.flushes = self.dropped = self.errors = 0
+            self.opened  = (0, 0, 0)
+        self.queue   = Queue(self.max_queue)
+        self.thread  = threading.Thread(target = self.run,
+                                        name = 'influx-writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, points):
+        if self.pid != os.getpid() or self.thread is None:
+            self.start()
+        if isinstance(points, dict):
+            points = [ points ]
+        for p in points:
+            self.queue.put(p)           # blocks when full, backpressure
+
+    def flush(self, batch):
+        delay = self.retry_secs
+        for attempt in range(self.retries):
+            try:
+                self.client.write_points(batch)
+                self.points  += len(batch)
+                self.flushes += 1
+                return
+            except Exception as e:
+                self.errors += 1
+                err = e
+                if attempt + 1 < self.retries:
+                    time.sleep(delay)
+                    delay *= 2
+        self.dropped += len(batch)
+        eprint('### influx: dropped {} points after {} tries: {}'.format(
+            len(batch), self.retries, err))
+
+    def run(self):
+        batch    = []
+        deadline = None
+        while True:
+            timeout = None
+            if batch:
+                timeout = max(0, deadline - time.time())
+            try:
+                p = self.queue.get(True, timeout)
+            except Empty:
+                p = False               # timed out, flush below
+            if p is None:               # close
+                if batch:
+                    self.flush(batch)
+                return
+            if p is not False:
+                if not batch:
+                    deadline = time.time() + self.flush_secs
+                batch.append(p)
+            if batch and (len(batch) >= self.batch_size or
+                          p is False or time.time() >= deadline):
+                self.flush(batch)
+                batch = []
+
+    def close(self):
+        '''
+        flush and stop, safe to call more than once.  returns what was
+        written since the last close, (points, flushes, dropped).
+        '''
+        if self.pid != os.getpid():     # never started in this process
+            return 0, 0, 0
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        counts = (self.points  - self.opened[0],
+                  self.flushes - self.opened[1],
+                  self.dropped - self.opened[2])
+        self.opened = (self.points, self.flushes, self.dropped)
+        return counts
+
+    def merge(self, counts):
+        '''add (points, flushes, dropped) from another writer's close'''
+        self.points  += counts[0]
+        self.flushes += counts[1]
+        self.dropped += counts[2]
+
+    def summary(self):
+        return '{} points in {} flushes, {} dropped'.format(
+            self.points, self.flushes, self.dropped)
+
+
+def lp_escape(s, chars):
+    s = str(s)
+    for c in chars:
+        if c in s:
+            s = s.replace(c, '\\' + c)
+    return s
+
+
+def lp_time(t):
+    '''point time (ISO string from rtctime_iso, or int ns) to epoch ns'''
+    if isinstance(t, (int, long)):
+        return t
+    try:
+        dt = datetime.strptime(t, '%Y-%m-%dT%H:%M:%S.%f')
+    except ValueError:
+        dt = datetime.strptime(t, '%Y-%m-%dT%H:%M:%S')
+    return (timegm(dt.timetuple()) * 1000000 + dt.microsecond) * 1000
+
+
+def lp_field(v):
+    if isinstance(v, bool):
+        return 'true' if v else 'false'
+    if isinstance(v, (int, long)):
+        return '{}i'.format(v)
+    if isinstance(v, float):
+        return repr(v)
+    return '"{}"'.format(str(v).replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def line_protocol(point):
+    '''
+    one influx point (as built by json_emitters.influx_record) as a line
+    of line protocol.  tags sorted, ints get the i suffix, time in ns.
+    '''
+    line = [ lp_escape(point['measurement'], ', ') ]
+    for k, v in sorted(point.get('tags', {}).items()):
+        line.append(',{}={}'.format(lp_escape(k, ',= '), lp_escape(v, ',= ')))
+    line.append(' ')
+    line.append(','.join([ '{}={}'.format(lp_escape(k, ',= '), lp_field(v))
+                           for k, v in sorted(point['fields'].items()) ]))
+    if point.get('time') is not None:
+        line.append(' {}'.format(lp_time(point['time'])))
+    line.append('\n')
+    return ''.join(line)
+
+
+class LineProtocolFile(object):
+    '''influx points to rotating gzip'd line protocol files
+
+    inputs:     prefix      files are <prefix>-NNNN.lp.gz (forked children,
+                            tagdump --jobs, use <prefix>-<pid>-NNNN.lp.gz).
+                            NNNN starts after any already there.
+                max_bytes   start a new file after this many bytes of
+                            (uncompressed) line protocol
+
+    methods:    write       write a point or list of points
+                close       close the current file, returns
+                            (points, files, 0) since the last close,
+                            like BatchWriter.close
+                merge       add counts returned by another writer's close.
+                summary     printable counts.
+    '''
+
+    def __init__(self, prefix, max_bytes = LP_MAX_BYTES,
+                 level = LP_GZIP_LEVEL):
+        super(LineProtocolFile, self).__init__()
+        self.prefix    = prefix
+        self.max_bytes = max_bytes
+        self.level     = level
+        self.owner     = os.getpid()
+        self.pid       = self.owner     # process the counts belong to
+        self.fd        = None
+        self.part      = None           # next NNNN, see first_part
+        self.nbytes    = 0
+        self.points    = 0
+        self.files     = 0
+        self.opened    = (0, 0)         # counts at the last close
+
+    def first_part(self, stem):
+        '''first NNNN for stem-NNNN.lp.gz past the files already there'''
+        where, base = os.path.split(stem)
+        pat   = re.compile(re.escape(base) + r'-(\d{4,})\.lp\.gz$')
+        try:
+            names = os.listdir(where or '.')
+        except OSError:
+            return 0                    # gzip.open will complain
+        parts = [ int(m.group(1)) for m in map(pat.match, names) if m ]
+        return max(parts) + 1 if parts else 0
+
+    def next_file(self):
+        if self.fd:
+            self.fd.close()
+        if self.pid == self.owner:
+            stem = self.prefix
+        else:
+            stem = '{}-{}'.format(self.prefix, self.pid)
+        if self.part is None:
+            self.part = self.first_part(stem)
+        name = '{}-{:04d}.lp.gz'.format(stem, self.part)
+        self.part  += 1
+        self.files += 1
+        self.nbytes = 0
+        self.fd = gzip.open(name, 'wb', self.level)
+
+    def write(self, points):
+        if isinstance(points, dict):
+            points = [ points ]
+        if self.fd is None or self.pid != os.getpid():
+            if self.pid != os.getpid(): # new process, new name space
+                self.pid    = os.getpid()
+                self.fd     = None      # the parent's file, not ours to close
+                self.part   = None
+                self.points = 0
+                self.files  = 0
+                self.opened = (0, 0)
+            self.next_file()
+        for p in points:
+            line = line_protocol(p)
+            if self.nbytes + len(line) > self.max_bytes and self.nbytes:
+                self.next_file()
+            self.fd.write(line)
+            self.nbytes += len(line)
+            self.points += 1
+
+    def close(self):
+        if self.pid != os.getpid():     # never written in this process
+            self.fd = None
+            return 0, 0, 0
+        if self.fd:
+            self.fd.close()
+        self.fd = None
+        counts = (self.points - self.opened[0], self.files - self.opened[1], 0)
+        self.opened = (self.points, self.files)
+        return counts
+
+    def merge(self, counts):
+        '''add (points, files, 0) from another writer's close'''
+        self.points += counts[0]
+        self.files  += counts[1]
+
+    def summary(self):
+        return '{} points in {} files ({}-*.lp.gz)'.format(
+            self.points, self.files, self.prefix)
@@ -26,22 +26,24 @@ __version__ = '0.4.6'
 TEST = False
 
 import sys
+import atexit
 from time     import sleep
 from binascii import hexlify
-from requests.exceptions import ConnectionError
 
 import pprint
 pp = pprint.PrettyPrinter(indent=4)
 
-from base_objs   import atom
+from base_objs   import atom, aggie_layout
 from dt_defs     import dt_records
 from dt_defs     import secsFromHour_str
 from misc_utils  import rtctime_iso
 from core_events import event_name
+from influx_sinks import BatchWriter, LineProtocolFile
+from output_sinks import oprint
 
 import tagcore.globals
 
-__all__ = [ 'emit_influx' ]
+__all__ = [ 'emit_influx', 'influx_open', 'influx_close', 'influx_merge' ]
 versions_ok = [ '1.5.2', '1.7.0' ]
 
 
@@ -51,6 +53,12 @@ user     = 'root'
 password = 'root'
 dbname   = 'test'
 
+# nothing is connected (or imported) until the first export, influx_open.
+influxdb_version = ''
+influx_db     = None            # InfluxDBClient, see influx_connect
+influx_writer = None            # BatchWriter/LineProtocolFile, set if exporting
+influx_state  = None            # None not tried yet, True/False exporting
+
 
 def influx_print():
     if tagcore.globals.verbose > 0 or tagcore.globals.export:
@@ -60,57 +68,96 @@ def influx_print():
 
 
 
-# handle influxdb being installed and not installed.
-try:
-    influxdb_version = ''
-    if tagcore.globals.export == -1:
-        print('### --noexport, no external database export')
-        tagcore.globals.export = 0
-        raise ImportError
+def influx_connect():
+    '''
+    return an InfluxDBClient for host/port/dbname.  The client is made
+    once and reused (across input files too).  raises ImportError if
+    influxdb/requests aren't installed.
+    '''
+    global influx_db
+
+    if influx_db is None:
+        from influxdb import InfluxDBClient
+        influx_db = InfluxDBClient(host, port, user, password, dbname)
+    return influx_db
+
+
+def influx_open():
+    '''
+    set up export on first use rather than at import so tools that
+    never export don't pay for the imports or wait on the network.
+
+    --lp-file writes line protocol files and never talks to a server.
+    otherwise handle influxdb being installed and not installed.
+
+    returns True if we are exporting.  Only tries once.
+    '''
+    global influxdb_version, influx_writer, influx_state
 
-    from influxdb import InfluxDBClient
+    if influx_state is not None:
+        return influx_state
+    influx_state = False
+    if tagcore.globals.lp_file:
+        influx_writer = LineProtocolFile(tagcore.globals.lp_file)
+        if influx_print():
+            oprint('### influx line protocol to {}-*.lp.gz'.format(
+                tagcore.globals.lp_file))
+        influx_state = True
+        return influx_state
 
-    if influx_print():
-        print('### influxdb host: {}, port: {}, user: {}, password: {}, dbname: {}'.format(
-            host, port, user, password, dbname))
-    influx_db = InfluxDBClient(host, port, user, password, dbname)
     try:
-        influxdb_version = influx_db.ping()
+        influxdb_version = ''
+        if tagcore.globals.export == -1:
+            oprint('### --noexport, no external database export')
+            tagcore.globals.export = 0
+            raise ImportError
+
+        from requests.exceptions import ConnectionError
+
         if influx_print():
-            print("### Influxdb version: {}".format(influxdb_version))
-        #influx_db.drop_database(dbname)
-        if influxdb_version in versions_ok:
-            dblist = influx_db.get_list_database()
+            oprint('### influxdb host: {}, port: {}, user: {}, password: {}, dbname: {}'.format(
+                host, port, user, password, dbname))
+        client = influx_connect()
+        try:
+            influxdb_version = client.ping()
             if influx_print():
-                print("### Influxdb available databases: {}".format(dblist))
-            no_db = True
-            for db in dblist:
-                if db['name'] == dbname:
-                    no_db = False
-                    break
-            if (no_db):
-                print("### Influxdb creating database: {}".format(dbname))
-                influx_db.create_database(dbname)
-        else:
-            print('### influxdb not correct version: {}', influxdb_version)
-            influxdb_saved_version = influxdb_version
-            influxdb_version = ''
+                oprint("### Influxdb version: {}".format(influxdb_version))
+            #client.drop_database(dbname)
+            if influxdb_version in versions_ok:
+                dblist = client.get_list_database()
+                if influx_print():
+                    oprint("### Influxdb available databases: {}".format(dblist))
+                no_db = True
+                for db in dblist:
+                    if db['name'] == dbname:
+                        no_db = False
+                        break
+                if (no_db):
+                    oprint("### Influxdb creating database: {}".format(dbname))
+                    client.create_database(dbname)
+                influx_writer = BatchWriter(client)
+                influx_state  = True
+            else:
+                oprint('### influxdb not correct version: {}', influxdb_version)
+                influxdb_saved_version = influxdb_version
+                influxdb_version = ''
+                if tagcore.globals.export:
+                    oprint('-x (export) specified and cannot connect to influxdb')
+                    sys.exit()
+        except ConnectionError:
+            if influx_print():
+                oprint('### influxdb not running.  No database export')
             if tagcore.globals.export:
-                print('-x (export) specified and cannot connect to influxdb')
+                oprint('-x (export) specified and cannot connect to influxdb')
                 sys.exit()
-    except ConnectionError:
+
+    except ImportError:
         if influx_print():
-            print('### influxdb not running.  No database export')
+            oprint('### influxdb not installed.  No database export')
         if tagcore.globals.export:
-            print('-x (export) specified and cannot connect to influxdb')
+            oprint('### -x (export) specified and cannot connect to influxdb')
             sys.exit()
-
-except ImportError:
-    if influx_print():
-        print('### influxdb not installed.  No database export')
-    if tagcore.globals.export:
-        print('### -x (export) specified and cannot connect to influxdb')
-        sys.exit()
+    return influx_state
 
 
 def int32(x):
@@ -150,7 +197,7 @@ if TEST:
                   'b': {'x': 5,
                         'y' : 10}},
             'd': [1, 2, 3]}
-    print(flatten_dict(test))
+    oprint(flatten_dict(test))
 
 
 def influx_record(mname, time, fields, tags):
@@ -188,6 +235,29 @@ _example_output = [
 ]
 '''
 
+def influx_close(report = True):
+    '''
+    flush anything still queued for influxdb and report.  Run at exit,
+    tagdump also calls it (quietly) when a --jobs worker finishes a shard
+    and hands the returned counts to influx_merge in the parent.
+    '''
+    if influx_writer is None:
+        return None
+    counts = influx_writer.close()
+    if report and influx_print() and \
+       (influx_writer.points or influx_writer.dropped):
+        oprint('### influx: {}'.format(influx_writer.summary()))
+    return counts
+
+
+def influx_merge(counts):
+    '''fold counts from a --jobs worker's influx_close into ours'''
+    if influx_writer is not None and counts:
+        influx_writer.merge(counts)
+
+atexit.register(influx_close)
+
+
 def build_tags(obj):
     '''
     add tags used to filter selection.
@@ -197,10 +267,108 @@ def build_tags(obj):
     return tags
 
 
+#
+# flatten plans
+#
+# Record layouts are fixed per object, so what flatten_dict and
+# build_tags do for an object (key paths, which fields are ints that
+# need int32, event names) is worked out once and compiled into a
+# function that builds both dicts straight from the object's atoms:
+#
+#     def flat():
+#         if a4.val is None:
+#             return slow()
+#         return ({'hdr_len': a0.val if a0.val is not None else format(a0),
+#                  ..., 'arg0': int32(a7.val) if a7.val is not None else ...},
+#                 {'event': event_name(a4.val)})
+#
+# An int atom that isn't set flattens to 'notset' as in flatten_dict.  An
+# unset event leaves out <lkey>_event_name there, so that (rare) case
+# goes to flatten_dict/build_tags (slow).
+#
+# The atoms are the object's own, decoders set them in place, so the
+# function just reads the current values.  Plans are cached by object
+# (dt_records and cid_table objects live forever).  Objects with tlvs
+# or special atoms (aggie_layout can't flatten them) keep using
+# flatten_dict/build_tags.
+#
+flatten_plans = {}                      # id(obj) -> (obj, flat)
+
+INT_CODES  = 'bBhHiIlLqQ?'              # struct codes that unpack to int
+WIDE_CODES = 'IlLqQ'                    # ... that can need int32
+
+
+def flatten_fields(obj, lkey, fields):
+    '''
+    (lkey, rkey, key, atom) for each field of obj, flatten_dict's order
+    and keys.  None if a key isn't a string (flatten_dict can't either).
+    '''
+    for rkey, val in obj.items():
+        if not isinstance(rkey, basestring):
+            return None
+        key = lkey + rkey
+        if isinstance(val, dict):
+            if flatten_fields(val, key + '_', fields) is None:
+                return None
+        else:
+            fields.append((lkey, rkey, key, val))
+    return fields
+
+
+def compile_flatten(obj):
+    '''
+    build the flatten function for obj, returns a function returning
+    (flatten_dict(obj, ''), build_tags(obj)).
+    '''
+    slow   = lambda: (flatten_dict(obj, ''), build_tags(obj))
+    fields = flatten_fields(obj, '', [])
+    if fields is None or not aggie_layout.flatten(obj, []):
+        return slow
+
+    names = { 'int32': int32, 'event_name': event_name, 'slow': slow }
+    items = []
+    guard = []
+    for i, (lkey, rkey, key, a_obj) in enumerate(fields):
+        a_name = 'a{}'.format(i)
+        names[a_name] = a_obj
+        code = a_obj.s_str[-1:]
+        if code in INT_CODES:
+            if rkey == 'event':
+                guard.append('{}.val is None'.format(a_name))
+                items.append('{!r}: event_name({}.val)'.format(
+                    lkey + '_event_name', a_name))
+            val = 'int32({}.val)' if code in WIDE_CODES else '{}.val'
+            items.append('{!r}: {} if {}.val is not None else format({})'.format(
+                key, val.format(a_name), a_name, a_name))
+        else:
+            items.append('{!r}: format({})'.format(key, a_name))
+    tags = ''
+    if 'event' in obj:
+        names['ev'] = obj['event']
+        tags = "'event': event_name(ev.val)"
+    src = 'def flat():\n'
+    if guard:
+        src += '    if {}:\n        return slow()\n'.format(' or '.join(guard))
+    src += '    return ({{{}}},\n            {{{}}})\n'.format(
+        ',\n             '.join(items), tags)
+    exec src in names
+    return names['flat']
+
+
+def flatten_plan(obj):
+    '''the (cached) compiled flatten function for obj'''
+    plan = flatten_plans.get(id(obj))
+    if plan is None or plan[0] is not obj:
+        plan = (obj, compile_flatten(obj))
+        flatten_plans[id(obj)] = plan
+    return plan[1]
+
+
 def emit_influx(level, offset, buf, obj):
     # zzz print('### emit_influx version: {}, level: {}, offset: {}, len: {}'.format(influxdb_version, level, offset, len(buf)))
-    if influxdb_version == '':
-        return
+    if not influx_state:
+        if influx_state is False or not influx_open():
+            return
     if obj:
         try:
             xlen     = obj['hdr']['len'].val
@@ -216,18 +384,18 @@ def emit_influx(level, offset, buf, obj):
                 rtctime  = obj['rt']
                 brt      = secsFromHour_str(rtctime)
             except:
-                print('### emit_influx error obj no good, offset: {}, buf: {}'.format(offset,
-                                                                                      hexlify(buf)))
+                oprint('### emit_influx error obj no good, offset: {}, buf: {}'.format(offset,
+                                                                                       hexlify(buf)))
                 return
         # zzz pp.pprint(obj)
         # zzz print('### emit_influx name: {}, num: {}, xtype: {}, xlen: {}, brt: {}, utc: {}'.format(
         # dt_records[int(xtype)][4], recnum, xtype, xlen, brt, rtctime_iso(rtctime)))
         # zzz print('### emit_influx {}'.format(flatten_dict(obj, '')))
+        fields, tags = flatten_plan(obj)()
         json_rec =influx_record(dt_records[int(xtype)][4],
                                 rtctime_iso(rtctime),
-                                flatten_dict(obj, ''),
-                                build_tags(obj))
+                                fields, tags)
         # zzz print('### influx JSON:', json_rec)
-        influx_db.write_points(json_rec)
+        influx_writer.write(json_rec)
     else:
-        print('### emit_influx error level: {}, offset: {}, buf: {}'.format(hexlify(buf)))
+        oprint('### emit_influx error level: {}, offset: {}, buf: {}'.format(hexlify(buf)))
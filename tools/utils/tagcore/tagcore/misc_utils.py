@@ -22,8 +22,10 @@
 
 from   __future__ import print_function
 from   datetime   import datetime
+from   calendar   import timegm
 import binascii
 import sys
+from   output_sinks import oprint
 
 __version__ = '0.4.6'
 
@@ -47,13 +49,13 @@ def dump_buf(buf, pre = '', desc = 'rec:  '):
 
     # 3 chars per byte
     idx = 0
-    print(pre + desc, end = '')
+    oprint(pre + desc, end = '')
     while(idx < len(bs)):
         max_loc = min(len(bs), idx + (stride * 3))
-        print(bs[idx:max_loc])
+        oprint(bs[idx:max_loc])
         idx += (stride * 3)
         if idx < len(bs):              # if more then print counter
-            print(pre + '{:04x}: '.format(idx/3), end = '')
+            oprint(pre + '{:04x}: '.format(idx/3), end = '')
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
@@ -77,11 +79,78 @@ def rtc2datetime(rtc_obj):
        (rtc_obj['sub_sec'].val* 1000000) / 32768,
     )
 
+##
+# rtctime conversion cache
+#
+# Records come in time order, many of them in the same minute.  Whatever
+# depends only on the minute (epoch seconds at its start, the formatted
+# date/time up to the seconds) is kept for the last minute seen and
+# reused, only the seconds and sub_sec get converted per record.
+#
+# rt_minute_cache is [ key, epoch secs, iso prefix, { pretty: prefix } ].
+# key is (year, mon, day, hr, min), epoch secs is False until asked for
+# and None if the date isn't valid, the prefixes are built on first use.
+#
+rt_minute_cache = [ None, False, None, {} ]
+
+SEC_STRS    = [ '{:02d}'.format(s) for s in range(60) ]
+subsec_strs = {}                        # sub_sec -> '.usecs'
+
+
+def rt_minute(rtc_obj):
+    '''the conversion cache entry for rtc_obj's minute'''
+    global rt_minute_cache
+    key = (rtc_obj['year'].val, rtc_obj['mon'].val, rtc_obj['day'].val,
+           rtc_obj['hr'].val,   rtc_obj['min'].val)
+    entry = rt_minute_cache
+    if entry[0] != key:
+        entry = rt_minute_cache = [ key, False, None, {} ]
+    return entry
+
+
+def subsec_str(sub_sec):
+    '''sub_sec (1/32768 jiffies) as '.uuuuuu' usecs, memoized'''
+    s = subsec_strs.get(sub_sec)
+    if s is None:
+        s = subsec_strs[sub_sec] = \
+            '.{:06d}'.format((sub_sec * 1000000) / 32768)
+    return s
+
+
+##
+# rtc2epoch_us: convert an rtc object to microseconds since the epoch (UTC)
+#
+# returns 0 if the rtc object doesn't hold a valid date.
+#
+def rtc2epoch_us(rtc_obj):
+    entry = rt_minute(rtc_obj)
+    base  = entry[1]
+    if base is False:
+        try:
+            base = timegm(entry[0] + (0,))
+        except (ValueError, OverflowError):
+            base = None
+        entry[1] = base
+    if base is None:
+        return 0
+    return (base + rtc_obj['sec'].val) * 1000000 + \
+        (rtc_obj['sub_sec'].val * 1000000) / 32768
+
 def rtctime_iso(rtctime):
     '''
     convert a rtctime into an ISO-8601 formatted string displaying the time.
     '''
-    return rtc2datetime(rtctime).isoformat()
+    sec     = rtctime['sec'].val
+    sub_sec = rtctime['sub_sec'].val
+    if sec > 59 or sub_sec > 32767:
+        return rtc2datetime(rtctime).isoformat()    # raises as datetime does
+    entry  = rt_minute(rtctime)
+    prefix = entry[2]
+    if prefix is None:
+        prefix = entry[2] = datetime(*entry[0]).isoformat()[:-2]
+    if sub_sec == 0:                                # no fraction, as datetime
+        return prefix + SEC_STRS[sec]
+    return prefix + SEC_STRS[sec] + subsec_str(sub_sec)
 
 
 def rtctime_full(rtctime, pretty=1):
@@ -89,7 +158,18 @@ def rtctime_full(rtctime, pretty=1):
     convert a rtctime into a full ISO-8601 formatted string displaying the time.
     Full means all digits are spaced out.
     '''
-    return rtc2datetime(rtctime).strftime(utc_str(pretty))
+    sec     = rtctime['sec'].val
+    sub_sec = rtctime['sub_sec'].val
+    if sec > 59 or sub_sec > 32767:
+        return rtc2datetime(rtctime).strftime(utc_str(pretty))
+    pretty = bool(pretty)
+    entry  = rt_minute(rtctime)
+    prefix = entry[3].get(pretty)
+    if prefix is None:
+        # utc_str up to (not including) the %S.%f
+        prefix = entry[3][pretty] = \
+            datetime(*entry[0]).strftime(utc_str(pretty)[:-5])
+    return prefix + SEC_STRS[sec] + subsec_str(sub_sec)
 
 def expand_datetime(dt, pretty=1):
     return dt.strftime(utc_str(pretty))
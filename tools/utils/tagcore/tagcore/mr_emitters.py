@@ -27,7 +27,6 @@ from   __future__         import print_function
 
 __version__ = '0.4.8.dev2'
 
-import copy
 from   datetime       import datetime
 from   collections    import OrderedDict
 import pytz
@@ -39,6 +38,7 @@ from   .misc_utils    import rtctime_full
 from   .misc_utils    import expand_datetime
 from   .misc_utils    import eprint
 from   .misc_utils    import utc_str
+from   .output_sinks  import oprint
 from   .core_events   import event_name
 from   .base_objs     import atom
 from   sensor_defs    import *
@@ -74,17 +74,17 @@ def mr_chksum_err(offset, recsum, chksum):
         front_fmt  = expanded_f
         remain_fmt = expanded_r
         # output titles
-        print(basic_hdr.format('date','offset','rec','type'), end='')
+        oprint(basic_hdr.format('date','offset','rec','type'), end='')
         for k in c:
-            print(remain_fmt.format(k), end='')
-        print()
+            oprint(remain_fmt.format(k), end='')
+        oprint()
 
     cur_dt = datetime.now(tz=pytz.utc)
-    print(front_fmt.format(expand_datetime(cur_dt, g.pretty),
-                           offset, 0, 'CHKSUMERR'), end='')
+    oprint(front_fmt.format(expand_datetime(cur_dt, g.pretty),
+                            offset, 0, 'CHKSUMERR'), end='')
     for k in c:
-        print(remain_fmt.format(str(c[k])), end='')
-    print()
+        oprint(remain_fmt.format(str(c[k])), end='')
+    oprint()
 
 ##
 # mr_display: machine readable output
@@ -110,39 +110,85 @@ def mr_chksum_err(offset, recsum, chksum):
 #
 def mr_display(offset, sns_hdr, mr_dict, label=None):
     hdr = sns_hdr['hdr'] if ('hdr' in sns_hdr) else sns_hdr
-    recnum   = hdr['recnum'].val
-    rtctime  = hdr['rt']
-    brt      = rtctime_full(rtctime, g.pretty)
-    if not label:
-        label = dt_name(hdr['type'].val)
+    vals = [ v.val if isinstance(v, atom) else v for v in mr_dict.values() ]
+    mr_line(offset, hdr, tuple(mr_dict.keys()), vals, label)
+
+
+##
+# column plans
+#
+# An mr line is the front (date, offset, rec, type) followed by one
+# column per name, all from one format string.  mr_format builds that
+# string (and the title line for verbose/debug) once per list of column
+# names and output mode.  mr_columns does the same for "an object's
+# fields less some" (what the emitters used to copy.copy and del for),
+# returning the names and the atoms to read the values from.
+#
+mr_formats = {}                         # (names, pretty, titles) -> plan
+mr_obj_columns = {}                     # (id(obj), skip) -> plan
+
+
+def mr_format(names):
+    '''(title line or None, line format) for columns names'''
+    titles = bool(g.debug or g.verbose)
+    key  = (names, g.pretty, titles)
+    plan = mr_formats.get(key)
+    if plan is None:
+        front_fmt  = expanded_f if g.pretty or titles else compact_f
+        remain_fmt = expanded_r if g.pretty or titles else compact_r
+        title = None
+        if titles:
+            title = basic_hdr.format('date','offset','rec','type') + \
+                    ''.join([ remain_fmt.format(k) for k in names ])
+        plan = mr_formats[key] = (title, front_fmt + remain_fmt * len(names))
+    return plan
 
-    front_fmt  = expanded_f if g.pretty else compact_f
-    remain_fmt = expanded_r if g.pretty else compact_r
-    if g.debug or g.verbose:
-        print(basic_hdr.format('date','offset','rec','type'), end='')
-        front_fmt  = expanded_f
-        remain_fmt = expanded_r
-        if mr_dict.keys():
-            for k in mr_dict:
-                print(remain_fmt.format(k), end='')
-        print()
-    print(front_fmt.format(brt, offset, recnum, label), end = '')
-    if mr_dict.keys():                  # if we have keys process them.
-        for k in mr_dict:
-            val = mr_dict[k].val if (isinstance(mr_dict[k], atom)) else mr_dict[k]
-            print(remain_fmt.format(val), end='')
-    print()
+
+def mr_line(offset, hdr, names, vals, label=None):
+    '''display one mr line, vals are the values for columns names'''
+    title, fmt = mr_format(names)
+    if title is not None:
+        oprint(title)
+    oprint(fmt.format(rtctime_full(hdr['rt'], g.pretty), offset,
+                      hdr['recnum'].val,
+                      label or dt_name(hdr['type'].val), *vals))
+
+
+def mr_columns(obj, skip):
+    '''
+    (names, get) for obj's fields other than those in skip.  get()
+    returns their current values (atoms' .val, anything else as is).
+
+    Only objects that are all atoms are planned once, ones holding
+    other things (GPS_TRK's channels) are rebuilt by their decoders
+    and are looked at each time.
+    '''
+    key  = (id(obj), skip)
+    plan = mr_obj_columns.get(key)
+    if plan is not None and plan[0] is obj and plan[1] == dict.__len__(obj):
+        return plan[2], plan[3]
+    names = tuple([ k for k in obj if k not in skip ])
+    cols  = [ obj[k] for k in names ]
+    if all([ isinstance(c, atom) for c in cols ]):
+        get = lambda: [ c.val for c in cols ]
+        mr_obj_columns[key] = (obj, dict.__len__(obj), names, get)
+    else:
+        vals = [ c.val if isinstance(c, atom) else c for c in cols ]
+        get  = lambda: vals
+    return names, get
+
+
+def mr_display_obj(offset, hdr, obj, skip, label=None):
+    '''mr_display of obj's fields less skip, without copying obj'''
+    names, get = mr_columns(obj, skip)
+    mr_line(offset, hdr, names, get(), label)
 
 
 def emit_default_mr(level, offset, buf, obj):
-    c = copy.copy(obj)
     if 'gps_hdr' in obj:
-        hdr = obj['gps_hdr']['hdr']
-        del c['gps_hdr']
+        mr_display_obj(offset, obj['gps_hdr']['hdr'], obj, ('gps_hdr',))
     else:
-        hdr = obj['hdr']
-        del c['hdr']
-    mr_display(offset, hdr, c)
+        mr_display_obj(offset, obj['hdr'], obj, ('hdr',))
 
 
 def emit_reboot_mr(level, offset, buf, obj):
@@ -156,12 +202,8 @@ def emit_event_mr(level, offset, buf, obj):
         if g.debug and g.verbose:
             eprint('*** dumping event {}/{}'.format(ev, event_name(ev)))
         return
-    c = copy.copy(obj)
-    del c['hdr']
-    del c['event']
-    del c['pcode']
-    del c['w']
-    mr_display(offset, hdr, c, event_name(ev))
+    mr_display_obj(offset, hdr, obj, ('hdr', 'event', 'pcode', 'w'),
+                   event_name(ev))
 
 
 def emit_gps_raw_mr(level, offset, buf, obj):
@@ -193,6 +235,9 @@ def emit_gps_time_mr(level, offset, buf, obj):
     mr_display(offset, hdr, c)
 
 
+gps_geo_columns = ('weekx', 'tow', 'lat', 'lon', 'msl', 'ehpe', 'hdop',
+                   'nav_type')
+
 def emit_gps_geo_mr(level, offset, buf, obj):
     hdr    = obj['gps_hdr']['hdr']
     week_x = obj['week_x'].val
@@ -200,23 +245,15 @@ def emit_gps_geo_mr(level, offset, buf, obj):
     ehpe   = obj['ehpe100'].val/100.
     hdop   = obj['hdop5'].val/5.
     if g.debug:
-        c = copy.copy(obj)
-        del c['gps_hdr']
-        del c['capdelta']
-        del c['nav_valid']
-        del c['alt_ell']
-        mr_display(offset, hdr, c)
-    c = OrderedDict()
-    c['weekx'] = week_x
-    c['tow']   = tow
-    c['lat']   = obj['lat'].val / 10000000.
-    c['lon']   = obj['lon'].val / 10000000.
-    c['msl']   = obj['alt_msl'].val/100.
-    c['ehpe']  = ehpe
-    c['hdop']  = hdop
-    nav_type   = '0x{:04x}'.format(obj['nav_type'].val)
-    c['nav_type'] =  nav_type if g.verbose or g.debug else obj['nav_type'].val
-    mr_display(offset, hdr, c)
+        mr_display_obj(offset, hdr, obj,
+                       ('gps_hdr', 'capdelta', 'nav_valid', 'alt_ell'))
+    nav_type = obj['nav_type'].val
+    if g.verbose or g.debug:
+        nav_type = '0x{:04x}'.format(nav_type)
+    mr_line(offset, hdr, gps_geo_columns,
+            (week_x, tow, obj['lat'].val / 10000000.,
+             obj['lon'].val / 10000000., obj['alt_msl'].val/100.,
+             ehpe, hdop, nav_type))
 
 
 def emit_gps_xyz_mr(level, offset, buf, obj):
@@ -225,10 +262,7 @@ def emit_gps_xyz_mr(level, offset, buf, obj):
     tow    = obj['tow100'].val/100.
     hdop   = obj['hdop5'].val/5.
     if g.debug:
-        c = copy.copy(obj)
-        del c['gps_hdr']
-        del c['capdelta']
-        mr_display(offset, hdr, c)
+        mr_display_obj(offset, hdr, obj, ('gps_hdr', 'capdelta'))
     c = OrderedDict()
     c['weekx'] = week_x
     c['tow']   = tow
@@ -249,10 +283,7 @@ def emit_gps_trk_mr(level, offset, buf, obj):
     tow    = obj['tow100'].val/100.
     chans  = obj['chans'].val
     if g.debug:
-        c = copy.copy(obj)
-        del c['gps_hdr']
-        del c['capdelta']
-        mr_display(offset, hdr, c)
+        mr_display_obj(offset, hdr, obj, ('gps_hdr', 'capdelta'))
     c = OrderedDict()
     c['week']  = week
     c['tow']   = tow
@@ -278,15 +309,17 @@ def emit_sensor_data_mr(level, offset, buf, obj):
     dt_sns_id = hdr['type'].val
     v = sensor.sns_table.get(dt_sns_id, ('', None, None, None, None, ''))
     if g.debug:
-        c = copy.copy(obj)
-        del c['hdr']
+        names, get = mr_columns(obj, ('hdr',))
+        vals = get()
         sns_obj  = v[SNS_OBJECT]
         dict_func = sns_dict(dt_sns_id)
         xdict = dict_func(sns_obj) if dict_func else None
         if xdict:
-            for k in xdict:
-                c[k] = xdict[k]
-        mr_display(offset, hdr, c)
+            c = OrderedDict(zip(names, vals))
+            c.update(xdict)
+            mr_display(offset, hdr, c)
+        else:
+            mr_line(offset, hdr, names, vals)
     sns_obj  = v[SNS_OBJECT]
     dict_func = sns_dict(dt_sns_id)
     xdict = dict_func(sns_obj) if dict_func else None
@@ -300,18 +333,15 @@ def emit_sensor_data_mr(level, offset, buf, obj):
             mr_emitter(offset, obj, sns_obj)
 
 def emit_note_mr(level, offset, buf, obj):
-    c = copy.copy(obj)
     hdr = obj['hdr']
-    del c['hdr']
+    names, get = mr_columns(obj, ('hdr',))
 
     # isolate just the note, and strip NUL and whitespace
     # note follows the header
     note     = buf[len(obj):]
     note     = note.rstrip('\0')
     note     = note.rstrip()
-    c['len']  = len(note)
-    c['note'] = note
-    mr_display(offset, hdr, c)
+    mr_line(offset, hdr, names + ('len', 'note'), get() + [ len(note), note ])
 
 def emit_gps_proto_mr(level, offset, buf, obj):
     hdr   = obj['hdr']
@@ -27,6 +27,7 @@ from   ctypes       import c_long
 
 from   dt_defs      import rec0
 from   dt_defs      import secsFromHour_str
+from   output_sinks import oprint
 
 from   net_headers  import *
 
@@ -41,15 +42,15 @@ def emit_tagnet(level, offset, buf, obj):
     brt      = secsFromHour_str(rtctime)
 
     print_hourly(rtctime)
-    print(rec0.format(offset, recnum, brt, xlen, xtype,
-                      dt_name(xtype)))
+    oprint(rec0.format(offset, recnum, brt, xlen, xtype,
+                       dt_name(xtype)))
 
     # isolate just the tagnet message
     msgbuf   = buf[len(obj):]
     try:
         msg = TagMessage(msgbuf)
-        print('header:{}'.format(msg.header))
-        print('name:{}'.format(msg.name))
-        print('payload:{}'.format(msg.payload if msg.payload else ''))
+        oprint('header:{}'.format(msg.header))
+        oprint('name:{}'.format(msg.name))
+        oprint('payload:{}'.format(msg.payload if msg.payload else ''))
     except:
-        print('raw:{}'.format(hexlify(msgbuf)))
+        oprint('raw:{}'.format(hexlify(msgbuf)))
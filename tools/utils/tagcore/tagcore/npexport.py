@@ -0,0 +1,274 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+columnar NumPy export of records, one structured array per rtype
+
+obj_dtype turns an obj_dt_* aggie into the equivalent NumPy dtype
+(packed, nested aggies become nested fields), so a record's bytes
+are an element of the array as is.  Records aren't decoded one at a
+time: NpExport collects each rtype's raw records and converts a batch
+at a time with np.frombuffer, adding two columns, offset (file offset)
+and rt_us (rtctime as usecs since the epoch, 0 if unset).
+
+Sensor records (decode_sensor) get the sensor's payload fields after
+the dt_sns_data fields.  Only the fixed part of a record is exported,
+variable tails (GPS_TRK channels, n-sample data, GPS_RAW packets,
+notes) are not.  rtypes whose object can't be flattened are skipped.
+
+Output is either a .npz (one array per rtype name) or, for any other
+name, <name><RTYPE>.npy per rtype ('out/' gives out/GPS_GEO.npy ...).
+.npy files can be memory mapped:
+
+    geo = np.load('out/GPS_GEO.npy', mmap_mode = 'r')
+    fix = geo[geo['nav_valid'] == 0]
+    lat = fix['lat'] / 1e7
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'NpExport',
+    'obj_dtype',
+    'rtc_us',
+    'export_records',
+]
+
+import os
+
+try:
+    import numpy    as     np
+except ImportError:
+    np = None                           # NpExport raises
+
+from   .base_objs   import atom, aggie, aggie_layout
+from   .dt_defs     import *
+import dt_defs      as     dtd
+import sensor_defs  as     sensor
+from   .sensor_defs import SNS_OBJECT
+from   .core_headers import decode_sensor, obj_dt_hdr
+from   .tagfile     import TagFile
+from   .tagrecords  import RecordReader, DBLK_DIR_SIZE
+
+NP_BATCH        = 4096                  # records per frombuffer
+
+# struct type char -> numpy kind
+np_kinds = {
+    'b': 'i1', 'B': 'u1', '?': 'b1',
+    'h': 'i2', 'H': 'u2',
+    'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4',
+    'q': 'i8', 'Q': 'u8',
+    'f': 'f4', 'd': 'f8',
+}
+
+
+def atom_dtype(a_obj):
+    '''numpy dtype for an atom, None if it hasn't got one'''
+    order, body = aggie_layout.atom_order(a_obj)
+    if order is None:
+        return None
+    count = body.rstrip('bBhHiIlLqQfds?cx')
+    code  = body[len(count):]
+    count = int(count) if count else 1
+    if code in ('s', 'c'):
+        return np.dtype('S{}'.format(count))
+    if code == 'x':
+        return np.dtype('V{}'.format(count))
+    kind = np_kinds.get(code)
+    if kind is None:
+        return None
+    dt = np.dtype(('<' if order == '*' else order) + kind)
+    return dt if count == 1 else np.dtype((dt, (count,)))
+
+
+def obj_fields(obj):
+    '''[ (name, dtype) ] for an aggie, None if it can't be flattened'''
+    if not aggie_layout.flatten(obj, []):
+        return None
+    fields = []
+    for name, v_obj in obj.iteritems():
+        if isinstance(v_obj, aggie):
+            dt = np.dtype(obj_fields(v_obj))
+        elif isinstance(v_obj, atom):
+            dt = atom_dtype(v_obj)
+            if dt is None:
+                return None
+        else:
+            return None
+        fields.append((name, dt))
+    return fields
+
+
+def obj_dtype(obj):
+    '''
+    NumPy dtype with the layout of aggie obj, None if there isn't one.
+    dtype.itemsize == len(obj).
+    '''
+    fields = obj_fields(obj)
+    return np.dtype(fields) if fields else None
+
+
+def hdr_view(dt):
+    '''
+    dtype that sees just the record header's rt in records of dtype
+    dt.  Every record starts with a dt_hdr, but it's nested at
+    different depths (GPS records have it in gps_hdr).
+    '''
+    hdr_dt = obj_dtype(obj_dt_hdr())
+    rt_dt, rt_off = hdr_dt.fields['rt'][:2]
+    return np.dtype({ 'names': [ 'rt' ], 'formats': [ rt_dt ],
+                      'offsets': [ rt_off ], 'itemsize': dt.itemsize })
+
+
+def rtc_us(rt):
+    '''
+    rtctime fields (an rt column) -> usecs since the epoch, vectorized
+    rtc2epoch_us.  0 where the date isn't valid.
+    '''
+    year = rt['year'].astype(np.int64)
+    mon  = rt['mon'].astype(np.int64)
+    ok   = (year >= 1970) & (mon >= 1) & (mon <= 12) & (rt['day'] >= 1)
+    days = ((np.where(ok, year, 1970) - 1970).astype('M8[Y]').astype('M8[M]') +
+            (np.where(ok, mon, 1) - 1).astype('m8[M]')).astype('M8[D]')
+    days = days.astype(np.int64) + rt['day'].astype(np.int64) - 1
+    secs = ((days * 24 + rt['hr']) * 60 + rt['min']) * 60 + rt['sec']
+    us   = secs * 1000000 + (rt['sub_sec'].astype(np.int64) * 1000000) / 32768
+    return np.where(ok, us, 0)
+
+
+class NpExport(object):
+    '''
+    collect records and write them as NumPy structured arrays by rtype
+
+    inputs:     out     .npz file, or prefix for <out><RTYPE>.npy files
+                rtypes  rtypes (ints) to export, None for all that can be
+                batch   records per conversion batch
+
+    methods:    add     a record, (rtype, offset, rec_buf).
+                close   convert what's left and write the arrays.
+                        returns [ (name, records, file) ].
+
+    attrs:      skipped records not exported (no layout, or short),
+                        by rtype.
+    '''
+
+    def __init__(self, out, rtypes = None, batch = NP_BATCH):
+        super(NpExport, self).__init__()
+        if np is None:
+            raise ImportError('NumPy export needs numpy')
+        self.out     = out
+        self.rtypes  = set(rtypes) if rtypes is not None else None
+        self.batch   = batch
+        self.layouts = {}               # rtype -> (raw dtype, full dtype)
+        self.pending = {}               # rtype -> ([ bufs ], [ offsets ])
+        self.arrays  = {}               # rtype -> [ arrays ]
+        self.skipped = {}
+
+    def layout(self, rtype):
+        '''(raw dtype, out dtype) for rtype, None if it can't be exported'''
+        if rtype in self.layouts:
+            return self.layouts[rtype]
+        lay = None
+        v = dtd.dt_records.get(rtype)
+        if v is not None and v[DTR_OBJ] is not None:
+            fields = obj_fields(v[DTR_OBJ])
+            if fields and v[DTR_DECODER] is decode_sensor:
+                sv = sensor.sns_table.get(rtype)
+                sns_obj = sv[SNS_OBJECT] if sv else None
+                more = obj_fields(sns_obj) if isinstance(sns_obj, aggie) \
+                       else None
+                if more:
+                    fields += more
+            if fields:
+                raw = np.dtype(fields)
+                lay = (raw, np.dtype([ ('offset', '<u4'), ('rt_us', '<i8') ] +
+                                     fields))
+        self.layouts[rtype] = lay
+        return lay
+
+    def add(self, rtype, offset, rec_buf):
+        if self.rtypes is not None and rtype not in self.rtypes:
+            return
+        lay = self.layout(rtype)
+        if lay is None or len(rec_buf) < lay[0].itemsize:
+            self.skipped[rtype] = self.skipped.get(rtype, 0) + 1
+            return
+        bufs, offsets = self.pending.setdefault(rtype, ([], []))
+        bufs.append(str(rec_buf[:lay[0].itemsize]))
+        offsets.append(offset)
+        if len(bufs) >= self.batch:
+            self.convert(rtype)
+
+    def convert(self, rtype):
+        '''one batch: raw bytes -> array, plus the offset/rt_us columns'''
+        bufs, offsets = self.pending.pop(rtype, ([], []))
+        if not bufs:
+            return
+        raw_dt, out_dt = self.layouts[rtype]
+        buf = ''.join(bufs)
+        raw = np.frombuffer(buf, dtype = raw_dt)
+        arr = np.empty(len(raw), dtype = out_dt)
+        for name in raw_dt.names:
+            arr[name] = raw[name]
+        arr['offset'] = offsets
+        arr['rt_us']  = rtc_us(np.frombuffer(buf, dtype = hdr_view(raw_dt))['rt'])
+        self.arrays.setdefault(rtype, []).append(arr)
+
+    def close(self):
+        for rtype in self.pending.keys():
+            self.convert(rtype)
+        arrays = {}
+        for rtype, chunks in self.arrays.iteritems():
+            arrays[dtd.dt_records[rtype][DTR_NAME].replace('/', '_')] = \
+                np.concatenate(chunks)
+        self.arrays = {}
+        written = []
+        if self.out.endswith('.npz'):
+            np.savez(self.out, **arrays)
+            for name in sorted(arrays):
+                written.append((name, len(arrays[name]), self.out))
+            return written
+        d = os.path.dirname(self.out)
+        if d and not os.path.isdir(d):
+            os.makedirs(d)
+        for name in sorted(arrays):
+            fname = '{}{}.npy'.format(self.out, name)
+            np.save(fname, arrays[name])
+            written.append((name, len(arrays[name]), fname))
+        return written
+
+
+def export_records(path, out, rtypes = None, batch = NP_BATCH):
+    '''
+    export the dblk file path (see NpExport).  Records are validated
+    the tagdump way (RecordReader) but not decoded.
+    returns NpExport.close's list.
+    '''
+    if not dtd.dt_records:
+        import core_populate            # need the objects
+        import sensor_populate
+
+    npx = NpExport(out, rtypes, batch)
+    with open(path, 'rb') as fd, TagFile(fd, quiet = True) as infile:
+        infile.seek(DBLK_DIR_SIZE)
+        for rec_offset, hdr, rec_buf in RecordReader(infile).records():
+            npx.add(hdr['type'].val, rec_offset, rec_buf)
+    return npx.close()
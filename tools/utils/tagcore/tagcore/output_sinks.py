@@ -0,0 +1,178 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+output sinks for emitter (display) output
+
+Emitters, dt_defs and dump_buf write through oprint, which takes the
+same arguments as print, into the current output sink rather than
+straight to sys.stdout.  A sink is a file object opened with a large
+buffer, so whole card dumps go out in OUT_BUF_SIZE writes and oprint is
+still just print underneath.
+
+    StdoutSink      stdout.  Unbuffered, it follows sys.stdout (which is
+                    what you get if nobody calls set_output).  Buffered,
+                    it writes to its own dup of fd 1.
+    FileSink        a plain file.
+    GzipSink        a gzip'd file.
+
+open_output picks one by name ('-' is stdout, *.gz is gzip'd).  The
+current sink is flushed and closed at exit.
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'oprint',
+    'set_output',
+    'get_output',
+    'open_output',
+    'output_flush',
+    'OutputSink',
+    'StdoutSink',
+    'FileSink',
+    'GzipSink',
+]
+
+import io
+import os
+import sys
+import gzip
+import atexit
+
+OUT_BUF_SIZE    = 1024 * 1024       # bytes gathered before a write
+OUT_GZIP_LEVEL  = 6
+
+
+class OutputSink(object):
+    '''display output going to a file object
+
+    inputs:     fd          file object, normally opened with a big
+                            buffer.
+
+    methods:    write       write a string.
+                flush       flush fd.
+                close       flush and close fd.
+    '''
+
+    def __init__(self, fd):
+        super(OutputSink, self).__init__()
+        self.fd = fd
+
+    def write(self, s):
+        self.fd.write(s)
+
+    def flush(self):
+        self.fd.flush()
+
+    def close(self):
+        self.fd.close()
+
+
+class StdoutSink(OutputSink):
+    '''stdout, buffered (own dup of fd 1) or following sys.stdout'''
+
+    def __init__(self, buf_size = 0):
+        fd = None
+        if buf_size:
+            sys.stdout.flush()
+            fd = os.fdopen(os.dup(sys.stdout.fileno()), 'w', buf_size)
+        super(StdoutSink, self).__init__(fd)
+
+    @property
+    def fd(self):
+        return self._fd if self._fd is not None else sys.stdout
+
+    @fd.setter
+    def fd(self, fd):
+        self._fd = fd
+
+    def close(self):
+        if self._fd is not None:
+            self._fd.close()
+        else:
+            sys.stdout.flush()          # not ours to close
+
+
+class FileSink(OutputSink):
+    def __init__(self, name, buf_size = OUT_BUF_SIZE):
+        super(FileSink, self).__init__(open(name, 'w', buf_size))
+        self.name = name
+
+
+class GzipSink(OutputSink):
+    def __init__(self, name, buf_size = OUT_BUF_SIZE,
+                 level = OUT_GZIP_LEVEL):
+        self.gz = gzip.open(name, 'wb', level)
+        super(GzipSink, self).__init__(io.BufferedWriter(self.gz, buf_size))
+        self.name = name
+
+    def close(self):
+        self.fd.close()                 # closes the GzipFile too
+
+
+output = StdoutSink()
+
+
+def open_output(name, buf_size = OUT_BUF_SIZE):
+    '''
+    sink for name.  '-' (or None) is stdout, names ending in .gz are
+    gzip'd.  stdout is left unbuffered when it is a tty so display
+    output keeps its place relative to stderr.
+    '''
+    if name is None or name == '-':
+        if sys.stdout.isatty():
+            buf_size = 0
+        return StdoutSink(buf_size)
+    if name.endswith('.gz'):
+        return GzipSink(name, buf_size)
+    return FileSink(name, buf_size)
+
+
+def set_output(sink):
+    '''
+    make sink current, returns the previous sink.  The previous sink
+    is left alone, flush (or close) it first if it matters.
+    '''
+    global output
+    prev, output = output, sink
+    return prev
+
+
+def get_output():
+    return output
+
+
+def output_flush():
+    output.flush()
+
+
+def oprint(*args, **kwargs):
+    '''print to the current output sink, same arguments as print'''
+    if 'file' not in kwargs:
+        kwargs['file'] = output.fd
+    print(*args, **kwargs)
+
+
+def output_close():
+    output.close()
+
+atexit.register(output_close)
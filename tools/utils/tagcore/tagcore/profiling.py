@@ -0,0 +1,171 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+per stage timing for the record pipeline
+
+StageTimes accumulates call counts, wall time and cpu time under
+(stage, detail) keys, ie. ('decode', 'GPS_RAW') or ('ubx', 'nav/pvt').
+Functions are timed by wrapping them (StageTimes.wrap), so nothing is
+paid unless something has been instrumented.
+
+instrument_tables wraps every decoder and emitter in dt_records and
+every ubx decoder/emitter in cid_table:
+
+    decode  <rtype name>                dt_records decoder
+    emit    <rtype name>/<emitter>      each dt_records emitter
+    ubx     <cid name>                  cid_table decoder
+    ubx_emit <cid name>/<emitter>       each cid_table emitter
+
+Times are inclusive, a GPS_RAW decode includes its ubx decode.
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'StageTimes',
+    'instrument_tables',
+]
+
+import time
+from   functools    import wraps
+
+import dt_defs      as     dtd
+import ubx_defs     as     ubx
+from   .misc_utils  import eprint
+
+# wall clock and process cpu clock
+wall_clock = time.time
+cpu_clock  = time.clock
+
+CALLS, WALL, CPU = range(3)
+
+
+class StageTimes(object):
+    '''
+    call counts and wall/cpu seconds by (stage, detail)
+
+    methods:    add     add a sample (or several calls worth).
+                wrap    return func wrapped to time itself under key.
+                clear   forget everything.
+                merge   add another StageTimes' items (--jobs workers).
+                report  print the table.
+    '''
+
+    def __init__(self):
+        super(StageTimes, self).__init__()
+        self.stats = {}
+
+    def add(self, key, wall, cpu, calls = 1):
+        s = self.stats.get(key)
+        if s is None:
+            s = self.stats[key] = [ 0, 0.0, 0.0 ]
+        s[CALLS] += calls
+        s[WALL]  += wall
+        s[CPU]   += cpu
+
+    def wrap(self, key, func):
+        stats = self.stats
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            w0, c0 = wall_clock(), cpu_clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                s = stats.get(key)
+                if s is None:
+                    s = stats[key] = [ 0, 0.0, 0.0 ]
+                s[CALLS] += 1
+                s[WALL]  += wall_clock() - w0
+                s[CPU]   += cpu_clock()  - c0
+        timed.untimed = func
+        return timed
+
+    def clear(self):
+        self.stats.clear()
+
+    def items(self):
+        return [ (k, tuple(v)) for k, v in self.stats.iteritems() ]
+
+    def merge(self, items):
+        for key, (calls, wall, cpu) in items:
+            self.add(key, wall, cpu, calls)
+
+    def report(self, total_wall = None, out = eprint):
+        '''
+        stages in order of wall time, each followed by its details.
+        total_wall (the whole run) gives the % column.
+        '''
+        stages = {}
+        for (stage, detail), s in self.stats.iteritems():
+            t = stages.setdefault(stage, [ [ 0, 0.0, 0.0 ], [] ])
+            for i in range(3):
+                t[0][i] += s[i]
+            if detail:
+                t[1].append((detail, s))
+        fmt = '{:<40s} {:>9} {:>9.3f} {:>9.3f} {:>9.1f} {:>6s}'
+        out()
+        out('{:<40s} {:>9s} {:>9s} {:>9s} {:>9s} {:>6s}'.format(
+            '*** profile (inclusive)', 'calls', 'wall s', 'cpu s',
+            'us/call', '%'))
+
+        def line(name, s):
+            pct = '{:.1f}'.format(100. * s[WALL] / total_wall) \
+                  if total_wall else ''
+            out(fmt.format(name[:40], s[CALLS], s[WALL], s[CPU],
+                           1e6 * s[WALL] / s[CALLS] if s[CALLS] else 0, pct))
+
+        for stage, (tot, details) in sorted(stages.items(),
+                                            key = lambda x: -x[1][0][WALL]):
+            line(stage, tot)
+            if len(details) > 1 or (details and details[0][0] != stage):
+                for detail, s in sorted(details, key = lambda x: -x[1][WALL]):
+                    line('  ' + detail, s)
+        if total_wall:
+            out('{:<40s} {:>9s} {:>9.3f}'.format('total', '', total_wall))
+
+
+def instrument_tables(times):
+    '''
+    wrap the decoders and emitters in dt_records and ubx.cid_table so
+    they report to times.  Call once, after the tables are populated.
+    '''
+    for rtype, v in dtd.dt_records.items():
+        req_len, decoder, emitters, obj, name, obj_name = v
+        if decoder:
+            decoder = times.wrap(('decode', name), decoder)
+        if emitters:
+            emitters = [ times.wrap(('emit', '{}/{}'.format(name, e.__name__)), e)
+                         for e in emitters ]
+        dtd.dt_records[rtype] = (req_len, decoder, emitters, obj, name,
+                                 obj_name)
+
+    for cid, v in ubx.cid_table.items():
+        v = list(v)
+        name = v[ubx.CID_NAME]
+        if v[ubx.CID_DECODER]:
+            v[ubx.CID_DECODER] = times.wrap(('ubx', name), v[ubx.CID_DECODER])
+        if v[ubx.CID_EMITTERS]:
+            v[ubx.CID_EMITTERS] = [
+                times.wrap(('ubx_emit', '{}/{}'.format(name, e.__name__)), e)
+                for e in v[ubx.CID_EMITTERS] ]
+        ubx.cid_table[cid] = tuple(v)
@@ -28,13 +28,14 @@ from   dt_defs      import DT_SNS_TMP_PX
 from   sensor_defs  import *
 import sensor_defs  as     sensor
 from   mr_emitters  import mr_display
+from   output_sinks import oprint
 
 __version__ = '0.4.7'
 
 def emit_default(level, offset, buf, obj):
-    print()
+    oprint()
     if (level >= 1):
-        print('    {}'.format(obj))
+        oprint('    {}'.format(obj))
 
 ##
 # Tmp102 emitters
@@ -95,7 +96,7 @@ def sns_str_acceln(obj, level = 0):
 
 
 def print_sample(fmt, c, obj):
-    print(fmt.format(c, obj[c]['x'], obj[c]['y'], obj[c]['z']),  end = '')
+    oprint(fmt.format(c, obj[c]['x'], obj[c]['y'], obj[c]['z']),  end = '')
 
 
 def emit_sample(fmt, obj):
@@ -111,7 +112,7 @@ def emit_sample(fmt, obj):
         c += 1
         if c < nsamples:
             print_sample(fmt, c, obj)
-        print('')
+        oprint('')
 
 
 def emit_acceln(level, offset, buf, obj):
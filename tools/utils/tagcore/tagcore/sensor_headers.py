@@ -59,7 +59,7 @@ def process_accel(nsamp_obj, decode_obj, buf):
 
     for n in range(nsamples):
         d = OrderedDict()
-        consumed += decode_obj.set(buf[consumed:])
+        consumed += decode_obj.set_from(buf, consumed)
         for k, v in decode_obj.items():
             d[k] = v.val
         nsamp_obj[n] = d
@@ -0,0 +1,261 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+SQLite export of decoded records, one table per rtype
+
+Each rtype gets a table named for it (SYNC/R -> SYNC_R) with columns
+from its obj_dt_* object, flattened the way json_emitters.flatten_dict
+names influx fields (hdr_recnum, hdr_rt_year, gps_hdr_mark, ...).
+Sensor records add their sensor's payload fields.  Every table also
+has:
+
+    tag         which tag the record came from
+    recnum      record number               } primary key
+    rt_us       rtctime, usecs since the epoch (0 unset)
+    offset      file offset of the record
+
+and EVENT has event_name.  Rows are keyed by (tag, recnum) and inserted
+with INSERT OR IGNORE, so loading an overlapping dump again (or the
+same one) adds only what's new.  Inserts are batched (executemany)
+inside large transactions.  Indexes on recnum, rt_us (and event for
+EVENT) are built when the export is closed, after the bulk of a first
+load.  Tables of an older core_rev gain any new columns.
+
+    sqx = SqlExport('tags.db', 'tag1')
+    ...
+    sqx.add(rtype, offset, recnum, rt_us, obj)  # obj decoded
+    sqx.close()
+
+    sqlite3 tags.db "select tag, count(*) from GPS_GEO group by tag"
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'SqlExport',
+    'obj_columns',
+    'export_sqlite',
+]
+
+import os
+import struct
+import sqlite3
+
+from   .base_objs   import atom, aggie, aggie_layout
+from   .dt_defs     import *
+import dt_defs      as     dtd
+import sensor_defs  as     sensor
+from   .sensor_defs import SNS_OBJECT
+from   .core_headers import decode_sensor
+from   .core_events import event_name
+from   .tagfile     import TagFile
+from   .tagrecords  import RecordReader, DBLK_DIR_SIZE
+from   .misc_utils  import rtc2epoch_us
+
+SQL_BATCH       = 2000                  # rows per executemany
+SQL_TXN         = 100000                # rows per transaction
+
+# columns every table has, ahead of the record's own
+KEY_COLUMNS     = [ ('tag', 'TEXT'), ('recnum', 'INTEGER'),
+                    ('rt_us', 'INTEGER'), ('offset', 'INTEGER') ]
+
+
+def obj_columns(obj, lkey = ''):
+    '''
+    [ (column, sql type, atom) ] for an aggie, names as flatten_dict
+    makes them.  None if the aggie can't be flattened (tlvs).
+    '''
+    if not aggie_layout.flatten(obj, []):
+        return None
+    cols = []
+    for rkey, v_obj in obj.iteritems():
+        key = lkey + str(rkey)
+        if isinstance(v_obj, aggie):
+            cols.extend(obj_columns(v_obj, key + '_'))
+        elif isinstance(v_obj, atom):
+            code = v_obj.s_str[-1:]
+            if code in ('s', 'c'):
+                typ = 'BLOB'
+            elif code in ('f', 'd'):
+                typ = 'REAL'
+            else:
+                typ = 'INTEGER'
+            cols.append((key, typ, v_obj))
+    return cols
+
+
+def table_name(rtype):
+    return dtd.dt_records[rtype][DTR_NAME].replace('/', '_')
+
+
+class SqlExport(object):
+    '''
+    load decoded records into SQLite, a table per rtype
+
+    inputs:     db      database file name (created if needed)
+                tag     tag identifier stored in every row
+                batch   rows per executemany
+                txn     rows per transaction
+
+    methods:    add     a decoded record, (rtype, offset, recnum, rt_us,
+                        obj).
+                flush   insert anything pending and commit.
+                close   flush, build the indexes, close the db.
+                        returns { table: rows added }.
+
+    attrs:      added   rows inserted, by table.
+                skipped records with no table (no layout), by rtype.
+    '''
+
+    def __init__(self, db, tag, batch = SQL_BATCH, txn = SQL_TXN):
+        super(SqlExport, self).__init__()
+        self.tag     = tag
+        self.batch   = batch
+        self.txn     = txn
+        self.conn    = sqlite3.connect(db, isolation_level = None)
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.tables  = {}               # rtype -> (table, insert, [ atoms ])
+        self.pending = {}               # rtype -> [ rows ]
+        self.in_txn  = 0                # rows in the open transaction
+        self.added   = {}
+        self.skipped = {}
+
+    def table(self, rtype):
+        '''(table, insert sql, [ atoms ]) for rtype, creating the table'''
+        if rtype in self.tables:
+            return self.tables[rtype]
+        tbl = None
+        v = dtd.dt_records.get(rtype)
+        cols = obj_columns(v[DTR_OBJ]) if v and v[DTR_OBJ] is not None \
+               else None
+        if cols and v[DTR_DECODER] is decode_sensor:
+            sv = sensor.sns_table.get(rtype)
+            sns_obj = sv[SNS_OBJECT] if sv else None
+            if isinstance(sns_obj, aggie):
+                cols += obj_columns(sns_obj) or []
+        if cols:
+            name  = table_name(rtype)
+            extra = [ ('event_name', 'TEXT') ] if rtype == DT_EVENT else []
+            defs  = KEY_COLUMNS + extra + [ (c, t) for c, t, a in cols ]
+            self.create(name, defs)
+            tbl = (name, 'INSERT OR IGNORE INTO "{}" ({}) VALUES ({})'.format(
+                       name, ', '.join([ '"{}"'.format(c) for c, t in defs ]),
+                       ', '.join([ '?' ] * len(defs))),
+                   [ a for c, t, a in cols ])
+        self.tables[rtype] = tbl
+        return tbl
+
+    def create(self, name, defs):
+        c = self.conn
+        c.execute('CREATE TABLE IF NOT EXISTS "{}" ({}, '
+                  'PRIMARY KEY (tag, recnum))'.format(name,
+                      ', '.join([ '"{}" {}'.format(*d) for d in defs ])))
+        have = set([ r[1] for r in c.execute(
+            'PRAGMA table_info("{}")'.format(name)) ])
+        for col, typ in defs:
+            if col not in have:
+                c.execute('ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(
+                    name, col, typ))
+
+    def add(self, rtype, offset, recnum, rt_us, obj):
+        tbl = self.table(rtype)
+        if tbl is None:
+            self.skipped[rtype] = self.skipped.get(rtype, 0) + 1
+            return
+        vals = [ a.val for a in tbl[2] ]
+        for i, val in enumerate(vals):
+            if isinstance(val, str):
+                vals[i] = sqlite3.Binary(val)
+        row = [ self.tag, recnum, rt_us, offset ]
+        if rtype == DT_EVENT:
+            row.append(event_name(obj['event'].val))
+        rows = self.pending.setdefault(rtype, [])
+        rows.append(row + vals)
+        if len(rows) >= self.batch:
+            self.insert(rtype)
+
+    def insert(self, rtype):
+        rows = self.pending.pop(rtype, None)
+        if not rows:
+            return
+        if not self.in_txn:
+            self.conn.execute('BEGIN')
+        name, sql = self.tables[rtype][:2]
+        before = self.conn.total_changes
+        self.conn.executemany(sql, rows)
+        self.added[name] = self.added.get(name, 0) + \
+                           self.conn.total_changes - before
+        self.in_txn += len(rows)
+        if self.in_txn >= self.txn:
+            self.conn.execute('COMMIT')
+            self.in_txn = 0
+
+    def flush(self):
+        for rtype in self.pending.keys():
+            self.insert(rtype)
+        if self.in_txn:
+            self.conn.execute('COMMIT')
+            self.in_txn = 0
+
+    def close(self):
+        self.flush()
+        for rtype, tbl in self.tables.iteritems():
+            if tbl is None:
+                continue
+            name = tbl[0]
+            idx = [ 'recnum', 'rt_us' ]
+            if rtype == DT_EVENT:
+                idx.append('event')
+            for col in idx:
+                self.conn.execute('CREATE INDEX IF NOT EXISTS "{0}_{1}" '
+                                  'ON "{0}" ("{1}")'.format(name, col))
+        self.conn.close()
+        return self.added
+
+
+def export_sqlite(path, db, tag = None, batch = SQL_BATCH, txn = SQL_TXN):
+    '''
+    decode the dblk file path into SQLite db (see SqlExport).  tag
+    defaults to the file's name without extension.  Records are
+    validated the tagdump way (RecordReader).
+    returns SqlExport.close's dict.
+    '''
+    if not dtd.dt_records:
+        import core_populate            # need decoders and objects
+        import sensor_populate
+    if tag is None:
+        tag = os.path.splitext(os.path.basename(path))[0]
+
+    sqx = SqlExport(db, tag, batch, txn)
+    with open(path, 'rb') as fd, TagFile(fd, quiet = True) as infile:
+        infile.seek(DBLK_DIR_SIZE)
+        for rec_offset, hdr, rec_buf in RecordReader(infile).records():
+            v = dtd.dt_records.get(hdr['type'].val)
+            if not v or not v[DTR_DECODER] or v[DTR_OBJ] is None:
+                continue
+            try:
+                v[DTR_DECODER](0, rec_offset, rec_buf, v[DTR_OBJ])
+            except struct.error:
+                continue
+            sqx.add(hdr['type'].val, rec_offset, hdr['recnum'].val,
+                    rtc2epoch_us(hdr['rt']), v[DTR_OBJ])
+    return sqx.close()
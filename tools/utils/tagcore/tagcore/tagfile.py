@@ -33,10 +33,13 @@ import sys
 import types
 import time
 import errno
+import mmap
 import struct
 
 from   .dt_defs    import *
 from   .misc_utils import eprint
+from   .tagindex   import TagIndex
+from   .filewatch  import FileWatch, POLL_SECS
 
 # negative offset indicates file i/o error
 EODATA = -14
@@ -60,7 +63,15 @@ def int32(x):
 
 TF_SEEK_END = os.SEEK_END
 
-MAX_ZERO_SIGS           = 1024          # 1024 quads, 4K bytes of zero
+# resync scans the stream a window at a time looking for the sync majik
+# (little endian) rather than decoding a SYNC at every quad.
+RESYNC_WINDOW           = 64 * 1024
+SYNC_MAJIK_OFFSET       = 24            # hdr (20) + prev_sync (4)
+sync_majik_bytes        = struct.pack('<I', dt_sync_majik)
+
+# first part of a record header: len, type, hdr_crc8, recnum
+# used to verify index entries before trusting them.
+idx_check_struct        = struct.Struct('<HBBI')
 
 class TagFile(object):
     '''TagDump File Class
@@ -70,7 +81,19 @@ class TagFile(object):
                 tail    true if hang at the tail of input, keep trying
                         waiting for more network i/o.  Forces net_io.
                 verbose vebosity level (see tagdump.py)
-                timeout timeout value (default 60 secs) for --tail/net_io
+                timeout timeout value (default 60 secs) for --tail/net_io,
+                        the longest we wait at EOF before reading again.
+                poll    --tail, at EOF wait for the file to change
+                        (inotify) but read again at least this often
+                        (default 0.5 secs).  Files on a tagfuse mount
+                        change without local writes, polling catches them.
+                use_mmap
+                        memory map local files (default).  read returns
+                        zero-copy buffer slices of the map rather than
+                        strings.  Ignored for net_io/tail or if the
+                        input can't be mapped (pipes, empty files).
+                quiet   don't print informational messages (EOF etc),
+                        for library use.
 
     methods:    read    reads CNT bytes from the input stream.  If doing
                         network i/o (net_io true) and --tail is set will
@@ -80,10 +103,23 @@ class TagFile(object):
 
                 seek    set stream position to position/whence.  Whence
                         determines the base that is used for using position.
+
+                load_index  load the sidecar index (<input>.idx) if present.
+
+                peek_hdr    first fields of the record header at an offset.
+
+                seek_recnum position the stream using the index so the next
+                seek_time   record read is at or before the given recnum or
+                        rt_us (microseconds since the epoch).  Returns the
+                        offset or -1 if the index can't help.
+
+                close   unmap and close the input.  A TagFile is also a
+                        context manager (with TagFile(fd) as infile:).
     '''
 
     def __init__(self, input, net_io = False, tail = False,
-                 verbose = 0, timeout = 60):
+                 verbose = 0, timeout = 60, use_mmap = True, quiet = False,
+                 poll = POLL_SECS):
         super( TagFile, self ).__init__()
 
         if not isinstance(input, types.FileType):
@@ -93,15 +129,62 @@ class TagFile(object):
         self.tail   = tail
         self.verbose= verbose
         self.timeout= timeout
+        self.poll   = poll
+        self.watch  = None
+        self.quiet  = quiet
         self.fd     = input
         self.name   = input.name
         self.rsname = os.path.dirname(os.path.realpath(os.path.expanduser(self.name))) + '/.resync'
+        self.index  = None
+        self.mm     = None
+        self.pos    = 0
+        self.fileno = None
 
         if (self.net_io):
             self.fd.close()
             self.fileno   = os.open(self.name, os.O_DIRECT | os.O_RDONLY)
+        elif use_mmap and not self.tail:
+            try:
+                self.mm = mmap.mmap(self.fd.fileno(), 0,
+                                    access = mmap.ACCESS_READ)
+            except (mmap.error, ValueError, EnvironmentError):
+                self.mm = None          # not mappable, use plain reads
+
+    def close(self):
+        '''release the map, any --tail watch and the input'''
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.watch is not None:
+            self.watch.close()
+            self.watch = None
+        if self.fileno is not None:     # net_io
+            os.close(self.fileno)
+            self.fileno = None
+        self.fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def log(self, *args):
+        '''informational messages (EOF etc), suppressed by quiet'''
+        if not self.quiet:
+            eprint(*args)
 
     def read(self, cnt):
+        if self.mm is not None:
+            pos = self.pos
+            if pos + cnt > len(self.mm):
+                self.pos = max(pos, len(self.mm))
+                self.log('*** data stream EOF sorry')
+                self.log('*** use --tail to wait for data at EOF')
+                return ''
+            self.pos = pos + cnt
+            return buffer(self.mm, pos, cnt)
+
         buf = ''
         while True:
             try:
@@ -126,10 +209,10 @@ class TagFile(object):
                     if (self.tail):
                         if self.verbose >= 5:
                             eprint('*** TF.read: buf len: ', len(buf))
-                        time.sleep(self.timeout)
+                        self.wait_data()
                         continue
-                    eprint('*** data stream EOF sorry')
-                    eprint('*** use --tail to wait for data at EOF')
+                    self.log('*** data stream EOF sorry')
+                    self.log('*** use --tail to wait for data at EOF')
                     return ''
                 eprint('*** TF.read: unhandled OSError/IOError exception',
                       sys.exc_info()[0])
@@ -138,18 +221,120 @@ class TagFile(object):
                 eprint('*** TF.read: unhandled exception', sys.exc_info()[0])
                 raise
 
+    def wait_data(self):
+        '''--tail at EOF, wait for the file to change or a poll tick'''
+        if self.watch is None:
+            self.watch = FileWatch(self.name, min(self.poll, self.timeout))
+            if self.verbose >= 2:
+                eprint('*** tail: {}, polling every {} secs'.format(
+                    'inotify' if self.watch.inotify else 'no inotify',
+                    self.watch.poll))
+        self.watch.wait()
+        if not self.net_io:
+            self.fd.seek(0, os.SEEK_CUR)    # clear stdio's sticky EOF
+
     def tell(self):
+        if self.mm is not None:
+            return self.pos
         if (self.net_io):
             return os.lseek(self.fileno, 0, os.SEEK_CUR)
         else:
             return self.fd.tell()
 
     def seek(self, pos, how=os.SEEK_SET):
+        if self.mm is not None:
+            if how == os.SEEK_END:
+                pos += len(self.mm)
+            elif how == os.SEEK_CUR:
+                pos += self.pos
+            if pos < 0:
+                raise IOError(errno.EINVAL, os.strerror(errno.EINVAL))
+            self.pos = pos
+            return pos
         if (self.net_io):
             return os.lseek(self.fileno, pos, how)
         else:
             return self.fd.seek(pos, how)
 
+    def load_index(self):
+        '''load the sidecar index, network streams never use one'''
+        if self.net_io:
+            return None
+        self.index = TagIndex.load(self.name)
+        if self.index is not None and self.verbose >= 2:
+            eprint('*** index: {} entries{}'.format(len(self.index),
+                ' (sparse)' if self.index.sparse else ''))
+        return self.index
+
+    def peek_hdr(self, offset):
+        '''
+        (len, type, hdr_crc8, recnum) of the record header at offset,
+        None if there isn't one (or net_io).  The stream position is not
+        changed.
+        '''
+        if self.net_io:
+            return None
+        pos = self.tell()
+        if self.mm is not None:
+            buf = buffer(self.mm, offset, idx_check_struct.size)
+        else:
+            self.seek(offset)
+            buf = self.fd.read(idx_check_struct.size)
+            self.seek(pos)
+        if len(buf) != idx_check_struct.size:
+            return None
+        return idx_check_struct.unpack(buf)
+
+    def seek_index(self, n):
+        '''
+        seek to index entry n after checking the record header at that
+        offset still matches the index.  If it doesn't the index is out
+        of date and we drop it, the caller falls back to a linear scan.
+        '''
+        if n < 0:
+            return -1
+        offset, recnum, rtype, rlen, rt_us = self.index.entry(n)
+        hdr = self.peek_hdr(offset)
+        if hdr is not None:
+            h_len, h_type, h_crc8, h_recnum = hdr
+            if h_recnum == recnum and h_type == rtype and h_len == rlen:
+                self.seek(offset)
+                return offset
+        self.log('*** index: entry mismatch @{0} (0x{0:x}), ignoring index'.format(
+            offset))
+        self.index = None
+        return -1
+
+    def seek_recnum(self, recnum):
+        if self.index is None:
+            return -1
+        return self.seek_index(self.index.find_recnum(recnum))
+
+    def seek_time(self, rt_us):
+        if self.index is None:
+            return -1
+        return self.seek_index(self.index.find_time(rt_us))
+
+    def find_majik(self, offset):
+        '''
+        return the stream offset of the next sync majik at or beyond
+        offset, -1 if there isn't one.  mmap'd inputs are searched in
+        place, otherwise the file is read RESYNC_WINDOW bytes at a time
+        (overlapping so a majik can't straddle two windows).
+        '''
+        if self.mm is not None:
+            return self.mm.find(sync_majik_bytes, offset)
+        overlap = len(sync_majik_bytes) - 1
+        while True:
+            self.seek(offset)
+            win = self.fd.read(RESYNC_WINDOW)
+            if len(win) < len(sync_majik_bytes):
+                return -1
+            idx = win.find(sync_majik_bytes)
+            if idx >= 0:
+                return offset + idx
+            offset += len(win) - overlap
+
     def resync(self, offset):
         '''resync the data stream to the next SYNC record
 
@@ -170,8 +355,9 @@ class TagFile(object):
 
         Otherwise the search will be conducted on file by reading
         the byte stream to look for a valid sync record. This is
-        done by advancing one quad-aligned word and inspecting the
-        byte stream for a valid SYNC record. There are three possible
+        done by scanning windows of the byte stream for the sync
+        majik (find) and only inspecting candidates where the majik
+        lands on a quad-aligned SYNC record. There are three possible
         SYNC record types that all share the same record format and
         only differ in type. (SYNC, SYNC_FLUSH, SYNC_REBOOT). A valid
         record has the correct type, length, majik value, and header
@@ -194,7 +380,7 @@ class TagFile(object):
         # make sure offset starts on quad word
         if (offset & 3 != 0):
             resync0 = '*** resync: unaligned offset: {0} (0x{0:x}) -> {1} (0x{1:x})'
-            eprint(resync0.format(offset, (offset/4)*4))
+            self.log(resync0.format(offset, (offset/4)*4))
             offset = (offset / 4) * 4
 
         # if using network then have remote tag search for sync record
@@ -221,18 +407,30 @@ class TagFile(object):
 
         # else search file byte stream for sync record
         #
-        record = dt_records[DT_SYNC][DTR_OBJ]
-        zero_sigs = 0
+        record   = dt_records[DT_SYNC][DTR_OBJ]
+        sync_len = dt_records[DT_SYNC][DTR_REQ_LEN]
         while (True):
-            # read a sync record's worth of data and check field validity
+            # find the next majik that could belong to a SYNC at or
+            # beyond offset, then check the rest of the record.
             try:
+                cand = self.find_majik(offset + SYNC_MAJIK_OFFSET)
+                if cand < 0:
+                    if (self.verbose >= 4):
+                        eprint('*** resync: no sync majik found beyond @{}'.format(
+                            offset))
+                    self.seek(0, os.SEEK_END)   # scanned to the end
+                    return EODATA
+                cand -= SYNC_MAJIK_OFFSET
+                if (cand & 3):
+                    offset = cand + 1   # not aligned, keep looking
+                    continue
+                offset = cand
                 self.seek(offset)
-                buf = self.read(dt_records[DT_SYNC][DTR_REQ_LEN])
-                if len(buf) < dt_records[DT_SYNC][DTR_REQ_LEN]:
+                buf = self.read(sync_len)
+                if len(buf) < sync_len:
                   if (self.verbose >= 4):
                     eprint('*** resync: too few bytes read for resync record, '
-                          'wanted {}, got {}'.format(
-                            dt_records[DT_SYNC][DTR_REQ_LEN], len(buf)))
+                          'wanted {}, got {}'.format(sync_len, len(buf)))
                   return EODATA
                 record.set(buf)
                 # check majik, length, type and header sum
@@ -243,15 +441,7 @@ class TagFile(object):
                      (record['hdr']['type'].val == DT_SYNC_REBOOT))): # found valid sync record
                     self.seek(offset) # backup file pointer to beginning of record
                     return offset     # and return offset of record
-                if (record['majik'] == 0):
-                    zero_sigs += 1    # series of zeros means no data in file
-                    if (zero_sigs > MAX_ZERO_SIGS):
-                        eprint('*** resync: too many zeros ({} x 4), bailing, @{}'.format(
-                            MAX_ZERO_SIGS, offset))
-                        return EODATA      # file looks empty
-                    else:
-                        zero_sigs = 0
-                offset += 4         # advance to next quad-aligned word and repeat
+                offset += 4         # advance past this candidate and repeat
                 if (self.verbose >= 3):
                     rlen   = record['hdr']['len'].val
                     rtype  = record['hdr']['type'].val
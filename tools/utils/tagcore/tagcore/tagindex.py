@@ -0,0 +1,232 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+sidecar record index for dblk files
+
+A TagIndex holds the file offset, recnum, rtype, rlen and rtctime (as
+microseconds since the epoch) for records in a dblk file.  It is stored
+next to the dblk file as <input>.idx and lets TagFile/tagdump jump
+straight to a record number or a time without walking the file.
+
+A sparse index only holds SYNC records (SYNC, SYNC_FLUSH, SYNC_REBOOT).
+Lookups on a sparse index land on the SYNC at or before the target and
+the caller walks forward from there.
+
+sidecar layout (little endian):
+
+    header:  magic (8s), version (H), flags (H), count (I),
+             src_size (Q), src_mtime (d)
+    columns: offsets (Q), recnums (I), rtypes (H), rlens (H),
+             rt_us (q).  count entries each, one column after another.
+
+Lookups use bisect on the running maximum of recnum/rt_us.  Time can
+jump backwards (reboot, time skew) and the running max keeps the search
+conservative: we never land beyond a record that is a candidate.
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'TagIndex',
+    'index_name',
+    'IDX_SUFFIX',
+]
+
+import os
+import struct
+from   array        import array
+from   bisect       import bisect_left
+
+from   .dt_defs     import DT_SYNC, DT_SYNC_FLUSH, DT_SYNC_REBOOT
+from   .misc_utils  import eprint
+
+IDX_SUFFIX      = '.idx'
+IDX_MAJIK       = 'TAGIDX\0\0'
+IDX_VERSION     = 1
+IDX_SPARSE      = 0x0001
+
+idx_hdr_struct  = struct.Struct('<8sHHIQd')
+
+# column struct codes, and array typecodes used while building.
+idx_columns     = (('Q', 'L'), ('I', 'L'), ('H', 'H'), ('H', 'H'), ('q', 'l'))
+IDX_CHUNK       = 65536             # entries per pack when writing
+
+sync_rtypes     = (DT_SYNC, DT_SYNC_FLUSH, DT_SYNC_REBOOT)
+
+
+def index_name(name):
+    '''sidecar index file name for dblk file name'''
+    return name + IDX_SUFFIX
+
+
+class TagIndex(object):
+    '''sidecar record index
+
+    inputs:     sparse      only index SYNC records.
+
+    methods:    add         add a record (only SYNCs if sparse).
+                write       write the sidecar for the given dblk file.
+                load        (classmethod) read a sidecar, returns None
+                            if missing or out of date.
+                find_recnum offset to start at for a given recnum.
+                find_time   offset to start at for a given rt_us.
+    '''
+
+    def __init__(self, sparse = False):
+        super(TagIndex, self).__init__()
+        self.sparse    = sparse
+        self.offsets   = array('L')
+        self.recnums   = array('L')
+        self.rtypes    = array('H')
+        self.rlens     = array('H')
+        self.rt_us     = array('l')
+        self.src_size  = 0
+        self.src_mtime = 0.0
+        self.max_rec   = None
+        self.max_time  = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def add(self, offset, recnum, rtype, rlen, rt_us):
+        if self.sparse and rtype not in sync_rtypes:
+            return
+        self.offsets.append(offset)
+        self.recnums.append(recnum)
+        self.rtypes.append(rtype)
+        self.rlens.append(rlen)
+        self.rt_us.append(rt_us)
+        self.max_rec  = None
+        self.max_time = None
+
+    def entry(self, idx):
+        '''return (offset, recnum, rtype, rlen, rt_us) for entry idx'''
+        return (self.offsets[idx], self.recnums[idx], self.rtypes[idx],
+                self.rlens[idx], self.rt_us[idx])
+
+    def write(self, src_name, name = None):
+        '''
+        write the index as the sidecar of src_name.  The size and mtime
+        of the source are recorded so stale sidecars can be detected.
+        '''
+        name  = name if name else index_name(src_name)
+        st    = os.stat(src_name)
+        count = len(self)
+        flags = IDX_SPARSE if self.sparse else 0
+        tmp   = name + '.tmp'
+        with open(tmp, 'wb') as fd:
+            fd.write(idx_hdr_struct.pack(IDX_MAJIK, IDX_VERSION, flags, count,
+                                         st.st_size, st.st_mtime))
+            cols = (self.offsets, self.recnums, self.rtypes,
+                    self.rlens, self.rt_us)
+            for col, (code, tcode) in zip(cols, idx_columns):
+                for i in range(0, count, IDX_CHUNK):
+                    chunk = col[i:i + IDX_CHUNK]
+                    fd.write(struct.pack('<{}{}'.format(len(chunk), code),
+                                         *chunk))
+        os.rename(tmp, name)
+        self.src_size  = st.st_size
+        self.src_mtime = st.st_mtime
+        return name
+
+    @classmethod
+    def load(cls, src_name, name = None):
+        '''
+        load the sidecar for src_name.
+
+        dblk files are append only, so a sidecar is still usable if the
+        file has grown since it was written (lookups past its end start
+        at the last entry).  A sidecar for a file that has shrunk or that
+        has a bad header is ignored.  return None if no usable index.
+        '''
+        name = name if name else index_name(src_name)
+        try:
+            with open(name, 'rb') as fd:
+                raw = fd.read()
+            st = os.stat(src_name)
+        except (IOError, OSError):
+            return None
+        if len(raw) < idx_hdr_struct.size:
+            return None
+        majik, version, flags, count, src_size, src_mtime = \
+                idx_hdr_struct.unpack_from(raw, 0)
+        if majik != IDX_MAJIK or version != IDX_VERSION:
+            eprint('*** index: {} bad majik/version, ignored'.format(name))
+            return None
+        if src_size > st.st_size:
+            eprint('*** index: {} is stale (file shrank), ignored'.format(name))
+            return None
+
+        idx = cls(sparse = bool(flags & IDX_SPARSE))
+        idx.src_size  = src_size
+        idx.src_mtime = src_mtime
+        offset = idx_hdr_struct.size
+        cols   = []
+        for code, tcode in idx_columns:
+            col_struct = struct.Struct('<{}{}'.format(count, code))
+            if offset + col_struct.size > len(raw):
+                eprint('*** index: {} truncated, ignored'.format(name))
+                return None
+            cols.append(array(tcode, col_struct.unpack_from(raw, offset)))
+            offset += col_struct.size
+        idx.offsets, idx.recnums, idx.rtypes, idx.rlens, idx.rt_us = cols
+        return idx
+
+    @staticmethod
+    def running_max(col):
+        out = array(col.typecode)
+        cur = None
+        for v in col:
+            if cur is None or v > cur:
+                cur = v
+            out.append(cur)
+        return out
+
+    def lookup(self, keys, target):
+        '''
+        return the entry index to start at to see everything >= target.
+        dense:  first entry >= target.
+        sparse: the SYNC before the first SYNC >= target.
+        -1 says start at the beginning.
+        '''
+        n = bisect_left(keys, target)
+        if self.sparse:
+            n -= 1
+        if n < 0:
+            return -1
+        if n >= len(keys):
+            n = len(keys) - 1           # past the end, start at the last
+        return n
+
+    def find_recnum(self, recnum):
+        if not len(self):
+            return -1
+        if self.max_rec is None:
+            self.max_rec = self.running_max(self.recnums)
+        return self.lookup(self.max_rec, recnum)
+
+    def find_time(self, rt_us):
+        if not len(self):
+            return -1
+        if self.max_time is None:
+            self.max_time = self.running_max(self.rt_us)
+        return self.lookup(self.max_time, rt_us)
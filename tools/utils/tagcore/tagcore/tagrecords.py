@@ -0,0 +1,759 @@
+# Copyright (c) 2017-2020 Daniel J. Maltbie, Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Daniel J. Maltbie <dmaltbie@daloma.org>
+#          Eric B. Decker <cire831@gmail.com>
+
+'''
+record level access to tag data streams
+
+RecordReader pulls validated records (length, recnum, checksum,
+required length) out of a TagFile, resyncing as needed.  By itself it
+is silent and just counts.  ReportingReader is the display flavor,
+what tagdump and tagfleet use: it reports problems the tagdump way and
+decodes and emits records (decode), with recnum_check for record number
+gaps.
+
+iter_records is the library interface.  It yields Record namedtuples
+holding plain values (no references to the shared dt_records objects):
+
+    for rec in iter_records('dblk/DBLK0004', rtypes = ['SYNC', 'EVENT']):
+        print(rec.recnum, rec.name, rec.data['event'])
+
+merge_records streams several dblk files at once (one open iter_records
+per file, one pending record each) and yields their records in global
+rtctime order, each tagged with the file it came from:
+
+    for rec in merge_records([ ('tag1', 'tag1/DBLK0004'), 'tag2.dblk' ]):
+        print(rec.tag, rec.rt_us, rec.name)
+
+RecordVerifier is for whole file validation.  It walks record headers a
+window at a time and checksums each window's records in one go
+(chksum_records, NumPy if available) without decoding anything, and
+reports the byte ranges the reader would have had to resync over.  With
+checksums off it is a header only scan, payloads are never touched.
+'''
+
+from   __future__   import print_function
+
+__version__ = '0.4.8.dev1'
+
+__all__ = [
+    'RecordReader',
+    'ReportingReader',
+    'recnum_check',
+    'Record',
+    'iter_records',
+    'TagRecord',
+    'merge_records',
+    'obj_values',
+    'RecordVerifier',
+    'chksum_records',
+]
+
+import os
+import heapq
+import struct
+from   collections  import namedtuple
+
+import tagcore.globals as g
+from   .base_objs   import atom
+from   .core_headers import obj_dt_hdr
+from   .dt_defs     import *
+import dt_defs      as     dtd
+from   .tagfile     import TagFile
+from   .misc_utils  import rtc2epoch_us, eprint, dump_buf
+from   .output_sinks import oprint
+
+# 1st sector of the first is the directory
+DBLK_DIR_SIZE           = 0x200
+RLEN_MAX_SIZE           = 1024
+RESYNC_HDR_OFFSET       = 28            # how to get back to the start
+                                        # or how to move past the majik
+
+# RecordVerifier: bytes of file looked at per pass.  Records straddling
+# the end of a window are picked up by the next one.
+VERIFY_WINDOW           = 1024 * 1024
+
+# len, type, hdr_crc8, recnum, (rt), recsum.  see core_headers.obj_dt_hdr
+dt_hdr_struct           = struct.Struct('<HBBI10xH')
+
+np = False                              # numpy, see numpy_mod
+
+
+def numpy_mod():
+    '''
+    numpy, imported the first time it is needed (it takes longer to load
+    than the rest of tagcore), None if it isn't installed.
+    chksum_records falls back to sum().
+    '''
+    global np
+    if np is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+
+class RecordReader(object):
+    '''
+    validated records from a TagFile
+
+    inputs:     infile  TagFile positioned where records should be read
+                hdr     obj_dt_hdr to decode headers into (optional)
+
+    methods:    get_record  next good record, (offset, hdr, rec_buf)
+                            or (-1, hdr, '') at the end of the data.
+                chksum      checksum of a record buffer.
+                resync      find the next SYNC at or after offset.
+                sync_flush  skip to the next sector after a SYNC_FLUSH.
+                records     generator of get_record results that also
+                            handles SYNC_FLUSH.
+
+    subclass hooks (defaults are silent):
+                log         diagnostic messages, called like print.
+                chksum_fail checksum mismatch, (offset, recsum, chksum, buf)
+                len_fail    required length mismatch,
+                            (offset, required_len, rlen, buf)
+
+    counters:   resyncs, chksum_errors
+    '''
+
+    def __init__(self, infile, hdr = None):
+        super(RecordReader, self).__init__()
+        self.infile        = infile
+        self.hdr           = hdr if hdr is not None else obj_dt_hdr()
+        self.resyncs       = 0
+        self.chksum_errors = 0
+
+    def log(self, *args):
+        pass
+
+    def chksum_fail(self, offset, recsum, chksum, rec_buf):
+        pass
+
+    def len_fail(self, offset, required_len, rlen, rec_buf):
+        pass
+
+    def chksum(self, rec_buf, rlen, recsum):
+        '''
+        checksum of the record in rec_buf.
+
+        sum the entire record (byte by byte) and then remove the bytes from recsum.
+        recsum was computed with the field being 0 and then layed down
+        so we need to remove it before comparing.  Recsum is 16 bits wide so can not
+        simply be added in as part of the checksum computation.
+        '''
+        chksum = sum(rec_buf[:rlen])
+        chksum -= (recsum & 0xff00) >> 8
+        chksum -= (recsum & 0x00ff)
+        return chksum & 0xffff              # force to 16 bits vs. 16 bit recsum
+
+    def resync(self, offset):
+        self.resyncs += 1
+        return self.infile.resync(offset)
+
+    def sync_flush(self, rec_offset):
+        '''
+        SYNC_FLUSH says the rest of the sector is empty, advance to the
+        next sector boundary.  System_Flush and we should have a reboot
+        record in the next sector.
+        '''
+        new_offset = rec_offset + 512
+        new_offset &= 0xfffffe00
+        self.log()
+        self.log('*** SYNC_FLUSH: @{} advancing to next '
+                 'sector @{}'.format(rec_offset, new_offset))
+        self.log()
+        self.infile.seek(new_offset)
+
+    def records(self):
+        while True:
+            rec_offset, hdr, rec_buf = self.get_record()
+            if rec_offset < 0:
+                return
+            yield rec_offset, hdr, rec_buf
+            if hdr['type'].val == DT_SYNC_FLUSH:
+                self.sync_flush(rec_offset)
+
+    def get_record(self):
+        """
+        Generate valid typed-data records one at a time until no more bytes
+        can be read from the input file.
+
+        Yields one record each time:
+            dt_hdr_obj: (len, type, recnum, rtctime, recsum)
+
+        Output:  rec_offset: byte offset of the record from start of file
+                 hdr         obj_dt_hdr (see above)
+                 rec_buf:    byte buffer with entire record
+        """
+
+        fd          = self.infile
+        log         = self.log
+
+        # output and other vars
+        offset      = -1
+        hdr         = self.hdr
+        rec_buf     = bytearray()
+
+        hdr_len     = len(hdr)              # only call it once
+        rlen        = 0
+        rtype       = 0
+        recnum      = 0
+        recsum      = 0
+
+        align0 = '*** aligning offset {0} (0x{0:x}) -> {1} (0x{1:x}) [{2} bytes]'
+
+        last_offset = 0                     # protects against finding same sync
+
+        while (True):
+            offset = fd.tell()
+            # new records are required to start on a quad boundary
+            # however, we always read to the next quad alignment to help ensure
+            # that the sparse tagfuse stuff works better (fewer holes).
+            if (offset & 3):
+                new_offset = ((offset/4) + 1) * 4
+                log(align0.format(offset, new_offset, new_offset - offset))
+                offset = new_offset
+                fd.seek(offset)
+            if (offset == last_offset):
+                #
+                # offset/last_offset being equal says we are doing a resync
+                # and we ended back at the same record.
+                #
+                # advance our current position to just beyond the last sync we
+                # tried and find the next sync.
+                #
+                offset += RESYNC_HDR_OFFSET
+                log('*** resyncing: moving past current majik to: @{0} (0x{0:x})'.format(
+                    offset))
+                offset = self.resync(offset)
+                if (offset < 0):
+                    break
+                continue
+            last_offset = offset
+            rec_buf = bytearray(fd.read(hdr_len))
+            if len(rec_buf) < hdr_len:
+                if rec_buf:                 # nothing at all is just the end
+                    log('*** record header read too short: wanted {}, got {}, @{}'.format(
+                        hdr_len, len(rec_buf), offset))
+                break                       # oops
+            hdr.set(rec_buf)
+            rlen   = hdr['len'].val
+            rtype  = hdr['type'].val
+            recnum = hdr['recnum'].val
+            recsum = hdr['recsum'].val
+
+            # check for obvious errors
+            if (rlen < hdr_len):
+                log('*** record size too small: {} @{}'.format(rlen, offset))
+                offset = self.resync(offset)
+                if (offset < 0):
+                    break
+                continue
+
+            if (rlen > RLEN_MAX_SIZE):
+                log('*** record size too large: {} @{}'.format(rlen, offset))
+                offset = self.resync(offset)
+                if (offset < 0):
+                    break
+                continue
+
+            if (recnum == 0):               # zero is never allowed
+                log('*** zero record number @{} - resyncing'.format(offset))
+                offset = self.resync(offset)
+                if (offset < 0):
+                    break
+                continue
+
+            # now see if we have any data payload
+            # if dlen is negative, that says we are below min header size
+            dlen = rlen - hdr_len
+            if (dlen < 0):                  # major oops, rlen is screwy
+                log('*** record header too short: wanted {} got {} @{}'.format(
+                    hdr_len, rlen, offset))
+                offset = self.resync(offset)
+                if (offset < 0):
+                    break
+                continue
+
+            # make sure to read bytes to the next quad alignment.  This helps
+            # to keep the tagfuse sparse file implementation happier.
+            # extra can NEVER be 0.  It can be 1, 2, 3, or 4.  4 indicates
+            # that we are already at a new quad alignment.
+            extra = 4 - ((offset + rlen) & 3)
+            if extra < 4:
+                if g.debug and g.verbose >= 5:
+                    log('*** reading extra {} bytes for quad alignment'.format(extra))
+                dlen += extra
+
+            if (dlen > 0):
+                rec_buf.extend(fd.read(dlen))
+
+            if (len(rec_buf) < rlen):
+                log('*** record read too short: wanted {} got {} @{}'.format(
+                    rlen, len(rec_buf), offset))
+                break                       # oops, bail
+
+            chksum = self.chksum(rec_buf, rlen, recsum)
+            if (chksum != recsum):
+                self.chksum_errors += 1
+                chksum1 = '*** checksum failure @{0} (0x{0:x}) ' + \
+                          '[wanted: 0x{1:x} got: 0x{2:x}]'
+                log(chksum1.format(offset, recsum, chksum))
+                self.chksum_fail(offset, recsum, chksum, rec_buf)
+                offset = self.resync(offset)
+                if (offset < 0):
+                    break
+                continue                    # try again
+
+            v = dtd.dt_records.get(rtype, (0, None, None, None, ''))
+            required_len = v[DTR_REQ_LEN]
+            if (required_len):
+                if (required_len != rlen):
+                    self.len_fail(offset, required_len, rlen, rec_buf)
+                    offset = self.resync(offset)
+                    if (offset < 0):
+                        break
+                    continue            # try again
+
+            # life is good.  return actual record.
+            return offset, hdr, rec_buf
+
+        # oops.  things blew up.  just return -1 for the offset
+        return -1, hdr, ''
+
+
+def recnum_check(last, recnum, offset):
+    """
+    sanity check record numbers, return list of complaints.
+    last is the previous recnum seen, 0 if none.
+    """
+    msgs = []
+    if (recnum < last):
+        msgs.append('*** recnum went backwards.  last: {}, new: {}, @{}'.format(
+            last, recnum, offset))
+    if (last and recnum > last + 1):
+        msgs.append('*** record gap: ({}) records @{}'.format(
+            recnum - last, offset))
+    return msgs
+
+
+class ReportingReader(RecordReader):
+    '''
+    RecordReader that complains the tagdump way.  Diagnostics (log) go
+    to stderr, a bad record's header and bytes go to the display output.
+
+    methods:    decode      decode the record get_record just returned
+                            and run its emitters.
+
+    counters:   resyncs, chksum_errors, decode_errors, undecoded
+    '''
+
+    def __init__(self, infile, hdr = None):
+        super(ReportingReader, self).__init__(infile, hdr)
+        self.decode_errors = 0
+        self.undecoded     = 0
+
+    def log(self, *args):
+        eprint(*args)
+
+    def chksum_fail(self, offset, recsum, chksum, rec_buf):
+        if g.mr_emitters:
+            from .mr_emitters import mr_chksum_err
+            mr_chksum_err(offset, recsum, chksum)
+        else:
+            if not dump_hdr(offset, rec_buf, '*** ') or g.verbose >= 3:
+                oprint()
+                dump_buf(rec_buf, '    ')
+
+    def len_fail(self, offset, required_len, rlen, rec_buf):
+        oprint('*** len violation, required: {} got {}'.format(
+            required_len, rlen))
+        dump_hdr(offset, rec_buf, '*** ')
+        oprint()
+        dump_buf(rec_buf, '    ')
+
+    def decode(self, rec_offset, rec_buf, emit = True):
+        '''
+        decode the record in rec_buf (self.hdr holds its header) and, if
+        emit, display it with its emitters.  returns the decoded object,
+        None if there is no decoder or it choked.
+        '''
+        hdr      = self.hdr
+        rlen     = hdr['len'].val
+        rtype    = hdr['type'].val
+        v = dtd.dt_records.get(rtype, (0, None, None, None, ''))
+        decoder  = v[DTR_DECODER]           # dt function
+        emitters = v[DTR_EMITTERS]          # emitter list
+        obj      = v[DTR_OBJ]               # dt object
+        if (decoder):
+            try:
+                decoder(g.verbose, rec_offset, rec_buf, obj)
+                if emit and emitters:
+                    for e in emitters:
+                        e(g.verbose, rec_offset, rec_buf, obj)
+            except struct.error:
+                self.decode_errors += 1
+                self.log('*** decoder/emitter struct/obj error: (len: {}, '
+                         'rtype: {} {}, wanted: {}), @{}'.format(
+                             rlen, rtype, dt_name(rtype),
+                             len(obj) if obj else 0, rec_offset))
+                obj = None
+        else:
+            self.undecoded += 1
+            obj = None
+            if g.debug or not g.quiet or g.verbose >= 5:
+                self.log('*** no decoder installed for rtype {}, @{}'.format(
+                    rtype, rec_offset))
+        if (g.verbose >= 3):
+            oprint()
+            dump_hdr(rec_offset, rec_buf, '    ')
+            dump_buf(rec_buf, '    ')
+        if g.verbose >= 1 and not g.quiet and not g.mr_emitters:
+            oprint()
+        return obj
+
+
+#
+# Record: one record from iter_records
+#
+#   offset  file offset of the record       recnum  record number
+#   rtype   dt record type (int)            name    record type name
+#   rt_us   rtctime, usecs since the epoch  rlen    record length
+#   raw     record bytes (str)              data    decoded values (dict)
+#                                                   or None (decode=False)
+#
+Record = namedtuple('Record',
+                    'offset recnum rtype name rt_us rlen raw data')
+
+
+def obj_values(obj):
+    '''
+    plain values from a decoded object.  aggies (and other dicts)
+    become dicts, atoms their values, lists and tuples lists.  Plain
+    values (numbers, strings, None) are left as they are, anything
+    else becomes its display string.
+    '''
+    if isinstance(obj, atom):
+        return obj.val
+    if isinstance(obj, dict):
+        return dict([ (k, obj_values(v)) for k, v in obj.iteritems() ])
+    if isinstance(obj, (list, tuple)):
+        return [ obj_values(v) for v in obj ]
+    if obj is None or isinstance(obj, (int, long, float, bool, basestring)):
+        return obj
+    return '{}'.format(obj)
+
+
+def iter_records(path, rtypes = None, start = None, end = None,
+                 start_rec = None, last_rec = None, decode = True):
+    '''
+    generate Records from the dblk file path.
+
+    rtypes      list of rtypes (ints) and/or rtype names to include.
+    start, end  rtctime window, usecs since the epoch (inclusive).
+    start_rec, last_rec
+                record number window (inclusive).
+    decode      fill in Record.data using the record's decoder.
+
+    Records are validated, resync'd and SYNC_FLUSH'd exactly as tagdump
+    does it (same RecordReader).  A sidecar index (see tagindex) is used
+    to find start/start_rec if present.  Nothing is printed.
+    '''
+    if not dtd.dt_records:
+        import core_populate            # need decoders and objects
+
+    if rtypes is not None:
+        names  = set([ r.upper() for r in rtypes if isinstance(r, basestring) ])
+        rtypes = set([ r for r in rtypes if not isinstance(r, basestring) ])
+        for rtype, v in dtd.dt_records.iteritems():
+            if v[DTR_NAME] in names:
+                rtypes.add(rtype)
+
+    with open(path, 'rb') as fd, TagFile(fd, quiet = True) as infile:
+        infile.seek(DBLK_DIR_SIZE)
+        if (start_rec or start) and infile.load_index():
+            if start_rec:
+                offset = infile.seek_recnum(start_rec)
+            else:
+                offset = infile.seek_time(start)
+            if offset < 0:
+                infile.seek(DBLK_DIR_SIZE)
+
+        reader = RecordReader(infile)
+        for rec_offset, hdr, rec_buf in reader.records():
+            rtype  = hdr['type'].val
+            recnum = hdr['recnum'].val
+            if rtypes is not None and rtype not in rtypes:
+                continue
+            if start_rec and recnum < start_rec:
+                continue
+            if last_rec and recnum > last_rec:
+                return
+            rt_us = rtc2epoch_us(hdr['rt'])
+            if start and rt_us < start:
+                continue
+            if end and rt_us > end:
+                return
+
+            v = dtd.dt_records.get(rtype, (0, None, None, None, 'dt/' + str(rtype)))
+            rlen = hdr['len'].val
+            data = None
+            if decode and v[DTR_DECODER] and v[DTR_OBJ] is not None:
+                try:
+                    v[DTR_DECODER](0, rec_offset, rec_buf, v[DTR_OBJ])
+                    data = obj_values(v[DTR_OBJ])
+                except struct.error:
+                    data = None
+            yield Record(rec_offset, recnum, rtype, v[DTR_NAME], rt_us,
+                         rlen, str(rec_buf[:rlen]), data)
+
+
+#
+# TagRecord: a Record from merge_records, tag says which source it
+# came from.  Fields are tag followed by the Record fields.
+#
+TagRecord = namedtuple('TagRecord', ('tag',) + Record._fields)
+
+
+def merge_records(sources, **kwargs):
+    '''
+    generate TagRecords from several dblk files in rtctime order.
+
+    sources     dblk file names and/or (tag, path) pairs.  A plain name's
+                tag is its basename without extension.
+    kwargs      passed to iter_records for each source (rtypes, start,
+                end, decode, ...).
+
+    A k-way merge: each source is an iter_records generator and the
+    heap holds one pending record per source, so memory does not grow
+    with file size.  Records with the same time come out in source
+    order.  Each source is expected to be in time order (a tag's
+    records are, other than the clock being set); if one isn't, its
+    records still come out in file order, merged as best the heap can.
+    '''
+    heap = []
+    for idx, src in enumerate(sources):
+        if isinstance(src, tuple):
+            tag, path = src
+        else:
+            path = src
+            tag  = os.path.splitext(os.path.basename(path))[0]
+        recs = iter_records(path, **kwargs)
+        for rec in recs:
+            heap.append((rec.rt_us, idx, tag, rec, recs))
+            break
+    heapq.heapify(heap)
+
+    while heap:
+        rt_us, idx, tag, rec, recs = heap[0]
+        yield TagRecord(tag, *rec)
+        rec = next(recs, None)
+        if rec is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (rec.rt_us, idx, tag, rec, recs))
+
+
+def chksum_records(buf, offsets, rlens, recsums):
+    '''
+    checksum many records at once.
+
+    buf         data holding the records (str, buffer or mmap)
+    offsets     record offsets into buf
+    rlens       record lengths
+    recsums     recsum from each record header
+
+    returns (ok, chksums), per record pass/fail and computed checksum.
+    Same rule as get_record: the byte sum of the record less the two
+    recsum bytes, 16 bits.  With NumPy this is one cumulative sum over
+    the span of buf covered, otherwise a sum() per record.
+    '''
+    if not len(offsets):
+        return [], []
+    np = numpy_mod()
+    if np is None:
+        chksums = []
+        for off, rlen, recsum in zip(offsets, rlens, recsums):
+            chksum  = sum(bytearray(buf[off:off + rlen]))
+            chksum -= (recsum & 0xff00) >> 8
+            chksum -= (recsum & 0x00ff)
+            chksums.append(chksum & 0xffff)
+        return [ c == r for c, r in zip(chksums, recsums) ], chksums
+
+    lo     = offsets[0]
+    offs   = np.array(offsets, dtype = np.int64) - lo
+    ends   = offs + np.array(rlens, dtype = np.int64)
+    span   = np.frombuffer(buf, np.uint8, int(ends.max()), lo)
+    csum   = np.zeros(len(span) + 1, dtype = np.int64)
+    np.cumsum(span, out = csum[1:])
+    sums   = np.array(recsums, dtype = np.int64)
+    chksums = (csum[ends] - csum[offs] - (sums >> 8) - (sums & 0xff)) & 0xffff
+    return chksums == sums, chksums
+
+
+class RecordVerifier(object):
+    '''
+    bulk header (and checksum) verification of a local dblk file
+
+    inputs:     infile  TagFile, local (not net_io).  Verification starts
+                        at its current position.
+                end     stop with records starting at or beyond end.
+                chksum  verify record checksums (default).  Without it
+                        only headers are read and payloads are skipped
+                        using len and quad alignment (tagdump --scan).
+
+    methods:    run     verify to the end, returns the list of corrupt
+                        ranges, (start, end, reason).  end is where the
+                        next good SYNC was found (or EOF).
+    hooks:      bad     called with each (start, end, reason) as found.
+                headers called with the good records of each window in
+                        file order, a list of (offset, rlen, rtype,
+                        recnum).  return the file offset to stop at to
+                        stop, None to keep going.
+
+    counters:   records, nbytes (good records), resyncs, chksum_errors
+
+    Record walking follows get_record: quad alignment, header sanity,
+    checksum, required length, SYNC_FLUSH sector skips, and the same
+    resync steps on any failure.  What it doesn't do is decode.
+    '''
+
+    def __init__(self, infile, end = None, chksum = True):
+        super(RecordVerifier, self).__init__()
+        self.infile        = infile
+        self.end           = end
+        self.chksum        = chksum
+        self.records       = 0
+        self.nbytes        = 0
+        self.resyncs       = 0
+        self.chksum_errors = 0
+        self.ranges        = []
+        if not dtd.dt_records:
+            import core_populate        # need required lengths
+        self.req_lens = dict([ (rtype, v[DTR_REQ_LEN])
+                               for rtype, v in dtd.dt_records.iteritems()
+                               if v[DTR_REQ_LEN] ])
+        if infile.mm is not None:
+            self.size = len(infile.mm)
+        else:
+            self.size = os.fstat(infile.fd.fileno()).st_size
+        if end is None or end > self.size:
+            self.end = self.size
+
+    def bad(self, start, end, reason):
+        pass
+
+    def headers(self, hdrs):
+        return None
+
+    def window(self, pos):
+        n = min(VERIFY_WINDOW, self.size - pos)
+        if self.infile.mm is not None:
+            return buffer(self.infile.mm, pos, n)
+        self.infile.fd.seek(pos)
+        return self.infile.fd.read(n)
+
+    def scan(self, pos, win):
+        '''
+        walk the headers in win (file offset pos).  returns a list of
+        (offset (into win), rlen, rtype, recnum, recsum), where to carry
+        on, and the (win offset, reason) of a bad header if we hit one.
+        '''
+        hdrs     = []
+        hdr_len  = dt_hdr_struct.size
+        req_lens = self.req_lens
+        wlen     = len(win)
+        o        = 0
+        while pos + o < self.end and o + hdr_len <= wlen:
+            rlen, rtype, crc8, recnum, recsum = \
+                        dt_hdr_struct.unpack_from(win, o)
+            if rlen < hdr_len:
+                return hdrs, o, (o, 'record size too small')
+            if rlen > RLEN_MAX_SIZE:
+                return hdrs, o, (o, 'record size too large')
+            if recnum == 0:
+                return hdrs, o, (o, 'zero record number')
+            if req_lens.get(rtype, rlen) != rlen:
+                return hdrs, o, (o, 'len violation')
+            if o + rlen > wlen:
+                break                   # straddles, next window
+            hdrs.append((o, rlen, rtype, recnum, recsum))
+            if rtype == DT_SYNC_FLUSH:
+                o = ((pos + o + 512) & ~0x1ff) - pos
+            else:
+                o = (o + rlen + 3) & ~3
+        return hdrs, o, None
+
+    def fail(self, start, reason):
+        '''record a corrupt range at start, returns where to resume'''
+        self.resyncs += 1
+        offset = self.infile.resync(start)
+        if offset == start:             # the SYNC itself is bad, move past
+            self.resyncs += 1
+            offset = self.infile.resync(start + RESYNC_HDR_OFFSET)
+        stop = offset if offset >= 0 else self.size
+        self.ranges.append((start, stop, reason))
+        self.bad(start, stop, reason)
+        return offset
+
+    def run(self):
+        pos = self.infile.tell()
+        pos = (pos + 3) & ~3
+        while pos < self.end:
+            win = self.window(pos)
+            hdrs, nxt, hdr_fail = self.scan(pos, win)
+            nrecs, chk_fail = len(hdrs), None
+            if self.chksum and hdrs:
+                offsets, rlens, rtypes, recnums, recsums = zip(*hdrs)
+                ok, chksums = chksum_records(win, offsets, rlens, recsums)
+                if numpy_mod() is not None:
+                    fails = np.flatnonzero(~ok)
+                else:
+                    fails = [ i for i, v in enumerate(ok) if not v ]
+                if len(fails):
+                    nrecs    = int(fails[0])
+                    chk_fail = 'checksum failure [wanted: 0x{:x} got: 0x{:x}]'.format(
+                        recsums[nrecs], int(chksums[nrecs]))
+            good = [ (pos + o, rlen, rtype, recnum)
+                     for o, rlen, rtype, recnum, recsum in hdrs[:nrecs] ]
+            self.records += nrecs
+            self.nbytes  += sum([ h[1] for h in good ])
+            stop = self.headers(good) if good else None
+            if stop is not None:
+                pos = stop
+                break
+            if chk_fail:
+                self.chksum_errors += 1
+                pos = self.fail(pos + hdrs[nrecs][0], chk_fail)
+            elif hdr_fail:
+                pos = self.fail(pos + hdr_fail[0], hdr_fail[1])
+            elif nxt == 0:
+                if pos < self.size:     # partial record at EOF
+                    self.ranges.append((pos, self.size, 'truncated record'))
+                    self.bad(pos, self.size, 'truncated record')
+                break
+            else:
+                pos += nxt
+                continue
+            if pos < 0:
+                break
+        self.infile.seek(pos if 0 <= pos <= self.size else self.size)
+        return self.ranges
@@ -26,14 +26,15 @@ import ubx_defs       as     ubx
 from   gps_chip_utils import *
 from   misc_utils     import buf_str
 from   misc_utils     import dump_buf
+from   output_sinks   import oprint
 
 __version__ = '0.4.6'
 
 
 def emit_default(level, offset, buf, obj):
-    print()
+    oprint()
     if (level >= 1):
-        print('    {}'.format(obj))
+        oprint('    {}'.format(obj))
 
 
 ########################################################################
@@ -65,14 +66,14 @@ def emit_sirf_nav_data(level, offset, buf, obj):
 
     fix     = mode1 & GPS_FIX_MASK
     fix_str = gps_fix_name(fix)
-    print('   {:5s}  [{}]'.format(fix_str, nsats))
+    oprint('   {:5s}  [{}]'.format(fix_str, nsats))
 
     if (level >= 1):
         prns     = obj['prns'].val
         prn_list = ' '.join(['{:02}'.format(ord(x)) for x in prns if ord(x) != 0])
-        print(rnav1a.format(nsats, xpos, ypos, zpos, xvel, yvel, zvel))
-        print(rnav1b.format(mode1, mode2, week10, tow))
-        print(rnav1c.format(prn_list, hdop))
+        oprint(rnav1a.format(nsats, xpos, ypos, zpos, xvel, yvel, zvel))
+        oprint(rnav1b.format(mode1, mode2, week10, tow))
+        oprint(rnav1c.format(prn_list, hdop))
 
 
 ########################################################################
@@ -95,56 +96,56 @@ def emit_sirf_navtrk(level, offset, buf, obj):
            obj[n]['sv_id'] <= 32 and \
            obj[n]['cno_avg'] > 20.0:
             good_sats += 1
-    print('         [{}]'.format(good_sats))
+    oprint('         [{}]'.format(good_sats))
     if (level >= 1):
-        print(rnavtrk1.format(week10, tow, chans))
+        oprint(rnavtrk1.format(week10, tow, chans))
         for n in range(chans):
             if (obj[n]['cno_avg']):
                 state = obj[n]['state']
-                print(rnavtrkx.format(obj[n]['sv_id'],
-                                      obj[n]['sv_az23']*3.0/2.0,
-                                      obj[n]['sv_el2']/2.0,
-                                      state, gps_expand_trk_state_short(state),
-                                      obj[n]['cno_avg']))
+                oprint(rnavtrkx.format(obj[n]['sv_id'],
+                                       obj[n]['sv_az23']*3.0/2.0,
+                                       obj[n]['sv_el2']/2.0,
+                                       state, gps_expand_trk_state_short(state),
+                                       obj[n]['cno_avg']))
     if (level >= 2):
-        print()
+        oprint()
         for n in range(chans):
             cno_str = ''
             state = obj[n]['state']
             for i in range(10):
                 cno_str += ' {:2}'.format(obj[n]['cno'+str(i)])
-            print(rnavtrky.format(obj[n]['sv_id'],
-                                  obj[n]['sv_az23']*3.0/2.0,
-                                  obj[n]['sv_el2']/2.0,
-                                  state,
-                                  cno_str))
+            oprint(rnavtrky.format(obj[n]['sv_id'],
+                                   obj[n]['sv_az23']*3.0/2.0,
+                                   obj[n]['sv_el2']/2.0,
+                                   state,
+                                   cno_str))
             if state:
-                print('                        ', end='')
-                print('             ', end='')
-                print('{:#4x} {}'.format(state, gps_expand_trk_state_long(state)))
+                oprint('                        ', end='')
+                oprint('             ', end='')
+                oprint('{:#4x} {}'.format(state, gps_expand_trk_state_long(state)))
     if (level >= 3):
-        print()
-        print('raw:')
+        oprint()
+        oprint('raw:')
         for n in range(chans):
             cno_str = ''
             for i in range(10):
                 cno_str += ' {:2}'.format(obj[n]['cno'+str(i)])
-            print(rnavtrkz.format(obj[n]['sv_id'],
-                                  obj[n]['sv_az23'],
-                                  obj[n]['sv_el2'],
-                                  obj[n]['state'],
-                                  cno_str))
+            oprint(rnavtrkz.format(obj[n]['sv_id'],
+                                   obj[n]['sv_az23'],
+                                   obj[n]['sv_el2'],
+                                   obj[n]['state'],
+                                   cno_str))
 
 
 # mid 6 swver
 def emit_sirf_swver(level, offset, buf, obj):
-    print()
+    oprint()
     if (level >= 1):
-        print('    {}'.format(obj))
+        oprint('    {}'.format(obj))
 
 # mids 11 and 12, ack/nack
 def emit_sirf_ack_nack(level, offset, buf, obj):
-    print(' ({}/{})'.format(buf[0], buf[1]))
+    oprint(' ({}/{})'.format(buf[0], buf[1]))
 
 
 # mid 14, almanac data
@@ -155,12 +156,12 @@ def emit_sirf_alm_data(level, offset, buf, obj):
     chksum = obj['checksum'].val
     ok     = 'G' if (week & 0x3f) else 'x'
     week = week >> 6
-    print('  {:2d}/{}'.format(svid, ok))
+    oprint('  {:2d}/{}'.format(svid, ok))
     if level >= 1:
-        print('    sv: {:2d}  week: {:4d}  checksum: 0x{:04x}'.format(
+        oprint('    sv: {:2d}  week: {:4d}  checksum: 0x{:04x}'.format(
             svid, week, chksum))
     if level >= 2:
-        print()
+        oprint()
         dump_buf(data, '    ', 'data: ')
 
 
@@ -168,27 +169,27 @@ def emit_sirf_alm_data(level, offset, buf, obj):
 def emit_sirf_ephem_data(level, offset, buf, obj):
     svid   = obj['sv_id'].val
     data   = obj['data'].val
-    print('  {}'.format(svid))
+    oprint('  {}'.format(svid))
     if level >= 2:
-        print()
+        oprint()
         dump_buf(data, '    ', 'data: ')
 
 
 # mid 18, OkToSend
 def emit_sirf_ots(level, offset, buf, obj):
     ans = 'yes' if obj.val else 'no'
-    print(' (' + ans + ')')
+    oprint(' (' + ans + ')')
 
 
 def emit_sirf_vis(level, offset, buf, obj):
     num_sats = obj['vis_sats'].val
-    print('          [{}]'.format(num_sats))
+    oprint('          [{}]'.format(num_sats))
     sats = [ obj[n]['sv_id'] for n in range(num_sats) ]
     if level >= 1:
-        print('    {:<2} sats: {}'.format(num_sats, " ".join(map(str, sats))))
+        oprint('    {:<2} sats: {}'.format(num_sats, " ".join(map(str, sats))))
     if level >= 2:
         for n in range(num_sats):
-            print('      {:2}:  el {:2}   az {:3}'.format(
+            oprint('      {:2}:  el {:2}   az {:3}'.format(
                 obj[n]['sv_id'], obj[n]['sv_el'], obj[n]['sv_az']))
 
 
@@ -265,25 +266,25 @@ def emit_sirf_geo(level, offset, buf, obj):
     fix = GPS_OD_FIX if fix and nav_valid == 0 else fix
     fix_str = gps_fix_name(fix)
     fix_str = 'nofix_OD' if fix == 0 and nav_valid == 0 else fix_str
-    print('   {:5}  [{}]'.format(fix_str, nsats))
+    oprint('   {:5}  [{}]'.format(fix_str, nsats))
     if (level >= 1):
-        print(rgeo1a.format(xweek, tow, utc_year, utc_month, utc_day,
-                            utc_hour, utc_min, utc_sec, utc_ms))
-        print(rgeo1b.format(lat_str, lon_str, alt_elipsoid, alt_msl))
+        oprint(rgeo1a.format(xweek, tow, utc_year, utc_month, utc_day,
+                             utc_hour, utc_min, utc_sec, utc_ms))
+        oprint(rgeo1b.format(lat_str, lon_str, alt_elipsoid, alt_msl))
         sat_str = '{} sats ({}) [{}]'.format(nsats, fix_str, gps_expand_satmask(sat_mask))
-        print(rgeo1c.format(sat_str, alt_e_ft, alt_msl_ft))
+        oprint(rgeo1c.format(sat_str, alt_e_ft, alt_msl_ft))
 
     if (level >= 2):
-        print()
-        print(rgeo2a.format(nav_valid, nav_type, xweek, obj['tow1000'].val))
-        print(rgeo2b.format(utc_year, utc_month, utc_day, utc_hour, utc_min,
-                            obj['utc_ms'].val, sat_mask))
-        print(rgeo2c.format(lat, lon, obj['alt_elipsoid'].val,
-                            obj['alt_msl'].val, map_datum))
-        print(rgeo2d.format(sog, cog, mag_var, climb, heading_rate, ehpe))
-        print(rgeo2e.format(evpe, ete, ehve, clock_bias, clock_bias_err))
-        print(rgeo2f.format(clock_drift, clock_drift_err, distance, distance_err))
-        print(rgeo2g.format(head_err, nsats, hdop, additional_mode))
+        oprint()
+        oprint(rgeo2a.format(nav_valid, nav_type, xweek, obj['tow1000'].val))
+        oprint(rgeo2b.format(utc_year, utc_month, utc_day, utc_hour, utc_min,
+                             obj['utc_ms'].val, sat_mask))
+        oprint(rgeo2c.format(lat, lon, obj['alt_elipsoid'].val,
+                             obj['alt_msl'].val, map_datum))
+        oprint(rgeo2d.format(sog, cog, mag_var, climb, heading_rate, ehpe))
+        oprint(rgeo2e.format(evpe, ete, ehve, clock_bias, clock_bias_err))
+        oprint(rgeo2f.format(clock_drift, clock_drift_err, distance, distance_err))
+        oprint(rgeo2g.format(head_err, nsats, hdop, additional_mode))
 
 
 def emit_sirf_sid_dispatch(level, offset, buf, obj, table, table_name):
@@ -292,11 +293,11 @@ def emit_sirf_sid_dispatch(level, offset, buf, obj, table, table_name):
     emitters = v[EE_EMITTERS]
     obj      = v[EE_OBJECT]
     name     = v[EE_NAME]
-    print(' ({})'.format(name), end = '')
+    oprint(' ({})'.format(name), end = '')
     if not emitters or len(emitters) == 0:
-        print()                         # default clean line
+        oprint()                         # default clean line
         if (level >= 5):
-            print('*** {}: no emitters defined for sid {}'.format(
+            oprint('*** {}: no emitters defined for sid {}'.format(
                 table_name, sid))
         return
     for e in emitters:
@@ -330,30 +331,30 @@ def emit_sirf_ee232(level, offset, buf, obj):
 def emit_ee56_bcastEph(level, offset, buf, obj):
     channel = obj['channel'].val
     svid    = obj['svid'].val
-    print('  c{} s{}'.format(channel, svid))
+    oprint('  c{} s{}'.format(channel, svid))
     if (level >= 1):
-        print()
+        oprint()
         data = obj['data'].val
         dump_buf(data, '    ', 'data: ')
 
 
 def emit_ee56_sifStat(level, offset, buf, obj):
-    print()
+    oprint()
     if (level >= 1):
-        print('    {}'.format(obj))
+        oprint('    {}'.format(obj))
 
 
 # mid 128, init data source, restart or factory reset
 def emit_sirf_init_data_src(level, offset, buf, obj):
     reset_config = obj['reset_config'].val
-    print('  (0x{:02x})'.format(reset_config))
+    oprint('  (0x{:02x})'.format(reset_config))
     if level >= 1:
-        print('    {}'.format(obj))
+        oprint('    {}'.format(obj))
 
 
 # mid 130, set almanac data
 def emit_sirf_alm_set(level, offset, buf, obj):
-    print()
+    oprint()
     data   = obj['data'].val
     if level >= 2:
         dump_buf(data, '    ', 'data: ')
@@ -361,7 +362,7 @@ def emit_sirf_alm_set(level, offset, buf, obj):
 
 # mid 149, set ephemeris data
 def emit_sirf_ephem_set(level, offset, buf, obj):
-    print()
+    oprint()
     data   = obj['data'].val
     if level >= 2:
         dump_buf(data, '    ', 'data: ')
@@ -383,7 +384,7 @@ def emit_sirf_set_msg_rate(level, offset, buf, obj):
     mid  = obj['mid'].val
     rate = obj['rate'].val
 
-    print(' ({},{},{})'.format(mode,mid,rate))
+    oprint(' ({},{},{})'.format(mode,mid,rate))
     mode_name = mode_names.get(mode, 'mode/' + str(mode))
     v = sirf.mid_table.get(mid, (None, None, None, 'mid/' + str(mid)))
     mid_name = v[MID_NAME]
@@ -406,7 +407,7 @@ def emit_sirf_set_msg_rate(level, offset, buf, obj):
     else:
         mid_num = '  <{} ({:02x})>'.format(mid, mid)
         result = ' '.join([mode_name,    mid_name, rate, mid_num])
-    print('    setMsgRate: {}'.format(result))
+    oprint('    setMsgRate: {}'.format(result))
 
 
 # mid 233/<sid>
@@ -416,10 +417,10 @@ def emit_sirf_pwr_mode_req(level, offset, buf, obj):
     control = obj['control'].val
     reserved = obj['reserved'].val
     if sid == 2:
-        print(' MPM  {} {}'.format(timeout, control))
+        oprint(' MPM  {} {}'.format(timeout, control))
     else:
-        print()                         # clean line
-        print(obj)
+        oprint()                         # clean line
+        oprint(obj)
 
 
 # sirf_pwr_mode_rsp
@@ -436,7 +437,7 @@ def emit_sirf_pwr_mode_rsp(level, offset, buf, obj):
     if sid == 2:
         if error == 0x0010: ok_str = 'ok'
         else:               ok_str = 'oops'
-        print(' MPM {} (0x{:04x})'.format(ok_str, error))
+        oprint(' MPM {} (0x{:04x})'.format(ok_str, error))
         if level >= 1 or error != 0x0010:
             err_list = []
             if (error == 0x0000): err_list.append('none?')
@@ -448,11 +449,11 @@ def emit_sirf_pwr_mode_rsp(level, offset, buf, obj):
             if (error == 0x0010): pre = '   '
             else:                 pre = '***'
             if (error != 0x0010):
-                print('{} MPM response: {:04x} - <{}>'.format(pre, error,
-                                                   " ".join(err_list)))
+                oprint('{} MPM response: {:04x} - <{}>'.format(pre, error,
+                                                    " ".join(err_list)))
     else:
-        print()                         # get clean line
-        print(obj)
+        oprint()                         # get clean line
+        oprint(obj)
 
 
 rstat1a = '    STATS:  sid:    {}  ttff_reset:  {:3.1f}   ttff_aiding:  {:3.1f}      ttff_nav:  {:3.1f}'
@@ -493,22 +494,22 @@ def emit_mid225_6_stats(level, offset, buf, obj):
     pos_mode        = obj['pos_mode'].val
     status          = obj['status'].val
     start_mode      = obj['start_mode'].val
-    print('({})'.format(sid))
+    oprint('({})'.format(sid))
     if (level >= 1):
-        print(rstat1a.format(sid, ttff_reset/10.0, ttff_aiding/10.0,
-                             ttff_nav/10.0))
-        print(rstat1b.format(nav_mode, pos_mode, status,
-                             start_mode_names.get(start_mode,
-                                          'start/' + str(start_mode))))
+        oprint(rstat1a.format(sid, ttff_reset/10.0, ttff_aiding/10.0,
+                              ttff_nav/10.0))
+        oprint(rstat1b.format(nav_mode, pos_mode, status,
+                              start_mode_names.get(start_mode,
+                                           'start/' + str(start_mode))))
     if (level >= 2):
-        print(' raw:')
-        print(rstat2a.format(ttff_reset, ttff_aiding, ttff_nav))
-        print(rstat2b.format(nav_mode, pos_mode, status, start_mode))
-        print(rstat2c.format(pae_n, pae_e, pae_d, time_aiding_err))
-        print(rstat2d.format(pos_unc_horz, pos_unc_vert, time_unc, freq_unc))
-        print(rstat2e.format(n_aided_ephem, n_aided_acq, freq_aiding_err))
+        oprint(' raw:')
+        oprint(rstat2a.format(ttff_reset, ttff_aiding, ttff_nav))
+        oprint(rstat2b.format(nav_mode, pos_mode, status, start_mode))
+        oprint(rstat2c.format(pae_n, pae_e, pae_d, time_aiding_err))
+        oprint(rstat2d.format(pos_unc_horz, pos_unc_vert, time_unc, freq_unc))
+        oprint(rstat2e.format(n_aided_ephem, n_aided_acq, freq_aiding_err))
 
 def emit_sirf_dev_data(level, offset, buf, obj):
-    print()
+    oprint()
     if (level >= 1):
-        print('    {}'.format(obj))
+        oprint('    {}'.format(obj))
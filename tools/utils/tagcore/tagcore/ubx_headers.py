@@ -28,6 +28,7 @@ import binascii
 from   collections  import OrderedDict
 
 from   base_objs    import *
+from   output_sinks import oprint
 from   ubx_defs     import *
 import ubx_defs     as     ubx
 
@@ -534,7 +535,7 @@ def decode_sirf_navtrk(level, offset, buf, obj):
     # grab each channels cnos and other data
     for n in range(chans):
         d = {}                      # get a new dict
-        consumed += sirf_navtrk_chan.set(buf[consumed:])
+        consumed += sirf_navtrk_chan.set_from(buf, consumed)
         for k, v in sirf_navtrk_chan.items():
             d[k] = v.val
         avg  = d['cno0'] + d['cno1'] + d['cno2']
@@ -568,7 +569,7 @@ def decode_sirf_vis(level, offset, buf, obj):
 
     for n in range(num_sats):
         d = {}                          # new dict
-        consumed += sirf_vis_azel.set(buf[consumed:])
+        consumed += sirf_vis_azel.set_from(buf, consumed)
         for k, v in sirf_vis_azel.items():
             d[k] = v.val
         obj[n] = d
@@ -586,14 +587,14 @@ def decode_sirf_sid_dispatch(level, offset, buf, obj, table, table_name):
     sid_name = v[EE_NAME]
     if not decoder:
         if (level >= 5):
-            print('*** no decoder/obj defined for sid {}'.format(sid))
+            oprint('*** no decoder/obj defined for sid {}'.format(sid))
         return consumed
     try:
         consumed = consumed + \
                 decoder(level, offset, buf[consumed:], obj)
     except struct.error:
         print
-        print('*** decode error: {}: sid {} {}, @{}'.format(table_name,
+        oprint('*** decode error: {}: sid {} {}, @{}'.format(table_name,
             sid, sid_name, rec_offset))
     return consumed
 
@@ -3,10 +3,10 @@ tagdump:  decode and display Tag Data Stream file
 @author: Dan Maltbie/Eric B. Decker
 """
 
-from tagdump import dump
+from tagdump import run
 
 def main():
-    dump()
+    run()
 
 if __name__ == '__main__':
     main()
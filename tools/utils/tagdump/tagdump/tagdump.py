@@ -34,16 +34,23 @@ see tagdumpargs.py for argument processing.
 usage: tagdump.py [-h] [-v] [-V] [-H] [-j JUMP] [-e EndFilePos]
                   [--rtypes RTYPES(ints)] [--rnames RNAMES(name[,...])]
                   [-x | --export]
-                  [-s START_TIME] [-e END_TIME]
+                  [--start START_TIME] [--end END_TIME]
                   [-r START_REC]  [-l LAST_REC]
+                  [--index [--sparse]] [--verify-only]
+                  [--scan [--chksum]] [--checkpoint STATE]
+                  [--profile] [--cprofile FILE]
                   [-g GPS_EVAL]
-                  [-p | --pretty]
+                  [-p | --pretty] [-o OUTPUT]
                   input
 '''
 
 from   __future__         import print_function
 
-import struct
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
 
 # parse arguments and import result
 from   tagdumpargs         import args
@@ -54,9 +61,21 @@ import tagcore.core_rev    as     vers
 from   tagcore.dt_defs     import *
 import tagcore.dt_defs     as     dtd
 import tagcore.ubx_defs    as     ubx
+import tagcore.sensor_defs as     sensor
 from   tagcore.tagfile     import *
-from   tagcore.misc_utils  import eprint
-from   tagcore.mr_emitters import mr_chksum_err
+from   tagcore.tagindex    import TagIndex
+from   tagcore.checkpoint  import Checkpoint
+from   tagcore.dblk_dir    import DblkDir, find_data_end
+from   tagcore.tagrecords  import ReportingReader, RecordVerifier, DBLK_DIR_SIZE
+from   tagcore.tagrecords  import recnum_check
+from   tagcore.misc_utils  import eprint, rtc2epoch_us
+from   tagcore.output_sinks import oprint, open_output, set_output
+from   tagcore.output_sinks import get_output, output_flush, OutputSink
+from   tagcore.output_sinks import OUT_BUF_SIZE
+from   tagcore.profiling   import StageTimes, instrument_tables
+from   tagcore.npexport    import NpExport
+from   tagcore.sqlite_export import SqlExport
+import tagcore.json_emitters as je
 
 import tagdump_config                   # populate configuration
 
@@ -79,12 +98,8 @@ ver_str = '\ntagdump: ' + VERSION + ':  core: ' + str(CORE_REV) + \
 rec_low                 = 0            # inclusive
 rec_high                = 0            # inclusive
 rec_last                = 0            # last rec num looked at
-
-# 1st sector of the first is the directory
-DBLK_DIR_SIZE           = 0x200
-RLEN_MAX_SIZE           = 1024
-RESYNC_HDR_OFFSET       = 28            # how to get back to the start
-                                        # or how to move past the majik
+rec_last_off            = 0            # and its offset
+rec_next                = 0            # offset just past it (--checkpoint)
 
 # global stat counters
 num_resyncs             = 0             # how often we've resync'd
@@ -94,20 +109,35 @@ total_records           = 0
 total_bytes             = 0
 dt_hdr                  = obj_dt_hdr()
 
+# --jobs: the file is cut at SYNC records into about SHARDS_PER_JOB shards
+# per worker (but none smaller than SHARD_MIN_SIZE).  Each shard is dumped
+# by a worker process into temp files that are stitched back together in
+# file order.
+SHARDS_PER_JOB          = 4
+SHARD_MIN_SIZE          = 1024 * 1024
+first_rec_hook          = None          # shard workers, see dump_shard
+prof                    = None          # --profile StageTimes
+npx                     = None          # --npy NpExport
+sqx                     = None          # --sqlite SqlExport
+data_end                = None          # end of the written data, see process_dir
+
 
 def init_globals():
-    global rec_low, rec_high, rec_last
+    global rec_low, rec_high, rec_last, rec_last_off, rec_next
     global num_resyncs, chksum_errors, unk_rtypes
-    global total_records, total_bytes
+    global total_records, total_bytes, data_end
 
     rec_low             = 0
     rec_high            = 0
     rec_last            = 0
+    rec_last_off        = 0
+    rec_next            = 0
     num_resyncs         = 0             # how often we've resync'd
     chksum_errors       = 0             # checksum errors seen
     unk_rtypes          = 0             # unknown record types
     total_records       = 0
     total_bytes         = 0
+    data_end            = None
 
 
 def resync(fd, offset):
@@ -122,175 +152,495 @@ def resync(fd, offset):
     return fd.resync(offset)
 
 
-def get_record(fd):
+class DumpReader(ReportingReader):
     """
-    Generate valid typed-data records one at a time until no more bytes
-    can be read from the input file.
+    ReportingReader that keeps the global resync/checksum counters.
+    """
+
+    def resync(self, offset):
+        return resync(self.infile, offset)
 
-    Yields one record each time:
-        dt_hdr_obj: (len, type, recnum, rtctime, recsum)
+    def chksum_fail(self, offset, recsum, chksum, rec_buf):
+        global chksum_errors
+        chksum_errors += 1
+        super(DumpReader, self).chksum_fail(offset, recsum, chksum, rec_buf)
 
-    Input:   fd:         file descriptor we are reading from
-    Output:  rec_offset: byte offset of the record from start of file
-             hdr         obj_dt_hdr (see above)
-             rec_buf:    byte buffer with entire record
+
+class DumpVerifier(RecordVerifier):
+    """
+    RecordVerifier that prints each corrupt range as it is found.
     """
 
-    global chksum_errors
-
-    # output and other vars
-    offset      = -1
-    hdr         = dt_hdr
-    rec_buf     = bytearray()
-
-    hdr_len     = len(hdr)              # only call it once
-    rlen        = 0
-    rtype       = 0
-    recnum      = 0
-    recsum      = 0
-
-    align0 = '*** aligning offset {0} (0x{0:x}) -> {1} (0x{1:x}) [{2} bytes]'
-
-    last_offset = 0                     # protects against finding same sync
-
-    while (True):
-        offset = fd.tell()
-        # new records are required to start on a quad boundary
-        # however, we always read to the next quad alignment to help ensure
-        # that the sparse tagfuse stuff works better (fewer holes).
-        if (offset & 3):
-            new_offset = ((offset/4) + 1) * 4
-            eprint(align0.format(offset, new_offset, new_offset - offset))
-            offset = new_offset
-            fd.seek(offset)
-        if (offset == last_offset):
-            #
-            # offset/last_offset being equal says we are doing a resync
-            # and we ended back at the same record.
-            #
-            # advance our current position to just beyond the last sync we
-            # tried and find the next sync.
-            #
-            offset += RESYNC_HDR_OFFSET
-            eprint('*** resyncing: moving past current majik to: @{0} (0x{0:x})'.format(
-                offset))
-            offset = resync(fd, offset)
-            if (offset < 0):
-                break
-            continue
-        last_offset = offset
-        rec_buf = bytearray(fd.read(hdr_len))
-        if len(rec_buf) < hdr_len:
-            eprint('*** record header read too short: wanted {}, got {}, @{}'.format(
-                hdr_len, len(rec_buf), offset))
-            break                       # oops
-        hdr.set(rec_buf)
-        rlen   = hdr['len'].val
-        rtype  = hdr['type'].val
-        recnum = hdr['recnum'].val
-        recsum = hdr['recsum'].val
-
-        # check for obvious errors
-        if (rlen < hdr_len):
-            eprint('*** record size too small: {} @{}'.format(rlen, offset))
-            offset = resync(fd, offset)
-            if (offset < 0):
-                break
-            continue
+    def bad(self, start, end, reason):
+        oprint('*** corrupt @{0} (0x{0:x}) - @{1} (0x{1:x})  [{2} bytes]  {3}'.format(
+            start, end, end - start, reason))
 
-        if (rlen > RLEN_MAX_SIZE):
-            eprint('*** record size too large: {} @{}'.format(rlen, offset))
-            offset = resync(fd, offset)
-            if (offset < 0):
-                break
-            continue
 
-        if (recnum == 0):               # zero is never allowed
-            eprint('*** zero record number @{} - resyncing'.format(offset))
-            offset = resync(fd, offset)
-            if (offset < 0):
-                break
+class DumpScanner(DumpVerifier):
+    """
+    --scan.  Header only walk that keeps the same books as dump_records
+    (recnum gaps, dt_count, totals) and lists reboots.
+    """
+
+    def headers(self, hdrs):
+        global rec_last, total_records, total_bytes
+
+        for offset, rlen, rtype, recnum in hdrs:
+            for msg in recnum_check(rec_last, recnum, offset):
+                eprint(msg)
+            rec_last = recnum
+            if (args.rtypes and (str(rtype) not in args.rtypes) and
+                  (dt_name(rtype) not in args.rtypes)):
+                continue
+            if (rec_low and recnum < rec_low):
+                continue
+            if (rec_high and recnum > rec_high):
+                return offset + rlen
+            count_dt(rtype)
+            if rtype == DT_REBOOT:
+                oprint('@{0} (0x{0:x})  {1}  REBOOT'.format(offset, recnum))
+            total_records += 1
+            total_bytes   += rlen
+            if (args.num and total_records >= args.num):
+                return offset + rlen
+        return None
+
+
+def process_dir(fd):
+    '''
+    leave fd pointing at the first record.  The first time through,
+    read the dblk directory and find where the written data ends
+    (data_end), a binary search for the first erased sector.  Dumps
+    stop there (unless --tail) rather than walking erased sectors, and
+    -j -1 starts there.
+
+    The search assumes everything erased is past the end.  A hole in the
+    data (damage) that lands on a probe would stop the dump early, so
+    the end is only trusted if no SYNC follows it.  If one does, say so
+    and walk to EOF instead (data_end 0, no stop).
+    '''
+    global data_end
+
+    if data_end is None:
+        ddir = DblkDir.read(fd.name)
+        data_end = find_data_end(fd.name,
+                                 ddir.area_size if ddir.valid else None)
+        if g.debug or g.verbose >= 2:
+            eprint('*** {}'.format(ddir))
+            eprint('*** data ends @{0} (0x{0:x})'.format(data_end))
+        if not (args.tail or args.net) and \
+           data_end < os.path.getsize(fd.name):
+            sync = fd.resync(data_end)
+            if sync >= 0:
+                eprint('*** erased sector @{0} (0x{0:x}) but a SYNC follows '
+                       '@{1} (0x{1:x}), hole in the data, reading to the '
+                       'end'.format(data_end, sync))
+                data_end = 0
+    fd.seek(DBLK_DIR_SIZE)
+
+
+def stop_offset():
+    '''where processing stops, the end of the written data unless --tail'''
+    return None if args.tail or not data_end else data_end
+
+
+def build_index(fd, sparse):
+    '''
+    walk the input and write the sidecar index, <input>.idx.
+    get_record does all the validation (checksums, resyncs) so the
+    index only holds records tagdump itself would display.
+    '''
+    global total_records
+
+    index = TagIndex(sparse = sparse)
+    for rec_offset, hdr, rec_buf in DumpReader(fd, dt_hdr).records():
+        index.add(rec_offset, hdr['recnum'].val, hdr['type'].val,
+                  hdr['len'].val, rtc2epoch_us(hdr['rt']))
+        total_records += 1
+    name = index.write(fd.name)
+    eprint('*** index: {}  {} entries{}  ({} records)'.format(name,
+        len(index), ' (sparse)' if sparse else '', total_records))
+
+
+def verify(infile):
+    '''
+    --verify-only.  checksum and header check every record from the
+    current position, no decoding.  Prints the corrupt ranges and
+    returns how many there were.
+    '''
+    end = args.endpos + 1 if args.endpos else stop_offset()
+    verifier = DumpVerifier(infile, end)
+    ranges = verifier.run()
+    eprint()
+    eprint('*** end of verify @{0}  (0x{0:x})  good: {1} records  {2} bytes'.format(
+        infile.tell(), verifier.records, verifier.nbytes))
+    eprint('*** resyncs: {}  chksum_errs: {}  corrupt: {} ranges  {} bytes'.format(
+        verifier.resyncs, verifier.chksum_errors, len(ranges),
+        sum([ e - s for s, e, reason in ranges ])))
+    return len(ranges)
+
+
+def scan(infile):
+    '''
+    --scan.  Only record headers are read, payloads are skipped using
+    len and quad alignment (checksummed too with --chksum).  returns
+    the ending file offset.
+    '''
+    global num_resyncs, chksum_errors
+
+    end = args.endpos + 1 if args.endpos else stop_offset()
+    scanner = DumpScanner(infile, end, chksum = args.chksum)
+    scanner.run()
+    num_resyncs   += scanner.resyncs
+    chksum_errors += scanner.chksum_errors
+    return infile.tell()
+
+
+CKPT_COUNTS = ('num_resyncs', 'chksum_errors', 'unk_rtypes',
+               'total_records', 'total_bytes')
+
+
+def resume(infile):
+    '''
+    --checkpoint.  Load the state file and, if it still matches the
+    input (same file, the last record we processed is still where we
+    left it), restore the counters and seek to where we stopped.
+    returns the Checkpoint to save when done.
+    '''
+    global rec_last, rec_last_off, rec_next
+
+    ckpt = Checkpoint.load(args.checkpoint, args.input.name)
+    if ckpt is None:
+        return Checkpoint(args.checkpoint, args.input.name)
+    hdr = infile.peek_hdr(ckpt.last_offset)
+    if ckpt.recnum and (hdr is None or hdr[3] != ckpt.recnum):
+        eprint('*** checkpoint: record {} not @{}, starting over'.format(
+            ckpt.recnum, ckpt.last_offset))
+        return Checkpoint(args.checkpoint, args.input.name)
+    rec_last, rec_last_off, rec_next = \
+                ckpt.recnum, ckpt.last_offset, ckpt.offset
+    for k in CKPT_COUNTS:
+        globals()[k] = ckpt.counts.get(k, 0)
+    dtd.dt_count.update(ckpt.tables.get('dt_count', {}))
+    ubx.cid_count.update(ckpt.tables.get('cid_count', {}))
+    sensor.sns_count.update(ckpt.tables.get('sns_count', {}))
+    dtd.last_rt.update(ckpt.extra.get('last_rt', {}))
+    infile.seek(ckpt.offset)
+    eprint('*** checkpoint: resuming @{0} (0x{0:x}) after record {1}'.format(
+        ckpt.offset, ckpt.recnum))
+    return ckpt
+
+
+def checkpoint(ckpt):
+    '''--checkpoint.  save where we got to and the running counters'''
+    new = total_records - ckpt.counts.get('total_records', 0)
+    if rec_next:
+        ckpt.offset, ckpt.last_offset, ckpt.recnum = \
+                rec_next, rec_last_off, rec_last
+    ckpt.counts = dict([ (k, globals()[k]) for k in CKPT_COUNTS ])
+    ckpt.tables = { 'dt_count':  dtd.dt_count,
+                    'cid_count': ubx.cid_count,
+                    'sns_count': sensor.sns_count }
+    ckpt.extra  = { 'last_rt':   dtd.last_rt }
+    ckpt.save()
+    eprint('*** checkpoint: {} @{} (0x{:x})  {} new records'.format(
+        ckpt.name, ckpt.offset, ckpt.offset, new))
+
+
+def count_dt(rtype):
+    """
+    increment counter in dict of rtypes, create new entry if needed
+    also check for existence of dtd.dt_records entry.  If not known
+    count it as unknown.
+    """
+    global unk_rtypes
+
+    try:
+        dtd.dt_records[rtype]
+    except KeyError:
+        unk_rtypes += 1
+
+    try:
+        dtd.dt_count[rtype] += 1
+    except KeyError:
+        dtd.dt_count[rtype] = 1
+
+
+def dump_records(infile, end = None):
+    """
+    decode and emit records from the current position of infile.
+
+    stops at the end of the data, or at file offset end (a shard
+    boundary, see --jobs).  returns True if a filter (-l, --end,
+    --endpos, -n) says we are all done.
+    """
+    global rec_last, rec_last_off, rec_next, total_records, total_bytes
+
+    reader = DumpReader(infile, dt_hdr)
+    if prof:
+        profile_reader(prof, reader)
+    while(True):
+        if (end is not None and infile.tell() >= end):
+            break                       # end of shard
+        rec_offset, hdr, rec_buf = reader.get_record()
+
+        if (rec_offset < 0):
+            break
+        if (end is not None and rec_offset >= end):
+            infile.seek(rec_offset)     # leave it for the next shard
+            break
+
+        # hdr was populated (.set) by get_record
+        rlen     = hdr['len'].val
+        rtype    = hdr['type'].val
+        recnum   = hdr['recnum'].val
+
+        if (first_rec_hook and not rec_last):
+            first_rec_hook(rec_offset, recnum)
+        for msg in recnum_check(rec_last, recnum, rec_offset):
+            eprint(msg)
+        rec_last     = recnum
+        rec_last_off = rec_offset
+        rec_next     = infile.tell()
+
+        # apply any filters (inclusion)
+        if (args.rtypes):
+            # either the number rtype must be in the search list
+            # or the name of the rtype must be in the search list
+            if ((str(rtype)       not in args.rtypes) and
+                  (dt_name(rtype) not in args.rtypes)):
+                continue                   # not an rtype of interest
+
+        # look to see if record number bounds
+        if (rec_low and recnum < rec_low):
             continue
+        if (rec_high and recnum > rec_high):
+            return True                 # all done
 
-        # now see if we have any data payload
-        # if dlen is negative, that says we are below min header size
-        dlen = rlen - hdr_len
-        if (dlen < 0):                  # major oops, rlen is screwy
-            eprint('*** record header too short: wanted {} got {} @{}'.format(
-                hdr_len, rlen, offset))
-            offset = resync(fd, offset)
-            if (offset < 0):
-                break
+        # look to see if past file position bound
+        if (args.endpos and rec_offset > args.endpos):
+            return True                 # all done
+
+        # time bounds, rt_us is microseconds since the epoch
+        if (args.start or args.end):
+            rt_us = rtc2epoch_us(hdr['rt'])
+            if (args.start and rt_us < args.start):
+                continue
+            if (args.end and rt_us > args.end):
+                return True             # all done
+
+        count_dt(rtype)
+        if npx:                             # --npy, batched, no decode
+            npx.add(rtype, rec_offset, rec_buf)
+            total_records += 1
+            total_bytes   += rlen
             continue
+        obj = reader.decode(rec_offset, rec_buf, emit = not sqx)
+        if sqx and obj is not None:         # --sqlite, load, no display
+            sqx.add(rtype, rec_offset, recnum, rtc2epoch_us(hdr['rt']), obj)
+        total_records += 1
+        total_bytes   += rlen
+        if (args.num and total_records >= args.num):
+            return True
+        if rtype == DT_SYNC_FLUSH:
+            reader.sync_flush(rec_offset)
+            rec_next = infile.tell()
+    return False
+
+
+def profile_reader(times, reader):
+    '''time the record reading stages of reader (and its TagFile)'''
+    for key, obj, attr in (('get_record', reader, 'get_record'),
+                           ('chksum',     reader, 'chksum'),
+                           ('resync',     reader, 'resync'),
+                           ('read',       reader.infile, 'read')):
+        func = getattr(obj, attr)
+        if not hasattr(func, 'untimed'):
+            setattr(obj, attr, times.wrap((key, ''), func))
+
+
+def plan_shards(infile, njobs):
+    '''
+    cut the input from the current position to the end of the data
+    into shards.  Each boundary is the first valid SYNC at or after an
+    even split point.  returns a list of (start, end), the last shard's
+    end is the end of the data (None, EOF, if it isn't known).
+    '''
+    start = infile.tell()
+    size  = stop_offset() or os.path.getsize(infile.name)
+    nshards = min(njobs * SHARDS_PER_JOB, (size - start) / SHARD_MIN_SIZE)
+    bounds  = [ start ]
+    verbose = infile.verbose
+    infile.verbose = 0                  # quiet, this isn't a real resync
+    for i in range(1, nshards):
+        offset = start + ((size - start) * i) / nshards
+        offset = infile.resync(offset & ~3)
+        if offset < 0:
+            break
+        if offset > bounds[-1]:
+            bounds.append(offset)
+    infile.verbose = verbose
+    infile.seek(start)
+    return zip(bounds, bounds[1:] + [ stop_offset() ])
+
+
+def dump_shard(shard):
+    '''
+    worker side of --jobs.  dump one shard with stdout/stderr going to
+    temp files and hand back everything the parent needs to stitch the
+    shards together as if they were dumped serially.
+    '''
+    global first_rec_hook, rec_low, rec_high
 
-        # make sure to read bytes to the next quad alignment.  This helps
-        # to keep the tagfuse sparse file implementation happier.
-        # extra can NEVER be 0.  It can be 1, 2, 3, or 4.  4 indicates
-        # that we are already at a new quad alignment.
-        extra = 4 - ((offset + rlen) & 3)
-        if extra < 4:
-            if g.debug and g.verbose >= 5:
-                eprint('*** reading extra {} bytes for quad alignment'.format(extra))
-            dlen += extra
-
-        if (dlen > 0):
-            rec_buf.extend(bytearray(fd.read(dlen)))
-
-        if (len(rec_buf) < rlen):
-            eprint('*** record read too short: wanted {} got {} @{}'.format(
-                rlen, len(rec_buf), offset))
-            break                       # oops, bail
-
-        # verify checksum.
-        #
-        # sum the entire record (byte by byte) and then remove the bytes from recsum.
-        # recsum was computed with the field being 0 and then layed down
-        # so we need to remove it before comparing.  Recsum is 16 bits wide so can not
-        # simply be added in as part of the checksum computation.
-        #
-        chksum = sum(rec_buf[:rlen])
-        chksum -= (recsum & 0xff00) >> 8
-        chksum -= (recsum & 0x00ff)
-        chksum &= 0xffff                # force to 16 bits vs. 16 bit recsum
-        if (chksum != recsum):
-            chksum_errors += 1
-            chksum1 = '*** checksum failure @{0} (0x{0:x}) ' + \
-                      '[wanted: 0x{1:x} got: 0x{2:x}]'
-            eprint(chksum1.format(offset, recsum, chksum))
-            if g.mr_emitters:
-                mr_chksum_err(offset, recsum, chksum)
-            else:
-                if not dump_hdr(offset, rec_buf, '*** ') or g.verbose >= 3:
-                    print()
-                    dump_buf(rec_buf, '    ')
-            offset = resync(fd, offset)
-            if (offset < 0):
+    start, end = shard
+    low, high = rec_low, rec_high
+    init_globals()
+    rec_low, rec_high = low, high
+    dtd.dt_count.clear()
+    ubx.cid_count.clear()
+    sensor.sns_count.clear()
+    for k in dtd.last_rt:
+        dtd.last_rt[k] = 0
+    r = { 'first': None, 'hourly': None }
+    if prof:
+        prof.clear()                    # just this shard's times
+
+    def first_rec(offset, recnum):
+        sys.stderr.flush()
+        r['first'] = (sys.stderr.tell(), offset, recnum)
+
+    def hourly(key, banner):
+        output_flush()
+        r['hourly'] = (sys.stdout.tell(), key, banner)
+
+    first_rec_hook   = first_rec
+    dtd.hourly_defer = hourly
+    out_fd, r['out'] = tempfile.mkstemp(prefix = 'tagdump.')
+    err_fd, r['err'] = tempfile.mkstemp(prefix = 'tagdump.')
+    sys.stdout = os.fdopen(out_fd, 'w', OUT_BUF_SIZE)
+    sys.stderr = os.fdopen(err_fd, 'w')
+    set_output(OutputSink(sys.stdout))  # the parent's sink isn't ours
+    try:
+        infile = TagFile(open(args.input.name, 'rb'), verbose = g.verbose)
+        infile.seek(start)
+        r['done'] = dump_records(infile, end)
+        r['stop'] = infile.tell()
+        r['export'] = je.influx_close(report = False)   # push shard's points
+    finally:
+        sys.stdout.close()
+        sys.stderr.close()
+        sys.stdout = sys.__stdout__
+        sys.stderr = sys.__stderr__
+        first_rec_hook   = None
+        dtd.hourly_defer = None
+    r['last_rt']  = (dtd.last_rt['year'], dtd.last_rt['mon'],
+                     dtd.last_rt['day'],  dtd.last_rt['hr'])
+    r['counts']   = (rec_last, num_resyncs, chksum_errors, unk_rtypes,
+                     total_records, total_bytes)
+    r['next']     = (rec_last_off, rec_next)
+    r['dt_count'] = dtd.dt_count.items()
+    r['cid_count'] = ubx.cid_count.items()
+    r['sns_count'] = sensor.sns_count.items()
+    r['prof']     = prof.items() if prof else None
+    return r
+
+
+def splice(name, dst, pos, text):
+    '''copy file name to dst (a sink) inserting text at pos, then remove it'''
+    with open(name, 'rb') as src:
+        if text:
+            dst.write(src.read(pos))
+            dst.write(text)
+        while True:
+            buf = src.read(1024 * 1024)
+            if not buf:
                 break
-            continue                    # try again
+            dst.write(buf)
+    os.remove(name)
 
-        v = dtd.dt_records.get(rtype, (0, None, None, None, ''))
-        required_len = v[DTR_REQ_LEN]
-        if (required_len):
-            if (required_len != rlen):
-                print('*** len violation, required: {} got {}'.format(
-                    required_len, rlen))
-                dump_hdr(offset, rec_buf, '*** ')
-                print()
-                dump_buf(rec_buf, '    ')
-                offset = resync(fd, offset)
-                if (offset < 0):
-                    break
-                continue            # try again
 
-        # life is good.  return actual record.
-        return offset, hdr, rec_buf
+def merge_counts(dst, items):
+    for k, v in items:
+        dst[k] = dst.get(k, 0) + v
 
-    # oops.  things blew up.  just return -1 for the offset
-    return -1, hdr, ''
 
+def dump_parallel(shards):
+    '''
+    parent side of --jobs.  Results come back in file order (imap) and
+    are stitched onto stdout/stderr as they arrive.  The only state that
+    crosses a shard boundary is the last recnum (gap/backwards checks)
+    and the last hourly banner, both are fixed up here.
+
+    If a shard ran past the start of the next one (SYNC_FLUSH sector
+    skip or a resync across the boundary) the remaining shards are
+    dropped and the rest of the file is dumped serially from where that
+    shard stopped.  returns the ending file offset.
+    '''
+    global rec_last, rec_last_off, rec_next
+    global num_resyncs, chksum_errors, unk_rtypes
+    global total_records, total_bytes
 
-def process_dir(fd):
-    fd.seek(DBLK_DIR_SIZE)
+    lrt  = tuple([ dtd.last_rt[k] for k in ('year', 'mon', 'day', 'hr') ])
+    stop = None
+    out  = get_output()
+    output_flush()                      # workers mustn't inherit pending output
+    pool = multiprocessing.Pool(args.jobs)
+    try:
+        for n, r in enumerate(pool.imap(dump_shard, shards)):
+            if stop is not None:
+                os.remove(r['out'])
+                os.remove(r['err'])
+                continue
+            sys.stderr.flush()
+            text, pos = '', 0
+            if r['hourly']:
+                pos, key, banner = r['hourly']
+                if key != lrt:
+                    text = banner + '\n'
+                lrt = r['last_rt']
+            splice(r['out'], out, pos, text)
+            text, pos = '', 0
+            if r['first']:
+                pos, offset, recnum = r['first']
+                text = ''.join([ m + '\n' for m in
+                                 recnum_check(rec_last, recnum, offset) ])
+            splice(r['err'], sys.stderr, pos, text)
+
+            last, resyncs, chksums, unks, records, nbytes = r['counts']
+            rec_last       = last if last else rec_last
+            if r['next'][1]:
+                rec_last_off, rec_next = r['next']
+            num_resyncs   += resyncs
+            chksum_errors += chksums
+            unk_rtypes    += unks
+            total_records += records
+            total_bytes   += nbytes
+            merge_counts(dtd.dt_count,    r['dt_count'])
+            merge_counts(ubx.cid_count,   r['cid_count'])
+            merge_counts(sensor.sns_count, r['sns_count'])
+            je.influx_merge(r.get('export'))
+            if r['prof']:
+                prof.merge(r['prof'])
+            stop = r['stop']
+            if r['done']:
+                break
+            if n + 1 < len(shards) and stop == shards[n + 1][0]:
+                stop = None
+            elif n + 1 < len(shards):
+                eprint('*** jobs: shard {} overran @{}, finishing serially'.format(
+                    n, stop))
+    finally:
+        pool.terminate()
+        pool.join()
+
+    for i, k in enumerate(('year', 'mon', 'day', 'hr')):
+        dtd.last_rt[k] = lrt[i]
+    if stop is not None and n + 1 < len(shards) and not r['done']:
+        infile = TagFile(open(args.input.name, 'rb'), verbose = g.verbose)
+        infile.seek(stop)
+        dump_records(infile, stop_offset())
+        stop = infile.tell()
+    return stop
 
 
 def dump():
@@ -311,8 +661,11 @@ def dump():
     global rec_low, rec_high, rec_last
     global num_resyncs, chksum_errors, unk_rtypes
     global total_records, total_bytes
+    global prof, npx, sqx
 
     init_globals()
+    set_output(open_output(args.output))
+    start_time = time.time()
 
     dtd.cfg_print_hourly = args.hourly
     if g.debug or g.verbose >= 5:
@@ -327,24 +680,6 @@ def dump():
             vers.snsd_ver, vers.snse_ver, vers.snsh_ver))
         eprint()
 
-    def count_dt(rtype):
-        """
-        increment counter in dict of rtypes, create new entry if needed
-        also check for existence of dtd.dt_records entry.  If not known
-        count it as unknown.
-        """
-        global unk_rtypes
-
-        try:
-            dtd.dt_records[rtype]
-        except KeyError:
-            unk_rtypes += 1
-
-        try:
-            dtd.dt_count[rtype] += 1
-        except KeyError:
-            dtd.dt_count[rtype] = 1
-
     # Any -s argument (walk syncs backward) or -r -1 (last_rec) forces net io
     if (args.sync is not None or args.start_rec == -1 or args.tail):
         args.net = True
@@ -361,9 +696,12 @@ def dump():
         eprint('*** quiet:     {:7}'.format(g.quiet))
         eprint('*** debug:     {:7}'.format(g.debug))
         eprint('*** pretty:    {:7}'.format(g.pretty))
-        start_rec = args.start if args.start else 1
-        end_rec   = args.end   if args.end   else 'end'
+        start_rec = args.start_rec if args.start_rec else 1
+        end_rec   = args.last_rec  if args.last_rec  else 'end'
         eprint('*** records: {:9} - {}'.format(start_rec, end_rec))
+        if args.start or args.end:
+            eprint('*** times:   {:9} - {}'.format(args.start or 'start',
+                                                   args.end   or 'end'))
         start_pos = args.jump if args.jump else 0
         end_pos   = args.endpos if args.endpos else 'eof'
         eprint('*** offsets: {:9} - {}'.format(start_pos, end_pos))
@@ -384,109 +722,108 @@ def dump():
     # process the directory, this will leave us pointing at the first header
     process_dir(infile)
 
-    if (args.jump):
+    if (args.index):
+        build_index(infile, args.sparse)
+        return
+
+    ckpt = None
+    if (args.checkpoint):
+        if (args.net):
+            eprint('*** --checkpoint ignored with network i/o')
+        elif not (args.verify_only or args.scan):
+            ckpt = resume(infile)
+
+    if (rec_next):
+        pass                            # resuming from --checkpoint
+    elif (args.jump):
         if (args.jump == -1):
-            infile.seek(0, how = TF_SEEK_END)
+            if data_end:
+                infile.seek(data_end)   # the live end, from process_dir
+            else:
+                infile.seek(0, how = TF_SEEK_END)
         elif (args.jump < 0):
             infile.seek(args.jump, how = TF_SEEK_END)
         else:
             infile.seek(args.jump)
-
-    no_header = args.quiet or args.mr_emitters
+    elif (rec_low > 0 or args.start) and infile.load_index():
+        # bisect into the sidecar index rather than scanning from the top.
+        # anything the index gets us to early is dropped by the filters.
+        if rec_low > 0:
+            offset = infile.seek_recnum(rec_low)
+        else:
+            offset = infile.seek_time(args.start)
+        if offset < 0:
+            process_dir(infile)
+        elif g.debug:
+            eprint('*** index: starting @{0} (0x{0:x})'.format(offset))
+
+    if (args.verify_only or args.scan) and args.net:
+        eprint('*** --verify-only/--scan need a local file')
+        sys.exit(2)
+
+    if (args.verify_only):
+        if verify(infile):
+            sys.exit(1)
+        return
+
+    if (args.npy):                      # at most one of --scan/--npy/--sqlite
+        npx = NpExport(args.npy)
+    elif (args.sqlite):
+        sqx = SqlExport(args.sqlite, args.tag or
+                        os.path.splitext(os.path.basename(args.input.name))[0])
+
+    shards = None
+    if (args.jobs > 1):
+        if (args.net or args.num or args.scan or npx or sqx):
+            eprint('*** --jobs ignored with network i/o, -n, --scan, --npy '
+                   'or --sqlite')
+        else:
+            shards = plan_shards(infile, args.jobs)
+            if len(shards) < 2:
+                shards = None
+
+    # json_emitters connects lazily.  If any record exports, connect (or
+    # open --lp-file) up front so -x fails early and --jobs workers
+    # inherit the export rather than each connecting on its own.  --scan,
+    # --npy and --sqlite don't run emitters.
+    for v in dtd.dt_records.itervalues():
+        if args.scan or npx or sqx:
+            break
+        if v[DTR_EMITTERS] and je.emit_influx in v[DTR_EMITTERS]:
+            je.influx_open()
+            break
+
+    # --profile wraps the decoders and emitters.  After the export check
+    # above, that looks for emit_influx itself.
+    if args.profile and not prof:
+        prof = StageTimes()
+        instrument_tables(prof)
+
+    no_header = args.quiet or args.mr_emitters or args.scan or npx or sqx
     if not no_header:
-        print(dtd.rec_title_str)
+        oprint(dtd.rec_title_str)
 
     # extract record from input file and output decoded results
+    end_offset = None
     try:
-        while(True):
-            rec_offset, hdr, rec_buf = get_record(infile)
-
-            if (rec_offset < 0):
-                break
-
-            # hdr was populated (.set) by get_record
-            rlen     = hdr['len'].val
-            rtype    = hdr['type'].val
-            recnum   = hdr['recnum'].val
-
-            if (recnum < rec_last):
-                eprint('*** recnum went backwards.  last: {}, new: {}, @{}'.format(
-                    rec_last, recnum, rec_offset))
-            if (rec_last and recnum > rec_last + 1):
-                eprint('*** record gap: ({}) records @{}'.format(
-                    recnum - rec_last, rec_offset))
-            rec_last = recnum
-
-            # apply any filters (inclusion)
-            if (args.rtypes):
-                # either the number rtype must be in the search list
-                # or the name of the rtype must be in the search list
-                if ((str(rtype)       not in args.rtypes) and
-                      (dt_name(rtype) not in args.rtypes)):
-                    continue                   # not an rtype of interest
-
-            # look to see if record number bounds
-            if (rec_low and recnum < rec_low):
-                continue
-            if (rec_high and recnum > rec_high):
-                break                       # all done
-
-            # look to see if past file position bound
-            if (args.endpos and rec_offset > args.endpos):
-                break                       # all done
-
-            count_dt(rtype)
-            v = dtd.dt_records.get(rtype, (0, None, None, None, ''))
-            decoder  = v[DTR_DECODER]           # dt function
-            emitters = v[DTR_EMITTERS]          # emitter list
-            obj      = v[DTR_OBJ]               # dt object
-            if (decoder):                       # BRK
-                try:
-                    decoder(g.verbose, rec_offset, rec_buf, obj)
-                    if emitters and len(emitters):
-                        for e in emitters:
-                            e(g.verbose, rec_offset, rec_buf, obj)
-                except struct.error:
-                    eprint('*** decoder/emitter struct/obj error: (len: {}, '
-                          'rtype: {} {}, wanted: {}), @{}'.format(
-                              rlen, rtype, dt_name(rtype),
-                              len(obj) if obj else 0, rec_offset))
-            else:
-                if g.debug or not g.quiet or g.verbose >= 5:
-                    eprint('*** no decoder installed for rtype {}, @{}'.format(
-                        rtype, rec_offset))
-            if (g.verbose >= 3):
-                print()
-                dump_hdr(rec_offset, rec_buf, '    ')
-                dump_buf(rec_buf, '    ')
-            if g.verbose >= 1 and not g.quiet and not g.mr_emitters:
-                print()
-            total_records += 1
-            total_bytes   += rlen
-            if (args.num and total_records >= args.num):
-                break
-            #
-            # if we have a SYNC_FLUSH then advance to the next sector
-            # boundary.  System_Flush and we should have a reboot record
-            # in the next sector.
-            #
-            if rtype == DT_SYNC_FLUSH:
-                new_offset = rec_offset + 512
-                new_offset &= 0xfffffe00
-                eprint()
-                eprint('*** SYNC_FLUSH: @{} advancing to next '
-                       'sector @{}'.format(rec_offset, new_offset))
-                eprint()
-                infile.seek(new_offset)
+        if args.scan:
+            end_offset = scan(infile)
+        elif shards:
+            end_offset = dump_parallel(shards)
+        else:
+            dump_records(infile, stop_offset())
+            end_offset = infile.tell()
 
     except KeyboardInterrupt:
         eprint()
         eprint()
         eprint('*** user stop')
 
+    if end_offset is None:              # stopped (^C), where we got to
+        end_offset = infile.tell()
     eprint()
     eprint('*** end of processing @{}  (0x{:x})  processed: {} records  {} bytes'.format(
-            infile.tell(), infile.tell(), total_records, total_bytes))
+            end_offset, end_offset, total_records, total_bytes))
     eprint('*** reboots: {}  resyncs: {}  chksum_errs: {}  unk_rtypes: {}'.format(
         dtd.dt_count.get(DT_REBOOT, 0), num_resyncs, chksum_errors, unk_rtypes))
     if chksum_errors > 0:
@@ -495,6 +832,38 @@ def dump():
         eprint()
     eprint('rtypes: {}'.format(dtd.dt_count))
     eprint('cids:   {}'.format(ubx.cid_count))
+    if npx:
+        eprint()
+        for name, n, fname in npx.close():
+            eprint('*** npy: {:<16s} {:8d} records  {}'.format(name, n, fname))
+        if npx.skipped:
+            eprint('*** npy: not exported (no layout): {}'.format(npx.skipped))
+    if sqx:
+        eprint()
+        for name, n in sorted(sqx.close().items()):
+            eprint('*** sqlite: {:<16s} {:8d} rows added'.format(name, n))
+        if sqx.skipped:
+            eprint('*** sqlite: not loaded (no layout): {}'.format(sqx.skipped))
+    if ckpt:
+        checkpoint(ckpt)
+    if prof:
+        output_flush()
+        prof.report(time.time() - start_time)
+
+
+def run():
+    '''dump, under cProfile with --cprofile'''
+    if not args.cprofile:
+        dump()
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(dump)
+    finally:
+        profiler.dump_stats(args.cprofile)
+        eprint('*** cprofile: stats written to {}'.format(args.cprofile))
+
 
 if __name__ == "__main__":
-    dump()
+    run()
@@ -67,15 +67,44 @@ optional arguments:
                   (args.sync, int)
 
   --start START_TIME
-                  include records with rtctime greater than START_TIME
-  --end END_TIME  (args.{start,end}_time)
+                  include records with rtctime >= START_TIME
+  --end END_TIME  stop with records after END_TIME
+                  (args.{start,end}, microseconds since the epoch, UTC)
+                  times are epoch seconds or UTC date/times,
+                  2020-03-01T12:00:00, 2020/03/01T12:00:00.5,
+                  20200301T120000 or just 2020-03-01.
 
   -r START_REC    starting/ending records to dump.
                   -r -1 says start with .last_rec (implies --net)
   -l LAST_REC     (args.{start,last}_rec, integer)
 
+  --index         build the sidecar index (<input>.idx) and exit.
+  --sparse        with --index, only index SYNC records.
+                  (args.index, args.sparse, boolean)
+
+                  if a sidecar index exists it is used to seek to
+                  -r START_REC or --start START_TIME.
+
+  --jobs N        split the input at SYNC records and dump the pieces
+                  in N worker processes, output is identical to a
+                  serial dump.  Ignored with network i/o, -n, --scan,
+                  --npy or --sqlite.  (args.jobs, integer)
+
+  --profile       time each stage (record reads, checksums, resyncs,
+                  decode/emit per rtype, ubx decode/emit per cid) and
+                  print a table on stderr at the end.  Off, nothing is
+                  instrumented.  With --jobs the times are summed over
+                  the workers.  (args.profile, boolean)
+
+  --cprofile FILE run under cProfile and write its stats to FILE
+                  (pstats format).  --jobs workers aren't included.
+                  (args.cprofile)
+
   -t, --timeout TIMEOUT
-                  set --tail timeout to TIMEOUT seconds, defaults to 60
+                  longest --tail wait at EOF before reading again, in
+                  seconds, defaults to 60.  New data is normally seen
+                  right away (inotify) or within 0.5 secs (polling,
+                  tagfuse mounts).
 
   --tail          do not stop when we run out of data.  monitor and
                   get new data as it arrives.  (implies --net)
@@ -87,6 +116,28 @@ optional arguments:
   --noexport      override implicit export.  Used to examine incoming data
                   without exporting to influxdb.
 
+  --lp-file PREFIX
+                  export to influx line protocol files (gzip'd, rotated),
+                  PREFIX-0000.lp.gz, ... rather than to a live influxdb.
+                  Numbering continues after any PREFIX files already
+                  there, they are never overwritten.  (args.lp_file)
+
+  --npy OUT       export records as NumPy structured arrays, one per
+                  rtype, instead of displaying them.  OUT ending in .npz
+                  is one file, otherwise OUT<RTYPE>.npy each ('dir/'
+                  gives dir/GPS_GEO.npy ...).  Filters (--rtypes, -r,
+                  --start ...) apply.  Not with --jobs, --scan or
+                  --sqlite.  (args.npy)
+
+  --sqlite DB     decode records into SQLite database DB, a table per
+                  rtype, instead of displaying them.  Rows are keyed by
+                  tag and recnum, loading overlapping dumps doesn't
+                  duplicate them.  Not with --jobs, --scan or --npy.
+                  (args.sqlite)
+
+  --tag NAME      tag identifier for --sqlite rows, defaults to the
+                  input's name without extension.  (args.tag)
+
   -v, --verbose   increase output verbosity
                   (args.verbose)
 
@@ -117,6 +168,8 @@ from   __future__         import print_function
 
 import sys
 import argparse
+from   datetime import datetime
+from   calendar import timegm
 from   tagcore  import *
 from   __init__ import __version__   as VERSION
 import tagcore.globals
@@ -127,10 +180,35 @@ def auto_int(x):
 def auto_upper(x):
     return x.upper()
 
+time_fmts = [ '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d',
+              '%Y/%m/%dT%H:%M:%S.%f', '%Y/%m/%dT%H:%M:%S', '%Y/%m/%d',
+              '%Y%m%dT%H%M%S.%f',     '%Y%m%dT%H%M%S',     '%Y%m%d' ]
+
+def auto_time(x):
+    '''
+    convert a time argument to microseconds since the epoch (UTC).
+    accepts epoch seconds or any of time_fmts.
+    '''
+    x = x.strip().replace(' ', 'T')
+    for fmt in time_fmts:
+        try:
+            dt = datetime.strptime(x, fmt)
+        except ValueError:
+            continue
+        return timegm(dt.timetuple()) * 1000000 + dt.microsecond
+    try:
+        return int(float(x) * 1000000)
+    except ValueError:
+        raise argparse.ArgumentTypeError('bad time: {}'.format(x))
+
 def parseargs():
     parser = argparse.ArgumentParser(
         description='Print contents of Tag Data Stream.')
 
+    # --scan, --npy and --sqlite each replace the normal decode/display
+    # pass, only one of them at a time.
+    replace = parser.add_mutually_exclusive_group()
+
     parser.add_argument('input',
                         type=argparse.FileType('rb'),
                         help='input file')
@@ -176,16 +254,40 @@ def parseargs():
                         type=int,
                         help='sync backward SYNC syncs')
 
-    # not working yet
     parser.add_argument('--start',
-                        type=int,
+                        type=auto_time,
                         help='include records with rtctime >= than START')
 
-    # not working yet
     parser.add_argument('--end',
-                        type=int,
+                        type=auto_time,
                         help='stop with records after END')
 
+    parser.add_argument('--index',
+                        action='store_true',
+                        help='build sidecar index and exit')
+
+    parser.add_argument('--sparse',
+                        action='store_true',
+                        help='only index SYNC records')
+
+    parser.add_argument('--verify-only',
+                        action='store_true',
+                        help='verify record checksums, report corrupt '
+                             'ranges and exit')
+
+    replace.add_argument('--scan',
+                         action='store_true',
+                         help='header only scan: counts, gaps and reboots, '
+                              'no decoding')
+
+    parser.add_argument('--chksum',
+                        action='store_true',
+                        help='with --scan, also verify record checksums')
+
+    parser.add_argument('--checkpoint',
+                        metavar='STATE',
+                        help='resume from and save progress to STATE')
+
     parser.add_argument('-r', '--start_rec',
                         type=int,
                         help='starting record to dump.')
@@ -194,10 +296,23 @@ def parseargs():
                         type=int,
                         help='last record to dump.')
 
+    parser.add_argument('--jobs',
+                        type=int,
+                        default=1,
+                        help='dump using JOBS worker processes')
+
+    parser.add_argument('--profile',
+                        action='store_true',
+                        help='print per stage timing at the end')
+
+    parser.add_argument('--cprofile',
+                        metavar='FILE',
+                        help='write cProfile stats to FILE')
+
     parser.add_argument('-t', '--timeout',
                         type=int,
                         default=60,
-                        help='--tail read timeout.')
+                        help='--tail, longest wait at EOF.')
 
     parser.add_argument('--tail',
                         action='store_true',
@@ -213,10 +328,33 @@ def parseargs():
                         default=0,
                         help='override export to external database')
 
+    parser.add_argument('--lp-file',
+                        metavar='PREFIX',
+                        help='export to line protocol files PREFIX-NNNN.lp.gz')
+
+    replace.add_argument('--npy',
+                         metavar='OUT',
+                         help='export NumPy arrays by rtype, OUT.npz or '
+                              'OUT<RTYPE>.npy, no display')
+
+    replace.add_argument('--sqlite',
+                         metavar='DB',
+                         help='load decoded records into SQLite DB, no display')
+
+    parser.add_argument('--tag',
+                        metavar='NAME',
+                        help='--sqlite tag identifier (default input name)')
+
     parser.add_argument('-m', '--mr_emitters',
                         action='store_true',
                         help='enable machine readable export emitters')
 
+    parser.add_argument('-o', '--output',
+                        metavar='FILE',
+                        default='-',
+                        help='write display output to FILE (- stdout, '
+                             '*.gz compressed)')
+
     parser.add_argument('-p', '--pretty',
                         action='store_true',
                         help='print pretty when able')
@@ -244,6 +382,7 @@ tagcore.globals.quiet     = args.quiet
 tagcore.globals.pretty    = args.pretty
 tagcore.globals.gps_level = args.gps_eval
 tagcore.globals.mr_emitters = args.mr_emitters
+tagcore.globals.lp_file   = args.lp_file
 
 if args.mr_emitters and args.gps_eval:
     print('*** gps_eval and mr_emitters are mutually exclusive')
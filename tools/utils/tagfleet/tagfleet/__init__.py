@@ -0,0 +1,8 @@
+"""
+tagfleet:  dump the dblk images of a fleet of tags
+@author: Eric B. Decker
+"""
+
+__version__ = '0.4.8.dev1'
+
+# See tools/utils/ChangeLog
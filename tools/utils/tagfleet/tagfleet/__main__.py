@@ -0,0 +1,9 @@
+"""
+tagfleet:  dump the dblk images of a fleet of tags
+@author: Eric B. Decker
+"""
+
+from tagfleet import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,517 @@
+# Copyright (c) 2020 Eric B. Decker
+# All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# See COPYING in the top level directory of this source tree.
+#
+# Contact: Eric B. Decker <cire831@gmail.com>
+
+'''
+tagfleet - dump dblk images from a fleet of tags
+
+Takes directories (searched for --match, default *.dblk) and/or files
+and globs, and runs the tagcore record pipeline (RecordReader, decoders,
+emitters) over each file in a pool of worker processes.  Each tag's
+display output goes to OUTDIR/<tag>.txt (.txt.gz with -z).  Nothing is
+exported.
+
+The records, their display and the problem reporting are tagdump's
+(tagrecords.ReportingReader, recnum_check), except that the diagnostics
+tagdump puts on stderr are written inline in the tag's output, the
+workers share stderr.  The end of processing totals are in fleet.json
+rather than at the end of the output.
+
+When everything is done a fleet summary is printed and written to
+OUTDIR/fleet.json: per tag and fleet wide record, reboot, resync and
+checksum error counts, rtype and ubx cid histograms, and the time span
+covered.
+
+Restartable.  OUTDIR/fleet.state remembers each file's size and mtime,
+the options that shape its output (-m, -H, -z, -n) and its summary,
+and is saved as each file finishes.  Files that haven't changed since
+their last run with the same options are skipped (their last summary is
+used), --force redoes everything.
+
+--merge FILE instead writes one timeline for all the inputs, every
+record from every tag in rtctime order (tagcore.merge_records, a k-way
+merge that streams the files), one line per record:
+
+    <time> <tag> <recnum> @<offset> <len> <rtype name>
+
+usage: tagfleet [-h] [-V] [-o OUTDIR] [-j JOBS] [--match PATTERN]
+                [-m] [-z] [-n] [-H] [--force]
+                [--merge FILE] [--rtypes RTYPES]
+                input [input ...]
+'''
+
+from   __future__         import print_function
+
+import os
+import sys
+import glob
+import json
+import time
+import fnmatch
+import argparse
+import multiprocessing
+from   datetime               import datetime
+
+import tagcore.globals        as     g
+from   tagcore.core_rev       import CORE_REV, CORE_MINOR
+import tagcore.dt_defs        as     dtd
+from   tagcore.dt_defs        import DTR_NAME
+from   tagcore.dt_defs        import DT_REBOOT
+import tagcore.ubx_defs       as     ubx
+import tagcore.sensor_defs    as     sensor
+from   tagcore.tagfile        import TagFile
+from   tagcore.tagrecords     import ReportingReader, DBLK_DIR_SIZE
+from   tagcore.tagrecords     import recnum_check
+from   tagcore.tagrecords     import merge_records
+from   tagcore.misc_utils     import eprint, rtc2epoch_us
+from   tagcore.output_sinks   import oprint, open_output, set_output, FileSink
+import tagcore.json_emitters  as     je
+
+from   __init__           import __version__ as VERSION
+
+STATE_VERSION   = 1
+STATE_NAME      = 'fleet.state'
+SUMMARY_NAME    = 'fleet.json'
+MATCH           = '*.dblk'
+
+# per tag counts summed into the fleet totals
+SUM_KEYS = ('records', 'bytes', 'reboots', 'resyncs', 'chksum_errors',
+            'unk_rtypes', 'decode_errors')
+
+
+class FleetReader(ReportingReader):
+    '''
+    ReportingReader whose diagnostics go into the tag's output, stderr
+    is shared by all the workers.
+    '''
+
+    def log(self, *args):
+        oprint(*args)
+
+
+def rtype_name(rtype):
+    v = dtd.dt_records.get(rtype)
+    return v[DTR_NAME] if v else 'dt/{}'.format(rtype)
+
+
+def cid_name(cid):
+    v = ubx.cid_table.get(cid)
+    return v[ubx.CID_NAME] if v else 'cid/{:04X}'.format(cid)
+
+
+def us_iso(rt_us):
+    if not rt_us:
+        return None
+    return datetime.utcfromtimestamp(rt_us / 1e6).isoformat()
+
+
+def reset_state():
+    '''tagcore keeps counts and the hourly banner state in globals'''
+    dtd.dt_count.clear()
+    ubx.cid_count.clear()
+    sensor.sns_count.clear()
+    for k in dtd.last_rt:
+        dtd.last_rt[k] = 0
+
+
+def dump_tag(job):
+    '''
+    worker.  dump one dblk file, job is (path, output name or None,
+    run options).  returns the tag's summary, 'error' is set if it blew
+    up.
+    '''
+    path, out_name, options = job
+    t0 = time.time()
+    summary = { 'path': path, 'output': out_name, 'options': options }
+    sink = None
+    try:
+        st = os.stat(path)
+        summary['size']  = st.st_size
+        summary['mtime'] = st.st_mtime
+        reset_state()
+        sink = open_output(out_name) if out_name else FileSink(os.devnull)
+        set_output(sink)
+        summary.update(dump_records(path, emit = out_name is not None))
+    except Exception as e:
+        summary['error'] = '{}: {}'.format(type(e).__name__, e)
+    finally:
+        if sink:
+            sink.close()
+    summary['secs'] = time.time() - t0
+    return summary
+
+
+def dump_records(path, emit = True):
+    '''
+    the tagdump pipeline over one file: validate (get_record), check
+    record numbers, decode, and (emit) display.  returns the counts.
+    '''
+    records = nbytes = 0
+    first_rt = last_rt = 0
+    first_recnum = last_recnum = 0
+
+    if emit and not g.mr_emitters:
+        oprint(dtd.rec_title_str)
+    with open(path, 'rb') as fd, \
+         TagFile(fd, verbose = g.verbose, quiet = True) as infile:
+        infile.seek(DBLK_DIR_SIZE)
+        reader = FleetReader(infile)
+        for rec_offset, hdr, rec_buf in reader.records():
+            rlen   = hdr['len'].val
+            rtype  = hdr['type'].val
+            recnum = hdr['recnum'].val
+            rt_us  = rtc2epoch_us(hdr['rt'])
+            if rt_us:
+                first_rt = min(first_rt, rt_us) if first_rt else rt_us
+                last_rt  = max(last_rt, rt_us)
+            for msg in recnum_check(last_recnum, recnum, rec_offset):
+                reader.log(msg)
+            if not first_recnum:
+                first_recnum = recnum
+            last_recnum = recnum
+
+            dtd.dt_count[rtype] = dtd.dt_count.get(rtype, 0) + 1
+            records += 1
+            nbytes  += rlen
+            reader.decode(rec_offset, rec_buf, emit = emit)
+
+    return {
+        'records':       records,
+        'bytes':         nbytes,
+        'reboots':       dtd.dt_count.get(DT_REBOOT, 0),
+        'resyncs':       reader.resyncs,
+        'chksum_errors': reader.chksum_errors,
+        'unk_rtypes':    reader.undecoded,
+        'decode_errors': reader.decode_errors,
+        'first_recnum':  first_recnum,
+        'last_recnum':   last_recnum,
+        'first_rt':      us_iso(first_rt),
+        'last_rt':       us_iso(last_rt),
+        'rtypes':        dict([ (rtype_name(k), n) for k, n in
+                                dtd.dt_count.iteritems() ]),
+        'cids':          dict([ (cid_name(k), n) for k, n in
+                                ubx.cid_count.iteritems() ]),
+    }
+
+
+class FleetState(object):
+    '''
+    OUTDIR/fleet.state, what has been done.  path -> summary (which
+    holds the size and mtime the summary is for, and the run options
+    that shaped the output).
+
+    methods:    load        (classmethod) read it, empty if missing.
+                current     the summary for path if path is unchanged
+                            and was done with the same options.
+                update      record a summary and save.
+    '''
+
+    def __init__(self, name):
+        super(FleetState, self).__init__()
+        self.name = name
+        self.tags = {}
+
+    @classmethod
+    def load(cls, name):
+        state = cls(name)
+        try:
+            with open(name, 'rb') as fd:
+                saved = json.load(fd)
+        except (IOError, OSError):
+            return state
+        except ValueError:
+            eprint('*** {} unreadable, starting over'.format(name))
+            return state
+        if saved.get('version') == STATE_VERSION:
+            state.tags = saved.get('tags', {})
+        return state
+
+    def current(self, path, out_name, options):
+        s = self.tags.get(path)
+        if not s or s.get('error') or s.get('output') != out_name:
+            return None
+        if s.get('options') != options:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != s['size'] or st.st_mtime != s['mtime']:
+            return None
+        if out_name and not os.path.exists(out_name):
+            return None
+        return s
+
+    def update(self, summary):
+        self.tags[summary['path']] = summary
+        tmp = self.name + '.tmp'
+        with open(tmp, 'wb') as fd:
+            json.dump({ 'version': STATE_VERSION, 'tags': self.tags }, fd,
+                      sort_keys = True)
+        os.rename(tmp, self.name)
+
+
+def find_inputs(inputs, match):
+    '''
+    dblk files from directories (walked, files matching match), globs
+    and plain files.  returns [ (tag name, path) ], sorted by name.
+    tag names are the path below the directory given (or the file's
+    name), without extension, '/' -> '_'.
+    '''
+    found = {}
+    for inp in inputs:
+        if os.path.isdir(inp):
+            for dirpath, dirs, files in os.walk(inp):
+                dirs.sort()
+                for f in sorted(fnmatch.filter(files, match)):
+                    path = os.path.join(dirpath, f)
+                    found.setdefault(os.path.realpath(path),
+                                     os.path.relpath(path, inp))
+        else:
+            paths = glob.glob(inp) if glob.has_magic(inp) else [ inp ]
+            if not paths:
+                eprint('*** {}: nothing matches'.format(inp))
+            for path in paths:
+                found.setdefault(os.path.realpath(path),
+                                 os.path.basename(path))
+
+    out   = []
+    names = set()
+    for path, rel in sorted(found.items(), key = lambda x: x[1]):
+        name = os.path.splitext(rel)[0].replace(os.sep, '_')
+        base, n = name, 1
+        while name in names:
+            n += 1
+            name = '{}-{}'.format(base, n)
+        names.add(name)
+        out.append((name, path))
+    return out
+
+
+def merge_timeline(inputs, out_name, rtypes = None):
+    '''
+    all records from inputs, [ (tag name, path) ], in time order to
+    out_name.  returns the number of records written.
+    '''
+    out = open_output(out_name)
+    n = 0
+    for rec in merge_records([ (name, path) for name, path in inputs ],
+                             rtypes = rtypes, decode = False):
+        out.write('{:<26s} {:<16s} {:>8} @{:<9} {:>4}  {}\n'.format(
+            us_iso(rec.rt_us) or '-', rec.tag, rec.recnum, rec.offset,
+            rec.rlen, rec.name))
+        n += 1
+    out.close()
+    return n
+
+
+def fleet_summary(tags):
+    '''totals and histograms over the tag summaries (that worked)'''
+    total = dict([ (k, 0) for k in SUM_KEYS ])
+    total['rtypes'] = {}
+    total['cids']   = {}
+    total['first_rt'] = total['last_rt'] = None
+    total['tags']   = 0
+    total['errors'] = 0
+    for name, s in tags.iteritems():
+        if s.get('error'):
+            total['errors'] += 1
+            continue
+        total['tags'] += 1
+        for k in SUM_KEYS:
+            total[k] += s[k]
+        for hist in ('rtypes', 'cids'):
+            for k, n in s[hist].iteritems():
+                total[hist][k] = total[hist].get(k, 0) + n
+        if s['first_rt'] and (total['first_rt'] is None or
+                              s['first_rt'] < total['first_rt']):
+            total['first_rt'] = s['first_rt']
+        if s['last_rt'] and (total['last_rt'] is None or
+                             s['last_rt'] > total['last_rt']):
+            total['last_rt'] = s['last_rt']
+    return total
+
+
+def print_summary(tags, total):
+    fmt = '{:<24s} {:>8} {:>4} {:>6} {:>6}  {:<19s} {:<19s}'
+    print()
+    print(fmt.format('tag', 'records', 'rbts', 'resync', 'chksum',
+                     'first', 'last'))
+    for name in sorted(tags):
+        s = tags[name]
+        if s.get('error'):
+            print('{:<24s} *** {}'.format(name, s['error']))
+            continue
+        print(fmt.format(name[:24], s['records'], s['reboots'], s['resyncs'],
+                         s['chksum_errors'], (s['first_rt'] or '-')[:19],
+                         (s['last_rt'] or '-')[:19]))
+    print(fmt.format('fleet ({} tags)'.format(total['tags']), total['records'],
+                     total['reboots'], total['resyncs'],
+                     total['chksum_errors'], (total['first_rt'] or '-')[:19],
+                     (total['last_rt'] or '-')[:19]))
+    if total['errors']:
+        print('*** {} files failed'.format(total['errors']))
+    print()
+    for hist in ('rtypes', 'cids'):
+        items = sorted(total[hist].items(), key = lambda x: (-x[1], x[0]))
+        print('{:7s} {}'.format(hist + ':', '  '.join(
+            [ '{}: {}'.format(k, n) for k, n in items ])))
+
+
+def parseargs():
+    parser = argparse.ArgumentParser(
+        description='dump the dblk images of a fleet of tags')
+
+    parser.add_argument('inputs',
+                        nargs='+',
+                        metavar='input',
+                        help='dblk file, glob or directory')
+
+    parser.add_argument('-V', '--version',
+                        action='version',
+                        version='%(prog)s ' + VERSION + ', core: ' + \
+                            str(CORE_REV) + '/' + str(CORE_MINOR))
+
+    parser.add_argument('-o', '--outdir',
+                        default='fleet',
+                        help='per tag output, summary and state go here')
+
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='worker processes')
+
+    parser.add_argument('--match',
+                        default=MATCH,
+                        help='files to take from directories')
+
+    parser.add_argument('-m', '--mr_emitters',
+                        action='store_true',
+                        help='machine readable emitters')
+
+    parser.add_argument('-z', '--gzip',
+                        action='store_true',
+                        help="gzip each tag's output")
+
+    parser.add_argument('-n', '--no-output',
+                        action='store_true',
+                        help='summary only, no per tag output')
+
+    parser.add_argument('-H', '--hourly',
+                        action='store_false',
+                        help='turns off hourly banners')
+
+    parser.add_argument('--force',
+                        action='store_true',
+                        help='redo files even if unchanged')
+
+    parser.add_argument('--merge',
+                        metavar='FILE',
+                        help='write a time ordered timeline of all inputs '
+                        'to FILE (- stdout) instead')
+
+    parser.add_argument('--rtypes',
+                        type=str,
+                        help='--merge: output only these rtypes, '
+                        'numbers and/or names, comma separated')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parseargs()
+    g.mr_emitters = args.mr_emitters
+    if args.mr_emitters:
+        import tagcore.mr_populate
+    else:
+        import tagcore.core_populate
+    import tagcore.sensor_populate
+    import tagcore.ubx_populate
+    dtd.cfg_print_hourly = args.hourly
+    je.influx_state = False             # no export from fleet runs
+
+    if args.merge:
+        inputs = find_inputs(args.inputs, args.match)
+        if not inputs:
+            eprint('*** no input files')
+            sys.exit(2)
+        rtypes = None
+        if args.rtypes:
+            rtypes = [ int(r) if r.isdigit() else r
+                       for r in args.rtypes.split(',') ]
+        n = merge_timeline(inputs, args.merge, rtypes)
+        eprint('*** {} records from {} tags'.format(n, len(inputs)))
+        return
+
+    if not os.path.isdir(args.outdir):
+        os.makedirs(args.outdir)
+    state = FleetState.load(os.path.join(args.outdir, STATE_NAME))
+    ext   = '.txt.gz' if args.gzip else '.txt'
+    # what changes a tag's output, a change means redoing it
+    options = { 'mr_emitters': args.mr_emitters, 'hourly': args.hourly,
+                'gzip': args.gzip, 'no_output': args.no_output }
+
+    tags = {}
+    jobs = []
+    names = {}
+    for name, path in find_inputs(args.inputs, args.match):
+        out_name = None if args.no_output else \
+                   os.path.join(args.outdir, name + ext)
+        names[path] = name
+        s = None if args.force else state.current(path, out_name, options)
+        if s:
+            tags[name] = s
+        else:
+            jobs.append((path, out_name, options))
+    if not names:
+        eprint('*** no input files')
+        sys.exit(2)
+    eprint('*** {} tags, {} to do, {} unchanged'.format(
+        len(names), len(jobs), len(names) - len(jobs)))
+
+    if jobs:
+        pool = multiprocessing.Pool(min(args.jobs, len(jobs)))
+        try:
+            for s in pool.imap_unordered(dump_tag, jobs):
+                name = names[s['path']]
+                tags[name] = s
+                state.update(s)
+                if s.get('error'):
+                    eprint('*** {}: {}'.format(name, s['error']))
+                else:
+                    eprint('--- {}: {} records in {:.1f} secs'.format(
+                        name, s['records'], s['secs']))
+        except KeyboardInterrupt:
+            eprint('*** user stop, finished tags are saved')
+            pool.terminate()
+            pool.join()
+            sys.exit(1)
+        pool.close()
+        pool.join()
+
+    total = fleet_summary(tags)
+    print_summary(tags, total)
+    with open(os.path.join(args.outdir, SUMMARY_NAME), 'wb') as fd:
+        json.dump({ 'tags': tags, 'fleet': total }, fd, indent = 2,
+                  sort_keys = True)
+    if total['errors']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()